@@ -0,0 +1,6 @@
+"""
+Offline benchmarks: a scripted fake chat model and a seeded local Postgres
+insurance dataset, so timings are reproducible without OpenRouter or Supabase.
+
+Run with `python -m benchmarks.run --help` from the Backend directory.
+"""
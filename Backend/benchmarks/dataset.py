@@ -0,0 +1,148 @@
+"""
+Seeded insurance dataset (agents, clients, contrats, claims) for a local Postgres.
+
+Each scale factor lives in its own schema (bench_sf<N>) and is generated from a
+fixed seed, so every run and every commit benchmarks the same rows.
+"""
+import datetime
+import random
+from sqlalchemy import (
+    Column, Date, DateTime, ForeignKey, Integer, MetaData, Numeric, String, Table, create_engine, text,
+)
+
+# Rows per table at scale factor 1
+BASE_ROWS = {"agents": 20, "clients": 1000, "contrats": 2500, "claims": 1500}
+
+CITIES = ["Paris", "Lyon", "Marseille", "Toulouse", "Nice", "Nantes", "Lille", "Bordeaux", "Tunis", "Sfax"]
+REGIONS = ["Nord", "Sud", "Est", "Ouest", "Centre"]
+PRODUCTS = ["auto", "habitation", "sante", "vie", "voyage"]
+CONTRACT_STATUSES = ["active", "active", "active", "expired", "cancelled", "pending"]
+CLAIM_STATUSES = ["open", "approved", "rejected", "paid"]
+FIRST_NAMES = ["Ahmed", "Sarra", "Yassine", "Amira", "Louis", "Chloe", "Karim", "Ines", "Hugo", "Lea", "Omar", "Nour"]
+LAST_NAMES = ["Ben Ali", "Trabelsi", "Martin", "Bernard", "Dubois", "Haddad", "Moreau", "Jlassi", "Laurent", "Gharbi"]
+
+START = datetime.date(2019, 1, 1)
+DAYS = 6 * 365
+
+
+def schema_name(scale: int) -> str:
+    return f"bench_sf{scale}"
+
+
+def scoped_uri(base_uri: str, scale: int) -> str:
+    """Base URI with search_path set to the scale's schema (unqualified SQL resolves there)."""
+    separator = "&" if "?" in base_uri else "?"
+    return f"{base_uri}{separator}options=-csearch_path%3D{schema_name(scale)}"
+
+
+def _tables(schema: str) -> MetaData:
+    metadata = MetaData(schema=schema)
+    Table(
+        "agents", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("name", String(100), nullable=False),
+        Column("email", String(200)),
+        Column("region", String(50)),
+        Column("hired_on", Date),
+    )
+    Table(
+        "clients", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("name", String(100), nullable=False),
+        Column("email", String(200)),
+        Column("city", String(100)),
+        Column("birth_date", Date),
+        Column("agent_id", Integer, ForeignKey(f"{schema}.agents.id")),
+        Column("created_at", DateTime),
+    )
+    Table(
+        "contrats", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("client_id", Integer, ForeignKey(f"{schema}.clients.id"), nullable=False),
+        Column("product", String(50)),
+        Column("status", String(20)),
+        Column("start_date", Date),
+        Column("end_date", Date),
+        Column("premium", Numeric(10, 2)),
+        Column("updated_at", DateTime),
+    )
+    Table(
+        "claims", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("contrat_id", Integer, ForeignKey(f"{schema}.contrats.id"), nullable=False),
+        Column("claim_date", Date),
+        Column("amount", Numeric(12, 2)),
+        Column("status", String(20)),
+    )
+    return metadata
+
+
+def _date(rng: random.Random) -> datetime.date:
+    return START + datetime.timedelta(days=rng.randrange(DAYS))
+
+
+def generate(scale: int, seed: int = 42) -> dict:
+    """Rows per table, as lists of dicts, for `scale`."""
+    rng = random.Random(seed * 1000 + scale)
+    counts = {table: rows * scale for table, rows in BASE_ROWS.items()}
+
+    def person(i):
+        return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}"
+
+    agents = [
+        {"id": i, "name": person(i), "email": f"agent{i}@assurance.example", "region": rng.choice(REGIONS),
+         "hired_on": _date(rng)}
+        for i in range(1, counts["agents"] + 1)
+    ]
+    clients = [
+        {"id": i, "name": person(i), "email": f"client{i}@mail.example", "city": rng.choice(CITIES),
+         "birth_date": datetime.date(1950, 1, 1) + datetime.timedelta(days=rng.randrange(50 * 365)),
+         "agent_id": rng.randint(1, counts["agents"]),
+         "created_at": datetime.datetime.combine(_date(rng), datetime.time(rng.randrange(24), rng.randrange(60)))}
+        for i in range(1, counts["clients"] + 1)
+    ]
+    contrats = []
+    for i in range(1, counts["contrats"] + 1):
+        start = _date(rng)
+        contrats.append({
+            "id": i, "client_id": rng.randint(1, counts["clients"]), "product": rng.choice(PRODUCTS),
+            "status": rng.choice(CONTRACT_STATUSES), "start_date": start,
+            "end_date": start + datetime.timedelta(days=365 * rng.randint(1, 3)),
+            "premium": round(rng.uniform(150, 4000), 2),
+            "updated_at": datetime.datetime.combine(start, datetime.time(12)),
+        })
+    claims = [
+        {"id": i, "contrat_id": rng.randint(1, counts["contrats"]), "claim_date": _date(rng),
+         "amount": round(rng.lognormvariate(7, 1), 2), "status": rng.choice(CLAIM_STATUSES)}
+        for i in range(1, counts["claims"] + 1)
+    ]
+    return {"agents": agents, "clients": clients, "contrats": contrats, "claims": claims}
+
+
+def seed(base_uri: str, scale: int, seed: int = 42, force: bool = False) -> dict:
+    """Create and fill bench_sf<scale> unless it already holds this seed; returns row counts."""
+    schema = schema_name(scale)
+    marker = f"seed={seed} scale={scale}"
+    engine = create_engine(base_uri)
+    try:
+        with engine.begin() as conn:
+            existing = conn.execute(
+                text("SELECT obj_description(oid, 'pg_namespace') FROM pg_namespace WHERE nspname = :s"),
+                {"s": schema},
+            ).scalar()
+            if existing == marker and not force:
+                return {t: rows * scale for t, rows in BASE_ROWS.items()}
+            conn.execute(text(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE'))
+            conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+            metadata = _tables(schema)
+            metadata.create_all(conn)
+            data = generate(scale, seed)
+            for name in ("agents", "clients", "contrats", "claims"):
+                conn.execute(metadata.tables[f"{schema}.{name}"].insert(), data[name])
+            conn.execute(text(f"COMMENT ON SCHEMA \"{schema}\" IS '{marker}'"))
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for name in data:
+                conn.execute(text(f'ANALYZE "{schema}"."{name}"'))  # realistic EXPLAIN estimates
+        return {name: len(rows) for name, rows in data.items()}
+    finally:
+        engine.dispose()
@@ -0,0 +1,132 @@
+"""
+Deterministic stand-in for ChatOpenAI.
+
+install() must run before any `src` module is imported: it replaces
+langchain_openai.ChatOpenAI, so the clients that src/llm.py and src/chains.py
+build on their first call are FakeChatModel instances. Responses are scripted per
+pipeline stage (from the stage tags in src/streaming.py) and delayed by the
+configured latency and token rate. respond() is also served over HTTP by
+benchmarks/openai_stub.py.
+"""
+import re
+import sys
+import time
+from typing import Any, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict
+
+# Shared by every instance, so latency can be changed between benchmark runs
+SETTINGS = {
+    "latency": 0.0,            # seconds per call
+    "tokens_per_second": 0.0,  # output token rate; 0 = instant
+    "script": {},              # normalized question -> SQL
+    "graph_code": "",
+    "fallback_sql": "SELECT COUNT(*) AS clients FROM clients",
+}
+CALLS = {"count": 0}
+
+_GRAPH_WORDS = re.compile(r"\b(chart|graph|plot|heatmap|histogram)s?\b", re.IGNORECASE)
+_QUESTION_RE = re.compile(r"User question:\s*(.*?)\s*\n\s*\n", re.DOTALL)
+_HUMAN_RE = re.compile(r"^Human: (.*)$", re.MULTILINE)
+
+# Same values as the stage tags in src/streaming.py (not imported: src must load after install())
+STAGES = ("sql_generation", "answer_formatting", "graph_code", "memory_summary")
+# Prompt fragments identifying a stage when tags are unavailable (e.g. over HTTP)
+_STAGE_MARKERS = (
+    ("memory_summary", "Progressively summarize"),
+    ("graph_code", "using Matplotlib"),
+    ("answer_formatting", "converts SQL responses"),
+    ("sql_generation", "User question:"),
+)
+
+
+def normalize(question: str) -> str:
+    return " ".join(question.lower().split()).rstrip(" ?!.;")
+
+
+def count_tokens(text: str) -> int:
+    return max(1, (len(text) + 3) // 4)
+
+
+def detect_stage(prompt: str) -> str:
+    """Pipeline stage of a prompt from its template text; "agent" for ReAct steps."""
+    return next((stage for stage, marker in _STAGE_MARKERS if marker in prompt), "agent")
+
+
+def respond(prompt: str, stage: str) -> str:
+    """Scripted completion for `prompt` at pipeline `stage`."""
+    if stage == "sql_generation":
+        match = _QUESTION_RE.search(prompt)
+        question = normalize(match.group(1)) if match else ""
+        return SETTINGS["script"].get(question, SETTINGS["fallback_sql"])
+    if stage == "answer_formatting":
+        response = prompt.split("SQL Response:", 1)[-1].strip()
+        return f"Thought: I summarised the SQL response.\nFinal Answer: {response[:500]}"
+    if stage == "graph_code":
+        return SETTINGS["graph_code"]
+    if stage == "memory_summary":
+        return "The user asked questions about clients, contracts and claims."
+
+    humans = _HUMAN_RE.findall(prompt)
+    question = humans[-1].strip() if humans else ""
+    scratchpad = prompt.rsplit("\nAI:", 1)[-1]
+    if "Observation:" in scratchpad:
+        observation = scratchpad.split("Observation:", 1)[1].strip()
+        return f"Thought: The tool returned the result.\nFinal Answer: {observation[:500]}"
+    tool = "graph_query" if _GRAPH_WORDS.search(question) else "sql_query"
+    return f"Thought: I should use {tool}.\nAction: {tool}\nAction Input: {question}"
+
+
+def configure(questions: list, graph_code: str, latency: float = 0.0, tokens_per_second: float = 0.0):
+    """Set the scripted answers and the simulated latency."""
+    SETTINGS.update(
+        latency=latency,
+        tokens_per_second=tokens_per_second,
+        script={normalize(q["question"]): q["sql"] for q in questions},
+        graph_code=graph_code,
+    )
+
+
+class FakeChatModel(BaseChatModel):
+    """Scripted chat model accepting (and ignoring) ChatOpenAI's constructor arguments."""
+
+    model_config = ConfigDict(extra="ignore", arbitrary_types_allowed=True)
+    model_name: str = "fake-scripted"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-scripted"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        tags = set(getattr(run_manager, "tags", None) or ())
+        stage = next((t for t in STAGES if t in tags), None) or detect_stage(prompt)
+        text = respond(prompt, stage)
+
+        CALLS["count"] += 1
+        output_tokens = count_tokens(text)
+        delay = SETTINGS["latency"]
+        if SETTINGS["tokens_per_second"]:
+            delay += output_tokens / SETTINGS["tokens_per_second"]
+        if delay:
+            time.sleep(delay)
+        input_tokens = count_tokens(prompt)
+        message = AIMessage(content=text, usage_metadata={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def install(questions: list, graph_code: str, latency: float = 0.0, tokens_per_second: float = 0.0):
+    """Swap ChatOpenAI for FakeChatModel; call before importing anything from `src`."""
+    if any(name == "src" or name.startswith("src.") for name in sys.modules):
+        raise RuntimeError("fake_llm.install() must run before src modules are imported")
+    import langchain_openai
+
+    configure(questions, graph_code, latency, tokens_per_second)
+    langchain_openai.ChatOpenAI = FakeChatModel
@@ -0,0 +1,156 @@
+"""
+Local OpenAI-compatible chat-completions server for load tests.
+
+Point the backend at it with OPENROUTER_API_BASE / OPENAI_API_BASE set to
+http://127.0.0.1:<port>/v1. Answers come from benchmarks.fake_llm.respond(),
+with a latency profile (time to first token + output token rate) and optional
+injected 429/500 errors.
+
+    python -m benchmarks.openai_stub --port 9100 --profile typical
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from benchmarks import fake_llm
+from benchmarks.workload import QUESTIONS, GRAPH_CODE
+
+# name -> (seconds to first token, output tokens per second; 0 = instant)
+PROFILES = {
+    "instant": (0.0, 0.0),
+    "fast": (0.15, 150.0),
+    "typical": (0.6, 60.0),
+    "slow": (2.0, 20.0),
+}
+
+_TOKEN_RE = re.compile(r"\S+\s*|\s+")
+
+app = FastAPI(title="OpenAI-compatible stand-in")
+app.state.ttft, app.state.tokens_per_second = PROFILES["instant"]
+app.state.error_rate = 0.0
+app.state.rng = random.Random(0)
+app.state.stats = {"requests": 0, "streamed": 0, "errors_injected": 0, "by_stage": {}}
+
+
+def _prompt(messages: list) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):  # content parts
+            content = " ".join(p.get("text", "") for p in content if isinstance(p, dict))
+        parts.append(str(content or ""))
+    return "\n".join(parts)
+
+
+def _chunk(completion_id: str, model: str, delta: dict, finish_reason=None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+@app.get("/v1/models")
+def models():
+    return {"object": "list", "data": [{"id": "stand-in", "object": "model", "owned_by": "local"}]}
+
+
+@app.get("/stats")
+def stats():
+    return app.state.stats
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    state = app.state
+    state.stats["requests"] += 1
+
+    if state.error_rate and state.rng.random() < state.error_rate:
+        state.stats["errors_injected"] += 1
+        status = state.rng.choice((429, 500, 503))
+        return JSONResponse(
+            status_code=status,
+            content={"error": {"message": f"Injected {status}", "type": "stand_in_error", "code": status}},
+            headers={"Retry-After": "1"} if status == 429 else None,
+        )
+
+    prompt = _prompt(body.get("messages", []))
+    stage = fake_llm.detect_stage(prompt)
+    state.stats["by_stage"][stage] = state.stats["by_stage"].get(stage, 0) + 1
+    text = fake_llm.respond(prompt, stage)
+    for stop in body.get("stop") or ():
+        if stop in text:
+            text = text[: text.index(stop)]
+    model = body.get("model", "stand-in")
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    usage = {
+        "prompt_tokens": fake_llm.count_tokens(prompt),
+        "completion_tokens": fake_llm.count_tokens(text),
+    }
+    usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+    token_delay = 1.0 / state.tokens_per_second if state.tokens_per_second else 0.0
+
+    if not body.get("stream"):
+        await asyncio.sleep(state.ttft + token_delay * usage["completion_tokens"])
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    state.stats["streamed"] += 1
+    include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+    async def events():
+        await asyncio.sleep(state.ttft)
+        yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+        for token in _TOKEN_RE.findall(text):
+            if token_delay:
+                await asyncio.sleep(token_delay * fake_llm.count_tokens(token))
+            yield _chunk(completion_id, model, {"content": token})
+        yield _chunk(completion_id, model, {}, finish_reason="stop")
+        if include_usage:
+            payload = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": model, "choices": [], "usage": usage,
+            }
+            yield f"data: {json.dumps(payload)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stand-in for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="typical")
+    parser.add_argument("--ttft", type=float, default=None, help="override: seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=None, help="override: output token rate")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 429/500/503")
+    args = parser.parse_args(argv)
+
+    ttft, tokens_per_second = PROFILES[args.profile]
+    app.state.ttft = ttft if args.ttft is None else args.ttft
+    app.state.tokens_per_second = tokens_per_second if args.tokens_per_second is None else args.tokens_per_second
+    app.state.error_rate = args.error_rate
+    fake_llm.configure(QUESTIONS, GRAPH_CODE)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
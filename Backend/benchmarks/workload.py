@@ -0,0 +1,92 @@
+"""
+Benchmark questions with the SQL the fake model answers for each of them.
+
+`kind` is "text" (sql_query / FullChain) or "chart" (graph_query). The SQL follows
+the rules of chains.sql_template and must pass src/sql_lint.py on the seeded schema.
+"""
+
+QUESTIONS = [
+    {
+        "kind": "text",
+        "question": "List all client emails.",
+        "sql": "SELECT email FROM clients ORDER BY email",
+    },
+    {
+        "kind": "text",
+        "question": "How many contracts are there per status?",
+        "sql": "SELECT status, COUNT(*) AS contracts FROM contrats GROUP BY status ORDER BY status",
+    },
+    {
+        "kind": "text",
+        "question": "What is the total claim amount per claim status?",
+        "sql": "SELECT status, SUM(amount) AS total_amount FROM claims GROUP BY status ORDER BY status",
+    },
+    {
+        "kind": "text",
+        "question": "Which 10 agents manage the most clients?",
+        "sql": (
+            "SELECT a.name, COUNT(c.id) AS clients FROM agents a "
+            "JOIN clients c ON c.agent_id = a.id GROUP BY a.id, a.name "
+            "ORDER BY clients DESC, a.name LIMIT 10"
+        ),
+    },
+    {
+        "kind": "text",
+        "question": "Show the active contracts of clients living in Paris with their premium.",
+        "sql": (
+            "SELECT c.name, k.product, k.premium FROM contrats k "
+            "JOIN clients c ON c.id = k.client_id "
+            "WHERE c.city = 'Paris' AND k.status = 'active' ORDER BY c.name, k.product"
+        ),
+    },
+    {
+        "kind": "chart",
+        "question": "Show a bar chart of the number of clients per city.",
+        "sql": "SELECT city, COUNT(*) AS clients FROM clients GROUP BY city ORDER BY city",
+    },
+    {
+        "kind": "chart",
+        "question": "Plot the monthly total premium of new contracts as a line chart.",
+        "sql": (
+            "SELECT month, total_premium FROM ("
+            "SELECT DATE_TRUNC('month', start_date) AS month, SUM(premium) AS total_premium "
+            "FROM contrats GROUP BY DATE_TRUNC('month', start_date)) AS monthly ORDER BY month"
+        ),
+    },
+    {
+        "kind": "chart",
+        "question": "Show a heatmap of claim counts by month and claim status.",
+        "sql": (
+            "SELECT month, status, claims FROM ("
+            "SELECT DATE_TRUNC('month', claim_date) AS month, status, COUNT(*) AS claims "
+            "FROM claims GROUP BY DATE_TRUNC('month', claim_date), status) AS counts "
+            "ORDER BY month, status"
+        ),
+    },
+]
+
+# Plotting code returned for charts the built-in templates do not cover (heatmap)
+GRAPH_CODE = """import matplotlib.pyplot as plt
+import pandas as pd
+
+labels = data.columns[0]
+values = [c for c in data.columns if pd.api.types.is_numeric_dtype(data[c])]
+if len(data.columns) == 3 and len(values) == 1:
+    pivot = data.pivot_table(index=data.columns[1], columns=labels, values=values[0], aggfunc="sum").fillna(0)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.imshow(pivot.to_numpy(), aspect="auto", cmap="viridis")
+    ax.set_yticks(range(len(pivot.index)))
+    ax.set_yticklabels([str(i) for i in pivot.index])
+else:
+    data.plot(x=labels, y=values, kind="bar", figsize=(10, 6))
+plt.title("Benchmark chart")
+plt.tight_layout()
+"""
+
+
+def text_questions() -> list:
+    return [q for q in QUESTIONS if q["kind"] == "text"]
+
+
+def chart_questions() -> list:
+    return [q for q in QUESTIONS if q["kind"] == "chart"]
@@ -0,0 +1,34 @@
+import os
+import pytest
+from sqlalchemy import create_engine
+
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+
+INSURANCE_DDL = [
+    "CREATE TABLE clients (id INTEGER PRIMARY KEY, nom TEXT, ville TEXT, email TEXT)",
+    "CREATE TABLE contrats (id INTEGER PRIMARY KEY, client_id INTEGER REFERENCES clients(id), "
+    "produit TEXT, prime NUMERIC, date_debut DATE)",
+    "CREATE TABLE sinistres (id INTEGER PRIMARY KEY, contrat_id INTEGER REFERENCES contrats(id), "
+    "montant NUMERIC, statut TEXT)",
+    "INSERT INTO clients VALUES (1, 'Ali', 'Tunis', 'ali@example.com'), (2, 'Sara', 'Sfax', 'sara@example.com')",
+    "INSERT INTO contrats VALUES (1, 1, 'auto', 120.5, '2024-01-01'), (2, 2, 'habitation', 300, '2024-02-01')",
+    "INSERT INTO sinistres VALUES (1, 1, 900, 'ouvert')",
+]
+
+
+@pytest.fixture
+def insurance_db(tmp_path, monkeypatch):
+    """SQLite stand-in for the insurance database, used as the default DB_URI."""
+    import src.config as config
+
+    uri = f"sqlite:///{tmp_path / 'insurance.db'}"
+    engine = create_engine(uri)
+    with engine.begin() as conn:
+        for statement in INSURANCE_DDL:
+            conn.exec_driver_sql(statement)
+    engine.dispose()
+    monkeypatch.setattr(config, "DB_URI", uri)
+    monkeypatch.setattr(config, "DB_SCHEMA", "main")
+    yield uri
+    from src.database import reset_engine
+    reset_engine(uri)
@@ -1,18 +1,10 @@
 """
 Agent setup for insurance contract management chatbot.
 """
-from langchain.agents import create_react_agent, AgentExecutor
-from langchain.memory import ConversationBufferMemory
 from langchain.prompts import PromptTemplate
-from langchain.chains.router import MultiPromptChain
-from langchain.chains.router.llm_router import LLMRouterChain, RouterOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
-from src.tools import tools
-from src.chains import full_chain
-from langchain_openai import OpenAI
-from langchain_openai import ChatOpenAI
-from src.config import OPENROUTER_API_KEY, OPENROUTER_API_BASE, LLM_MODEL
-from src.database import get_full_table_info
+from src.config import MEMORY_MAX_TOKENS, MEMORY_WINDOW_TURNS, MEMORY_FOLD_BATCH, MEMORY_MAX_MESSAGE_TOKENS
+from src.memory import TokenBudgetMemory
+from src.schema_index import get_relevant_schema
 from src.llm import llm   # instead of defining llm here
 from src.tools import tools
 # llm = ChatOpenAI(
@@ -50,8 +42,8 @@ from src.tools import tools
 
 # Correct prompt for create_react_agent, including required variables {tools} and {tool_names}
 REACT_PROMPT = PromptTemplate(
-    input_variables=["input", "history", "agent_scratchpad", "tools", "tool_names"],
-    partial_variables={"schema": lambda: get_full_table_info()},
+    # {schema} comes from build_agent_inputs (only the tables relevant to the question)
+    input_variables=["input", "history", "schema", "agent_scratchpad", "tools", "tool_names"],
     template="""
 You are a database chatbot for insurance contracts.
 
@@ -157,7 +149,24 @@ AI: {agent_scratchpad}
 )
 
 
-memory = ConversationBufferMemory(memory_key="history", return_messages=True)
+def new_memory():
+    """Fresh token-budgeted conversation memory; every session gets its own."""
+    # input_key is explicit because agent inputs also carry the per-question "schema"
+    return TokenBudgetMemory(
+        llm=llm,
+        memory_key="history",
+        input_key="input",
+        output_key="output",  # executor also returns intermediate_steps
+        max_tokens=MEMORY_MAX_TOKENS,
+        window_turns=MEMORY_WINDOW_TURNS,
+        fold_batch=MEMORY_FOLD_BATCH,
+        max_message_tokens=MEMORY_MAX_MESSAGE_TOKENS,
+    )
+
+
+def build_agent_inputs(user_input: str) -> dict:
+    """Agent inputs with the schema narrowed to the tables relevant to the question."""
+    return {"input": user_input, "schema": get_relevant_schema(user_input)}
 
 # decider_chain = MultiPromptChain(
 #     router_chain=router_chain,
@@ -165,14 +174,17 @@ memory = ConversationBufferMemory(memory_key="history", return_messages=True)
 #     default_chain=full_chain,
 #     silent_errors=True
 # )
-def get_agent_executor():
-    """Create and return a ReAct agent executor with memory and decider chain."""
+def get_agent_executor(memory=None):
+    """Create and return a ReAct agent executor with its own memory."""
+    from langchain.agents import create_react_agent, AgentExecutor  # deferred: heavy, first session only
+
     agent = create_react_agent(llm=llm, tools=tools, prompt=REACT_PROMPT)
     return AgentExecutor(
         agent=agent,
         tools=tools,
-        memory=memory,
+        memory=memory if memory is not None else new_memory(),
         verbose=True,
         handle_parsing_errors=True,
         max_iterations=2,
+        return_intermediate_steps=True,  # lets /chat find graph artifact ids
     )
\ No newline at end of file
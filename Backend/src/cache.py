@@ -0,0 +1,103 @@
+"""
+Small thread-safe LRU/TTL cache with hit/miss counters and optional JSON persistence.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """LRU cache with optional per-entry TTL (seconds) and on-disk JSON snapshot."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = None, path: str = None, name: str = "cache"):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.name = name
+        self._data = OrderedDict()  # key -> (expires_at or None, value)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path:
+            self._load()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        self._save()
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        if entry is not None:
+            self._save()
+        return entry[1] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        self._save()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    # -----------------------
+    # Persistence
+    # -----------------------
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, expires_at, value in items[-self.max_entries:]:
+            if expires_at is None or expires_at > now:
+                self._data[key] = (expires_at, value)
+
+    def _save(self):
+        if not self.path:
+            return
+        with self._lock:
+            items = [[key, expires_at, value] for key, (expires_at, value) in self._data.items()]
+        tmp_path = f"{self.path}.tmp"
+        with self._save_lock:
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(items, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"[WARN] Could not persist {self.name} to {self.path}: {e}")
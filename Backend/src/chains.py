@@ -1,16 +1,28 @@
 from functools import lru_cache
 import re
-import psycopg
+from typing import TYPE_CHECKING
 from pydantic import PrivateAttr
 from langchain.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
 from langchain.schema import BaseOutputParser
+from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.runnables import RunnableSequence
-from langchain_openai import ChatOpenAI  # Use ChatOpenAI instead of OpenAI
-from src.database import get_db, get_full_table_info
+from src.database import get_schema_fingerprint
+from src.result_cache import fetch_result
+from src.formatting import format_rows, format_sample, needs_llm
+from src.metrics import token_usage_handler, timer, observe_rows, SQL_GUARD_REJECTIONS
+from src.sql_guard import SQLGuardError, check_read_only
+from src.sql_lint import check_sql, lint_sql, describe_issues
+from src.schema_index import get_relevant_schema
 from src.config import LLM_MODEL, OPENROUTER_API_KEY, OPENROUTER_API_BASE
-import pandas as pd
-from sqlalchemy import create_engine, text
-from src.config import DB_URI
+from src.config import SQL_CACHE_MAX_ENTRIES, SQL_CACHE_TTL, SQL_CACHE_PATH, ANSWER_FORMAT_MODE
+from src.config import GRAPH_CODE_CACHE_MAX_ENTRIES, GRAPH_CODE_CACHE_TTL, GRAPH_CODE_CACHE_PATH
+from src.config import SQL_LINT_REPAIR_ATTEMPTS, LLM_REQUEST_TIMEOUT
+from src.resilience import resilient
+from src.cache import LRUCache
+from src.streaming import emit_event, SQL_GENERATION_TAG, ANSWER_FORMATTING_TAG, GRAPH_CODE_TAG
+
+if TYPE_CHECKING:
+    import pandas as pd  # imported on first use (run_query1) to keep it out of startup
 
 # -------------------------------
 # FinalAnswerParser
@@ -34,17 +46,23 @@ class FinalAnswerParser(BaseOutputParser):
 
 
 # -------------------------------
-# Initialize LLM and DB
+# Initialize LLM (databases are bound per session, see src/database.py)
 # -------------------------------
-llm = ChatOpenAI(
-    model_name=LLM_MODEL,  # Should be set to "moonshot/kimi" or similar in src.config
-    openai_api_key=OPENROUTER_API_KEY,
-    openai_api_base=OPENROUTER_API_BASE,
-    temperature=0,
-)
-
+def _build_llm():
+    from langchain_openai import ChatOpenAI  # Use ChatOpenAI instead of OpenAI (imported on the first call)
+
+    return ChatOpenAI(
+        model_name=LLM_MODEL,  # Should be set to "moonshot/kimi" or similar in src.config
+        openai_api_key=OPENROUTER_API_KEY,
+        openai_api_base=OPENROUTER_API_BASE,
+        temperature=0,
+        streaming=True,  # invoke() still returns the full message; tokens reach callbacks as they arrive
+        stream_usage=True,
+        timeout=LLM_REQUEST_TIMEOUT,
+        max_retries=0,  # retries are done by the wrapper, with backoff and the circuit breaker
+    )
 
-db = get_db()
+llm = resilient(_build_llm, breaker_name=OPENROUTER_API_BASE, callbacks=[token_usage_handler])
 
 # -------------------------------
 # Custom output parser
@@ -58,36 +76,44 @@ class StrOutputParser(BaseOutputParser):
 # -------------------------------
 @lru_cache(maxsize=100)
 def validate_sql(query: str) -> str:
-    forbidden = ["DROP", "DELETE", "UPDATE", "INSERT", "ALTER"]
-    if any(word in query.upper() for word in forbidden):
-        raise ValueError("Only SELECT queries are allowed")
-    return query
+    """Single read-only statement check (token based); raises SQLGuardError."""
+    return check_read_only(query)
 
-def run_query(query: str):
+def run_query_result(query: str):
+    """Validate and execute `query`, returning the (cached) QueryResult with column names.
+
+    Execution runs read-only with a statement timeout after an EXPLAIN cost check
+    (see src/sql_guard.py); rejections raise SQLGuardError.
+    """
     try:
         validate_sql(query)
-        conn_str = getattr(db, "dsn", db) if isinstance(db, str) or hasattr(db, "dsn") else None
-        if not conn_str:
-            raise ValueError("Invalid database object format")
-        with psycopg.connect(conn_str) as conn:
-            with conn.cursor() as cur:
-                cur.execute(query)
-                return cur.fetchall()
+        check_sql(query)  # catalog lint: no round trip for SQL that cannot run
+        return fetch_result(query)
+    except SQLGuardError as e:
+        SQL_GUARD_REJECTIONS.inc(code=e.code)
+        emit_event("sql_error", e.to_dict())
+        raise
+
+def run_query(query: str):
+    try:
+        return list(run_query_result(query).rows)
     except Exception as e:
         return f"Error executing query: {str(e)}"
 
-def run_query1(query: str) -> pd.DataFrame:
-    """Run SQL and return results as a pandas DataFrame (for plotting) using SQLAlchemy engine."""
+def run_query1(query: str) -> "pd.DataFrame":
+    """Run SQL and return results as a pandas DataFrame (for plotting) using the pooled engine."""
+    import pandas as pd
+
     try:
-        validate_sql(query)  # keep your validation
-        engine = create_engine(DB_URI)  # use the same URI as get_full_table_info()
-        with engine.connect() as conn:
-            result = conn.execute(text(query))
-            rows = result.mappings().all()  # list of dicts
-            if not rows:
-                return pd.DataFrame()  # empty DataFrame signals no data
-            df = pd.DataFrame(rows)
-            return df
+        result = run_query_result(query)  # shared with run_query through the result cache
+        if result.truncated:
+            print(f"[VERBOSE] Graph data truncated {result.summary()}")
+        if not result.row_count:
+            return pd.DataFrame()  # empty DataFrame signals no data
+        # Columnar build with dtypes from the Postgres column types (no per-row records)
+        return result.to_dataframe()
+    except SQLGuardError:
+        raise  # retrying cannot help: let the caller report the structured error
     except Exception as e:
         print(f"[ERROR] Failed to execute SQL: {e}")
         return pd.DataFrame()  # empty DataFrame signals failure
@@ -150,6 +176,67 @@ Generate a **single, fully PostgreSQL-compliant SQL query** that satisfies the u
 
 sql_prompt = ChatPromptTemplate.from_template(sql_template)
 
+sql_repair_template = """The SQL query above cannot run against the schema:
+{issues}
+
+Return only the corrected PostgreSQL query, following the same rules."""
+
+# -------------------------------
+# Question -> SQL cache
+# -------------------------------
+sql_cache = LRUCache(
+    max_entries=SQL_CACHE_MAX_ENTRIES,
+    ttl=SQL_CACHE_TTL,
+    path=SQL_CACHE_PATH or None,
+    name="sql_cache",
+)
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return " ".join(question.lower().split()).rstrip(" ?!.;")
+
+def sql_cache_key(question: str) -> str:
+    return f"{get_schema_fingerprint()}:{normalize_question(question)}"
+
+def generate_sql(question: str, model=None) -> tuple:
+    """Return (sql, cache_key), calling the LLM only on a cache miss."""
+    try:
+        key = sql_cache_key(question)
+    except Exception:
+        key = None  # catalog unavailable: generate without caching
+    query = sql_cache.get(key) if key else None
+    if query is not None:
+        print(f"[Verbose] SQL cache hit for: {question}")
+        return query, key
+
+    prompt_value = sql_prompt.format_prompt(
+        question=question,
+        schema=get_relevant_schema(question)  # Only the tables relevant to the question
+    )
+    with timer("sql_generation"):
+        query_response = (model or llm).invoke(prompt_value, config={"tags": [SQL_GENERATION_TAG]})
+    query = getattr(query_response, "content", query_response).strip()
+
+    # Lint locally and let the LLM fix precise errors before anything reaches the database
+    issues = lint_sql(query)
+    for _ in range(SQL_LINT_REPAIR_ATTEMPTS if issues else 0):
+        print(f"[Verbose] SQL lint issues, asking for a correction: {issues}")
+        emit_event("sql_lint", {"query": query, "issues": issues})
+        messages = prompt_value.to_messages() + [
+            AIMessage(content=query),
+            HumanMessage(content=sql_repair_template.format(issues=describe_issues(issues))),
+        ]
+        with timer("sql_generation"):
+            query_response = (model or llm).invoke(messages, config={"tags": [SQL_GENERATION_TAG]})
+        query = getattr(query_response, "content", query_response).strip()
+        issues = lint_sql(query)
+        if not issues:
+            break
+
+    if key and not issues:
+        sql_cache.set(key, query)
+    return query, key
+
 # -------------------------------
 # Response generation chain
 # -------------------------------
@@ -191,41 +278,62 @@ class FullChain:
                 print("[Verbose] No question provided")
             return {"output": "Error: no question provided"}
 
-        schema_info = get_full_table_info()
-        # if self.verbose:
-        #     print(f"[Verbose] Retrieved schema info:\n{schema_info}\n")
-
-        # Format prompt for ChatOpenAI
-        prompt_value = self.sql_prompt.format_prompt(
-            question=question,
-            schema=schema_info  # Use the cached schema info
-        )
-        # if self.verbose:
-        #     print(f"[Verbose] Formatted prompt:\n{prompt_value}\n")
-
-        # Generate SQL query using LLM
-        query_response = self.llm.invoke(prompt_value)
-        query = query_response.content.strip()  # Extract the content
+        # Generate SQL query using LLM (or the question -> SQL cache)
+        query, cache_key = generate_sql(question, self.llm)
         # if self.verbose:
         #     print(f"[Verbose] Generated SQL query:\n{query}\n")
+        emit_event("sql", {"query": query})
 
         # Execute SQL query
-        sql_response = run_query(query)
+        error = None
+        try:
+            result = run_query_result(query)
+            sql_response = list(result.rows)
+        except Exception as e:
+            result = None
+            error = e.to_dict() if isinstance(e, SQLGuardError) else None
+            sql_response = f"Error executing query: {str(e)}"
+        if isinstance(sql_response, str) and cache_key:
+            sql_cache.pop(cache_key)  # don't keep SQL that failed to execute
+        row_count = len(sql_response) if isinstance(sql_response, list) else 0
+        emit_event("rows", {"count": row_count})
+        observe_rows("text", row_count)
         if self.verbose:
             print(f"[Verbose] SQL query response:\n{sql_response}\n")
 
-        # Combine input for response chain
+        # Fast path: render the rows locally unless the result needs summarizing
+        if result is not None and not needs_llm(result.columns, result.rows):
+            with timer("answer_formatting"):
+                answer = format_rows(result.columns, result.rows)
+                if result.truncated:
+                    answer = f"{answer}\n{result.summary()}"
+            if self.verbose:
+                print(f"[Verbose] Final formatted answer (local):\n{answer}\n")
+            return {"output": answer}
+        if error is not None:
+            # Guard rejections are reported as-is; an LLM rewording would hide the reason
+            return {"output": sql_response, "error": error}
+        if result is None and ANSWER_FORMAT_MODE == "local":
+            return {"output": sql_response}
+
+        # Combine input for response chain: a bounded sample of the rows, never the whole result
+        if result is not None:
+            sql_response = format_sample(result.columns, result.rows, total_rows=result.total_text)
         combined_input = (
-            f"Schema: {schema_info}\n"
             f"Question: {question}\n"
             f"SQL Query: {query}\n"
             f"SQL Response: {sql_response}"
         )
+        if result is not None and result.truncated:
+            combined_input += f"\nNote: the response is truncated {result.summary()}"
         if self.verbose:
             print(f"[Verbose] Combined input for final response:\n{combined_input}\n")
 
         # Format final answer
-        answer = self._response_chain.invoke({"input": combined_input})
+        with timer("answer_formatting"):
+            answer = self._response_chain.invoke(
+                {"input": combined_input}, config={"tags": [ANSWER_FORMATTING_TAG]}
+            )
         if self.verbose:
             print(f"[Verbose] Final formatted answer:\n{answer}\n")
 
@@ -253,7 +361,7 @@ Include:
 - Do NOT redefine 'data' or convert list of dicts
 - Do NOT include markdown, code fences, or annotations
 - Use the column names exactly as they appear in 'data'
-- Available columns: {columns}
+- Available columns (name: dtype): {columns}
 - IMPORTANT: 
   * When creating a stackplot with multiple numeric series (columns), unpack each numeric series as a separate argument using '*' to avoid blank graphs. 
   * When creating a Sankey diagram (multi-node flows), use Plotly Sankey (plotly.graph_objects) instead of matplotlib.sankey to avoid shape mismatches. Do not change this behavior for other chart types.
@@ -263,4 +371,33 @@ Question: {question}
 Generated Python code (no markdown):
 """
 graph_code_prompt = ChatPromptTemplate.from_template(graph_code_template)
-graph_code_chain = RunnableSequence(graph_code_prompt, llm, StrOutputParser())
+graph_code_chain = RunnableSequence(graph_code_prompt, llm, StrOutputParser()).with_config(
+    tags=[GRAPH_CODE_TAG]
+)
+
+# -------------------------------
+# Plotting code cache
+# -------------------------------
+graph_code_cache = LRUCache(
+    max_entries=GRAPH_CODE_CACHE_MAX_ENTRIES,
+    ttl=GRAPH_CODE_CACHE_TTL,
+    path=GRAPH_CODE_CACHE_PATH or None,
+    name="graph_code_cache",
+)
+
+def describe_columns(data: "pd.DataFrame") -> str:
+    """DataFrame schema for the graph prompt: column names and dtypes, never the rows."""
+    return ", ".join(f"{column}: {dtype}" for column, dtype in data.dtypes.items())
+
+def generate_graph_code(question: str, data: "pd.DataFrame") -> tuple:
+    """Return (plotting code, cache_key); the LLM is called only for a new question/result shape."""
+    columns = describe_columns(data)
+    key = f"{normalize_question(question)}|{columns}"
+    code = graph_code_cache.get(key)
+    if code is not None:
+        print(f"[Verbose] Plotting code cache hit for: {question}")
+        return code, key
+    with timer("graph_codegen"):
+        code = graph_code_chain.invoke({"question": question, "columns": columns})
+    graph_code_cache.set(key, code)
+    return code, key
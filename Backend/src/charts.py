@@ -0,0 +1,175 @@
+"""
+Built-in chart templates for the common result shapes, rendered without LLM codegen.
+
+detect_chart() runs in the API process and only inspects dtypes; render_chart()
+runs inside a rendering worker (see src/rendering.py).
+"""
+import io
+import re
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd  # callers already hold a DataFrame; not imported at startup
+
+# Chart kinds the user may ask for explicitly, by keyword in the question
+_KIND_KEYWORDS = (
+    ("stacked", "stacked_bar"),
+    ("pie", "pie"),
+    ("donut", "pie"),
+    ("line", "line"),
+    ("histogram", "histogram"),
+    ("bar", "bar"),
+    ("column", "bar"),
+)
+# Requests the templates don't cover: always left to LLM codegen
+_UNSUPPORTED_KEYWORDS = ("heatmap", "scatter", "bubble", "sankey", "area", "box", "violin", "radar", "map")
+
+MAX_PIE_SLICES = 12
+
+
+def _requested_kind(question: str):
+    words = set(re.findall(r"[a-z]+", question.lower()))
+
+    def mentioned(keyword):
+        return keyword in words or f"{keyword}s" in words
+
+    if any(mentioned(k) for k in _UNSUPPORTED_KEYWORDS):
+        return "unsupported"
+    for keyword, kind in _KIND_KEYWORDS:
+        if mentioned(keyword):
+            return kind
+    return None
+
+
+def _is_numeric(series: "pd.Series") -> bool:
+    import pandas as pd
+    from pandas.api import types as ptypes
+
+    if ptypes.is_bool_dtype(series):
+        return False
+    if ptypes.is_numeric_dtype(series):
+        return True
+    if series.dtype == object:
+        # Postgres NUMERIC arrives as Decimal objects
+        converted = pd.to_numeric(series, errors="coerce")
+        return converted.notna().sum() == series.notna().sum() and series.notna().any()
+    return False
+
+
+def _is_date(series: "pd.Series") -> bool:
+    from pandas.api import types as ptypes
+
+    if ptypes.is_datetime64_any_dtype(series):
+        return True
+    if series.dtype == object:
+        sample = series.dropna().head(20)
+        return len(sample) > 0 and all(hasattr(v, "year") and hasattr(v, "month") for v in sample)
+    return False
+
+
+def detect_chart(question: str, data: "pd.DataFrame"):
+    """Return a chart spec dict for supported shapes, or None to fall back to LLM codegen."""
+    kind = _requested_kind(question or "")
+    if kind == "unsupported" or data.empty:
+        return None
+
+    numeric = [c for c in data.columns if _is_numeric(data[c])]
+    others = [c for c in data.columns if c not in numeric]
+    title = (question or "").strip().rstrip("?.! ")[:80]
+
+    # Single numeric column: only a histogram makes sense
+    if not others and len(numeric) == 1:
+        if kind in (None, "histogram"):
+            return {"kind": "histogram", "x": None, "y": numeric, "title": title}
+        return None
+
+    if len(others) != 1 or not numeric:
+        return None
+    label = others[0]
+
+    if kind == "histogram":
+        return None
+    if _is_date(data[label]):
+        # Date + numeric(s): line over time unless a bar chart was asked for
+        chosen = kind if kind in ("bar", "stacked_bar") else "line"
+        return {"kind": chosen, "x": label, "y": numeric, "title": title, "x_is_date": True}
+
+    if len(numeric) == 1:
+        chosen = kind if kind in ("bar", "pie", "line") else "bar"
+        return {"kind": chosen, "x": label, "y": numeric, "title": title}
+
+    # Label + several numeric columns
+    chosen = kind if kind in ("stacked_bar", "line", "bar") else "stacked_bar"
+    if chosen == "bar":
+        chosen = "grouped_bar"
+    return {"kind": chosen, "x": label, "y": numeric, "title": title}
+
+
+def render_chart(spec: dict, data: "pd.DataFrame", fmt: str = "png") -> bytes:
+    """Draw `spec` with vectorized matplotlib calls (executed in a rendering worker)."""
+    import numpy as np
+    import pandas as pd
+    import matplotlib.pyplot as plt
+
+    plt.close("all")
+    fig, ax = plt.subplots(figsize=(10, 6))
+    try:
+        values = data[spec["y"]].apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy(dtype=float)
+        kind = spec["kind"]
+
+        if kind == "histogram":
+            ax.hist(values[:, 0], bins="auto")
+            ax.set_xlabel(spec["y"][0])
+            ax.set_ylabel("Count")
+        else:
+            x = data[spec["x"]]
+            if spec.get("x_is_date"):
+                x = pd.to_datetime(x)
+                order = np.argsort(x.to_numpy())
+                x, values = x.to_numpy()[order], values[order]
+            else:
+                x = x.astype(str).to_numpy()
+
+            if kind == "pie":
+                y = values[:, 0]
+                if len(y) > MAX_PIE_SLICES:
+                    order = np.argsort(y)[::-1]
+                    keep, rest = order[: MAX_PIE_SLICES - 1], order[MAX_PIE_SLICES - 1:]
+                    x = np.append(x[keep], "Other")
+                    y = np.append(y[keep], y[rest].sum())
+                ax.pie(y, labels=x, autopct="%1.1f%%", startangle=90)
+                ax.axis("equal")
+            elif kind == "line":
+                lines = ax.plot(x, values, marker="o" if len(x) <= 50 else None)
+                for line, column in zip(lines, spec["y"]):
+                    line.set_label(column)
+            elif kind == "stacked_bar":
+                bottoms = np.vstack([np.zeros(len(x)), np.cumsum(values, axis=1)[:, :-1].T]).T
+                for i, column in enumerate(spec["y"]):
+                    ax.bar(x, values[:, i], bottom=bottoms[:, i], label=column)
+            elif kind == "grouped_bar":
+                positions = np.arange(len(x))
+                width = 0.8 / len(spec["y"])
+                for i, column in enumerate(spec["y"]):
+                    ax.bar(positions + i * width - 0.4 + width / 2, values[:, i], width, label=column)
+                ax.set_xticks(positions)
+                ax.set_xticklabels(x)
+            else:  # bar
+                ax.bar(x, values[:, 0])
+
+            if kind != "pie":
+                ax.set_xlabel(spec["x"])
+                ax.set_ylabel(spec["y"][0] if len(spec["y"]) == 1 else "Value")
+                if len(spec["y"]) > 1:
+                    ax.legend()
+                if not spec.get("x_is_date") and len(x) > 6:
+                    plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
+                if spec.get("x_is_date"):
+                    fig.autofmt_xdate()
+
+        ax.set_title(spec["title"])
+        buf = io.BytesIO()
+        fig.savefig(buf, format=fmt, bbox_inches="tight")
+        return buf.getvalue()
+    finally:
+        plt.close("all")
@@ -1,91 +1,353 @@
-from sqlalchemy import create_engine, text, inspect
-from langchain_community.utilities import SQLDatabase
+import contextvars
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, text, inspect
 import src.config as config
-from functools import lru_cache
+from src.formatting import format_rows
+
+# -----------------------
+# Tenants
+# -----------------------
+# One Tenant per distinct DB URI: pooled engine, SQLDatabase and the cached
+# schema context (catalog, fingerprint, rendered schema, schema index). Every
+# query path borrows connections from here. Sessions only carry a URI, so
+# switching databases is a lookup; tenants unused for a while are disposed.
+_bound_uri = contextvars.ContextVar("bound_db_uri", default=None)
+
+def current_db_uri() -> str:
+    """URI bound to the running request (see bind_db), else the default DB_URI."""
+    return _bound_uri.get() or config.DB_URI
+
+@contextmanager
+def bind_db(uri: str = None):
+    """Run the enclosed block against `uri` (None keeps the default DB_URI)."""
+    token = _bound_uri.set(uri)
+    try:
+        yield
+    finally:
+        _bound_uri.reset(token)
+
+class Tenant:
+    """Engine, pool counters and schema context of one database."""
+
+    def __init__(self, uri: str):
+        self.uri = uri
+        self.engine = create_engine(
+            uri,
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+            pool_recycle=config.DB_POOL_RECYCLE,
+            pool_pre_ping=config.DB_POOL_PRE_PING,
+        )
+        self.counters = {"created": 0, "waiting": 0}
+        self.sql_database = None
+        self.schema_version = 0
+        self.cache = {}  # (name, schema_version) -> catalog, fingerprint, schema text, schema index
+        self.last_used = time.monotonic()
+        counters = self.counters
+
+        @event.listens_for(self.engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            counters["created"] += 1
+
+    def busy(self) -> bool:
+        pool = self.engine.pool
+        checked_out = pool.checkedout() if hasattr(pool, "checkedout") else 0
+        return checked_out > 0 or self.counters["waiting"] > 0
+
+    def clear(self):
+        """Invalidate the cached schema context."""
+        self.schema_version += 1
+        self.cache.clear()
+
+    def cached(self, name: str, build):
+        """Return cache[name] for the current schema version, building it on a miss."""
+        key = (name, self.schema_version)
+        value = self.cache.get(key)
+        if value is None:
+            value = build()
+            with _registry_lock:
+                # Only store if no invalidation happened while building
+                if key[1] == self.schema_version:
+                    self.cache[key] = value
+        return value
+
+    def url(self) -> str:
+        return self.engine.url.render_as_string(hide_password=True)
+
+class TenantRegistry:
+    """Keeps at most `max_tenants` databases open; idle and least recently used ones are disposed."""
+
+    def __init__(self, max_tenants: int, idle_timeout: float):
+        self.max_tenants = max_tenants
+        self.idle_timeout = idle_timeout
+        self._tenants = OrderedDict()  # uri -> Tenant, least recently used first
+        self.created = 0
+        self.evicted_lru = 0
+        self.evicted_idle = 0
+
+    def get(self, uri: str) -> Tenant:
+        now = time.monotonic()
+        with _registry_lock:
+            tenant = self._tenants.get(uri)
+            if tenant is None:
+                tenant = self._tenants[uri] = Tenant(uri)
+                self.created += 1
+            tenant.last_used = now
+            self._tenants.move_to_end(uri)
+            self._evict(now)
+        return tenant
+
+    def _evict(self, now: float):
+        # Busy tenants (connections checked out or awaited) are never disposed
+        for uri, tenant in list(self._tenants.items())[:-1]:
+            if now - tenant.last_used >= self.idle_timeout and not tenant.busy():
+                self._dispose(uri)
+                self.evicted_idle += 1
+        for uri, tenant in list(self._tenants.items())[:-1]:
+            if len(self._tenants) <= self.max_tenants:
+                break
+            if not tenant.busy():
+                self._dispose(uri)
+                self.evicted_lru += 1
+
+    def _dispose(self, uri: str):
+        tenant = self._tenants.pop(uri, None)
+        if tenant is not None:
+            tenant.engine.dispose()
+
+    def remove(self, uri: str = None):
+        """Dispose the tenant for `uri`, or every tenant if no URI is given."""
+        with _registry_lock:
+            for key in [uri] if uri else list(self._tenants):
+                self._dispose(key)
+
+    def tenants(self) -> list:
+        with _registry_lock:
+            return list(self._tenants.values())
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._tenants),
+            "max_tenants": self.max_tenants,
+            "created": self.created,
+            "evicted_lru": self.evicted_lru,
+            "evicted_idle": self.evicted_idle,
+            "databases": [t.url() for t in self.tenants()],
+        }
+
+_registry_lock = threading.RLock()
+tenants = TenantRegistry(config.DB_MAX_TENANTS, config.DB_TENANT_IDLE_TIMEOUT)
+
+def get_tenant(uri: str = None) -> Tenant:
+    """Return the tenant for `uri` (defaults to the bound / default URI)."""
+    return tenants.get(uri or current_db_uri())
 
 # -----------------------
 # Engine management
 # -----------------------
-_engine = None
+def get_engine(uri: str = None):
+    """Return the pooled SQLAlchemy engine for `uri` (defaults to the current database)."""
+    return get_tenant(uri).engine
 
-def get_engine():
-    """Return a SQLAlchemy engine for current DB_URI."""
-    global _engine
-    if _engine is None:
-        _engine = create_engine(config.DB_URI)
-    return _engine
+def reset_engine(uri: str = None):
+    """Dispose the pool for `uri`, or every pool if no URI is given."""
+    tenants.remove(uri)
 
-def reset_engine():
-    """Clear cached engine so next call creates new one."""
-    global _engine
-    _engine = None
+@contextmanager
+def connection(uri: str = None):
+    """Borrow a pooled connection, tracking callers waiting for one."""
+    tenant = get_tenant(uri)
+    counters = tenant.counters
+    counters["waiting"] += 1
+    try:
+        conn = tenant.engine.connect()
+    finally:
+        counters["waiting"] -= 1
+    with conn:
+        yield conn
+
+def pool_stats() -> dict:
+    """Per-URI pool usage (URIs are reported without credentials)."""
+    stats = {}
+    for tenant in tenants.tenants():
+        pool = tenant.engine.pool
+        stats[tenant.url()] = {
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+            "waiting": tenant.counters.get("waiting", 0),
+            "created": tenant.counters.get("created", 0),
+        }
+    return stats
 
 # -----------------------
 # Database access
 # -----------------------
-def get_db():
-    """Return a SQLDatabase instance using current engine."""
-    return SQLDatabase(get_engine())
+def get_db(uri: str = None):
+    """Return a SQLDatabase bound to the pooled engine (reflected once per URI)."""
+    from langchain_community.utilities import SQLDatabase  # only for callers that still want it
+
+    tenant = get_tenant(uri)
+    if tenant.sql_database is None:
+        tenant.sql_database = SQLDatabase(tenant.engine)
+    return tenant.sql_database
 
-@lru_cache(maxsize=1)
 def get_schema(_=None):
     """Return full DB schema with caching."""
     return get_full_table_info()
 
-def clear_schema_cache():
-    """Clear cached schema."""
-    get_schema.cache_clear()
-
 # -----------------------
-# Fetch full table info
+# Schema context cache
 # -----------------------
-def get_full_table_info():
-    try:
-        engine = get_engine()
-        info_str = ""
-        inspector = inspect(engine)
+# The catalog (DDL + a few sample rows per table) and its rendered prompt
+# string are cached per tenant and schema version. clear_schema_cache()
+# bumps the version of one database (or all of them).
+def get_schema_version() -> int:
+    """Return the current database's schema version (bumped on every invalidation)."""
+    return get_tenant().schema_version
+
+def clear_schema_cache(uri: str = None):
+    """Invalidate cached catalog and rendered schema for `uri`, or for all databases."""
+    with _registry_lock:
+        for tenant in [get_tenant(uri)] if uri else tenants.tenants():
+            tenant.clear()
+
+def _truncate(value, max_chars: int) -> str:
+    value = str(value)
+    if len(value) > max_chars:
+        return value[:max_chars] + "..."
+    return value
+
+def _introspect_catalog(engine) -> list:
+    """Read table DDL, keys, row estimates and bounded sample rows."""
+    schema = config.DB_SCHEMA
+    sample_rows = max(config.SCHEMA_SAMPLE_ROWS, 0)
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    catalog = []
+
+    with engine.connect() as conn:
+        estimates = {}
+        if engine.dialect.name == "postgresql":
+            # Planner estimate from pg_class: no table scan needed
+            estimates = dict(conn.execute(text(
+                "SELECT c.relname, c.reltuples::bigint FROM pg_class c "
+                "JOIN pg_namespace n ON n.oid = c.relnamespace "
+                "WHERE n.nspname = :schema AND c.relkind = 'r'"
+            ), {"schema": schema}).all())
 
-        with engine.connect() as conn:
-            tables = inspector.get_table_names(schema='public')
+        for table in inspector.get_table_names(schema=schema):
+            columns = [
+                {"name": col["name"], "type": str(col["type"]), "nullable": col.get("nullable", True)}
+                for col in inspector.get_columns(table, schema=schema)
+            ]
+            primary_key = inspector.get_pk_constraint(table, schema=schema).get("constrained_columns") or []
+            foreign_keys = [
+                {
+                    "columns": fk["constrained_columns"],
+                    "referred_table": fk["referred_table"],
+                    "referred_columns": fk["referred_columns"],
+                }
+                for fk in inspector.get_foreign_keys(table, schema=schema)
+            ]
 
-            for table in tables:
-                columns_info = inspector.get_columns(table, schema='public')
-                columns = [col['name'] for col in columns_info]
-                types = [col['type'] for col in columns_info]
+            rows = []
+            if sample_rows:
+                rows = conn.execute(
+                    text(f"SELECT * FROM {quote(schema)}.{quote(table)} LIMIT :n"),
+                    {"n": sample_rows},
+                ).mappings().all()
+                rows = [
+                    {c["name"]: _truncate(row[c["name"]], config.SCHEMA_SAMPLE_MAX_CHARS) for c in columns}
+                    for row in rows
+                ]
 
-                info_str += f"\nCREATE TABLE {table} (\n"
-                for col_name, col_type in zip(columns, types):
-                    info_str += f"    {col_name} {col_type},\n"
-                info_str = info_str.rstrip(",\n") + "\n)\n\n"
+            catalog.append({
+                "name": table,
+                "columns": columns,
+                "primary_key": primary_key,
+                "foreign_keys": foreign_keys,
+                "row_estimate": estimates.get(table),
+                "sample_rows": rows,
+            })
 
-                rows = conn.execute(text(f"SELECT * FROM {table};")).mappings().all()
-                if not rows:
-                    info_str += "/* 0 rows */\n"
-                    continue
+    return catalog
 
-                info_str += f"/* {len(rows)} rows from {table} table: */\n"
-                info_str += "\t".join([f"{c} ({t})" for c, t in zip(columns, types)]) + "\n"
-                for row in rows:
-                    info_str += "\t".join(str(row[c]) for c in columns) + "\n"
-                info_str += "\n"
+def get_catalog() -> list:
+    """Return the cached structured catalog for the current database."""
+    tenant = get_tenant()
+    return tenant.cached("catalog", lambda: _introspect_catalog(tenant.engine))
 
-        return info_str
+def get_schema_fingerprint() -> str:
+    """Stable hash of the DDL (tables, columns, types, keys) of the current database."""
+    def build():
+        ddl = [
+            [t["name"], [[c["name"], c["type"]] for c in t["columns"]], t["primary_key"], t["foreign_keys"]]
+            for t in get_catalog()
+        ]
+        return hashlib.sha256(json.dumps(ddl, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return get_tenant().cached("fingerprint", build)
 
+def render_schema(catalog: list, tables=None) -> str:
+    """Render catalog entries (optionally only `tables`) as prompt text."""
+    wanted = set(tables) if tables is not None else None
+    info_str = ""
+    for table in catalog:
+        if wanted is not None and table["name"] not in wanted:
+            continue
+        columns = [c["name"] for c in table["columns"]]
+        types = [c["type"] for c in table["columns"]]
+
+        info_str += f"\nCREATE TABLE {table['name']} (\n"
+        for col_name, col_type in zip(columns, types):
+            info_str += f"    {col_name} {col_type},\n"
+        if table["primary_key"]:
+            info_str += f"    PRIMARY KEY ({', '.join(table['primary_key'])}),\n"
+        for fk in table["foreign_keys"]:
+            info_str += (
+                f"    FOREIGN KEY ({', '.join(fk['columns'])}) REFERENCES "
+                f"{fk['referred_table']}({', '.join(fk['referred_columns'])}),\n"
+            )
+        info_str = info_str.rstrip(",\n") + "\n)\n\n"
+
+        if table["row_estimate"] is not None and table["row_estimate"] >= 0:
+            info_str += f"/* ~{table['row_estimate']} rows in {table['name']} table */\n"
+
+        rows = table["sample_rows"]
+        if not rows:
+            continue
+        info_str += f"/* {len(rows)} sample rows from {table['name']} table: */\n"
+        info_str += "\t".join([f"{c} ({t})" for c, t in zip(columns, types)]) + "\n"
+        for row in rows:
+            info_str += "\t".join(row[c] for c in columns) + "\n"
+        info_str += "\n"
+    return info_str
+
+# -----------------------
+# Fetch full table info
+# -----------------------
+def get_full_table_info():
+    """Return the rendered schema context, cached per database and schema version."""
+    try:
+        return get_tenant().cached("schema_text", lambda: render_schema(get_catalog()))
     except Exception as e:
+        # Errors are not cached so the next turn retries introspection
         return f"Error getting full table info: {e}"
 
 # -----------------------
 # Execute query
 # -----------------------
 def execute_query(query: str, schema: str = "insurance") -> str:
-    db = get_db()
     try:
-        results = db.run(query)
-        if isinstance(results, list):
-            return "\n".join(
-                " - ".join(str(v) for v in row.values()) if isinstance(row, dict) else str(row)
-                for row in results
-            )
-        return str(results)
+        with connection() as conn:
+            cursor = conn.exec_driver_sql(query)
+            return format_rows(list(cursor.keys()), cursor.fetchall())
     except Exception as e:
         return f"Error executing query: {e}"
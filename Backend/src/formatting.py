@@ -0,0 +1,71 @@
+"""
+Deterministic rendering of SQL results into plain-text answers (no LLM call).
+"""
+import src.config as config
+from src.memory import compact_text
+
+LOCAL = "local"
+LLM = "llm"
+AUTO = "auto"
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.2f}".rstrip("0").rstrip(".") if value != int(value) else str(int(value))
+    return str(value)
+
+
+def format_rows(columns, rows) -> str:
+    """Render rows as a plain list (one column) or an aligned plain-text table."""
+    columns = list(columns)
+    if not rows:
+        return "No data found."
+
+    if len(columns) == 1:
+        if len(rows) == 1:
+            return _cell(rows[0][0])
+        return "\n".join(f"- {_cell(row[0])}" for row in rows)
+
+    cells = [[_cell(v) for v in row] for row in rows]
+    widths = [
+        max(len(str(col)), *(len(r[i]) for r in cells))
+        for i, col in enumerate(columns)
+    ]
+    lines = [
+        " | ".join(str(col).ljust(w) for col, w in zip(columns, widths)).rstrip(),
+        "-+-".join("-" * w for w in widths),
+    ]
+    lines += [" | ".join(v.ljust(w) for v, w in zip(r, widths)).rstrip() for r in cells]
+    return "\n".join(lines)
+
+
+def needs_llm(columns, rows, mode: str = None) -> bool:
+    """Whether the answer should go through the response LLM instead of local formatting."""
+    mode = (mode or config.ANSWER_FORMAT_MODE).lower()
+    if mode == LLM:
+        return True
+    if mode == LOCAL:
+        return False
+    # auto: only results too large or too wide to read as-is get summarized
+    if len(rows) > config.ANSWER_LOCAL_MAX_ROWS or len(columns) > config.ANSWER_LOCAL_MAX_COLUMNS:
+        return True
+    return any(
+        isinstance(v, str) and len(v) > config.ANSWER_LOCAL_MAX_CELL_CHARS
+        for row in rows for v in row
+    )
+
+
+def format_sample(columns, rows, total_rows=None, max_rows: int = None, max_tokens: int = None) -> str:
+    """Leading rows of a result for the response prompt, bounded by row count and tokens.
+
+    `total_rows` is the size of the full result when known (rows may already be a truncated fetch).
+    """
+    max_rows = config.ANSWER_LLM_MAX_ROWS if max_rows is None else max_rows
+    max_tokens = config.ANSWER_LLM_MAX_TOKENS if max_tokens is None else max_tokens
+    text = compact_text(format_rows(columns, rows[:max_rows]), max_tokens)
+    if len(rows) > max_rows:
+        total = total_rows if total_rows is not None else f"more than {len(rows)}"
+        text += f"\n(first {max_rows} of {total} rows)"
+    return text
@@ -1,4 +1,6 @@
-from langchain_openai import ChatOpenAI
+from src.metrics import token_usage_handler
+from src.resilience import resilient
+from src.config import LLM_REQUEST_TIMEOUT
 import os
 from dotenv import load_dotenv
 
@@ -12,10 +14,19 @@ model = os.getenv("LLM_MODEL") or "gpt-4o-mini"
 if not api_key:
     raise ValueError("No API key found. Please set OPENROUTER_API_KEY or OPENAI_API_KEY in .env")
 
-llm = ChatOpenAI(
-    model_name=model,
-    openai_api_key=api_key.strip(),   # strip whitespace just in case
-    openai_api_base=api_base,
-    temperature=0,  # Set temperature to 0 for deterministic responses
+def _build_llm():
+    from langchain_openai import ChatOpenAI  # heavy import, deferred to the first LLM call
 
-)
+    return ChatOpenAI(
+        model_name=model,
+        openai_api_key=api_key.strip(),   # strip whitespace just in case
+        openai_api_base=api_base,
+        temperature=0,  # Set temperature to 0 for deterministic responses
+        streaming=True,  # Lets /chat/stream forward tokens; invoke() still returns the full message
+        stream_usage=True,  # Token usage on streamed responses, recorded for /metrics
+        timeout=LLM_REQUEST_TIMEOUT,
+        max_retries=0,
+    )
+
+# Built on first use; timeouts, retries, circuit breaking and coalescing are handled by the resilient() wrapper
+llm = resilient(_build_llm, breaker_name=api_base, callbacks=[token_usage_handler])
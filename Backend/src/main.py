@@ -33,16 +33,32 @@
 #         return {"session_id": request.session_id, "result": output}
 #     except Exception as e:
 #         raise HTTPException(status_code=500, detail=str(e))
-from fastapi import FastAPI, HTTPException
+from src import startup  # first: startup phases are timed from here
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
-from src.agents import get_agent_executor
-from src.config import set_db_uri
-from src.database import reset_engine, clear_schema_cache
+from fastapi.responses import FileResponse, StreamingResponse, Response
+startup.mark("import_framework")
+from src.agents import get_agent_executor, build_agent_inputs
+from src.router import route, run_routed
+from src.config import (
+    set_db_uri, CHAT_MAX_CONCURRENCY, CHAT_MAX_QUEUE, CHAT_QUEUE_TIMEOUT,
+    MAX_SESSIONS, SESSION_IDLE_TIMEOUT, MAX_SESSION_BINDINGS, LLM_BREAKER_COOLDOWN, STARTUP_IMPORT_BUDGET,
+)
+from src.database import bind_db, clear_schema_cache, get_engine, pool_stats, tenants
+from src.workers import WorkerPool, PoolSaturated
+from src.resilience import LLMUnavailable, resilience_stats
+from src.sessions import SessionStore
+from src.chains import sql_cache, graph_code_cache
+from src.result_cache import result_cache
+from src.streaming import SSECallbackHandler, format_sse
+from src.rendering import render_pool, get_artifact, latest_artifact_id, artifact_store
+from src import metrics
+import asyncio
+from contextlib import nullcontext
 import os
+startup.mark("import_app")
 
 app = FastAPI(title="Insurance Chatbot Backend")
 
@@ -56,8 +72,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store executors per session
-sessions = {}
+# Store executors per session (bounded, LRU + idle eviction)
+sessions = SessionStore(
+    max_sessions=MAX_SESSIONS, idle_timeout=SESSION_IDLE_TIMEOUT, max_bindings=MAX_SESSION_BINDINGS,
+)
+
+# Agent runs are blocking (LLM + SQL + plotting): execute them in worker threads
+agent_pool = WorkerPool(
+    max_workers=CHAT_MAX_CONCURRENCY,
+    max_queue=CHAT_MAX_QUEUE,
+    queue_timeout=CHAT_QUEUE_TIMEOUT,
+    name="agent",
+)
 
 class QueryRequest(BaseModel):
     session_id: str
@@ -70,13 +96,10 @@ class DBUpdateRequest(BaseModel):
     new_db_uri: str
 
 def get_or_create_executor(session_id: str):
-    if session_id not in sessions:
-        sessions[session_id] = get_agent_executor()
-    return sessions[session_id]
+    return sessions.get_or_create(session_id, get_agent_executor)
 
-# Static files / graph
+# Legacy graph file (charts are now served from memory via /graph/{artifact_id})
 backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-app.mount("/static", StaticFiles(directory=backend_root), name="static")
 graph_path = os.path.join(backend_root, "graph.png")
 
 # -----------------------
@@ -87,25 +110,20 @@ async def update_db_uri(request: DBUpdateRequest, session_id: Optional[str] = "u
     if not request.new_db_uri:
         raise HTTPException(status_code=400, detail="No DB URI provided")
 
-    # 1️⃣ Update DB URI
-    set_db_uri(request.new_db_uri)
-
-    # 2️⃣ Reset engine and schema cache
-    reset_engine()
-    clear_schema_cache()
+    # 1️⃣ Register the database (pool + schema context are shared by every session using it)
+    get_engine(request.new_db_uri)
+    # Setting a URI (again) reloads its schema: tables may have changed since it was cached
+    clear_schema_cache(request.new_db_uri)
 
-    # 3️⃣ Reinitialize only the session specified (or all if None)
     if session_id:
-        # Ensure session exists before clearing
-        if session_id not in sessions:
-            sessions[session_id] = get_agent_executor()
-        else:
-            sessions[session_id].memory.clear()
-            sessions[session_id] = get_agent_executor()
+        # 2️⃣ Bind only this session; other sessions keep their database, pools and caches
+        executor = sessions.get_or_create(session_id, get_agent_executor)
+        if sessions.db_uri(session_id) != request.new_db_uri:
+            executor.memory.clear()  # the history refers to the previous database
+        sessions.bind_db(session_id, request.new_db_uri)
     else:
-        # optional: reinit all sessions
-        for sid in list(sessions.keys()):
-            sessions[sid] = get_agent_executor()
+        # No session: change the default database used by sessions without a binding
+        set_db_uri(request.new_db_uri)
 
     return {"message": "DB_URI updated successfully", "DB_URI": request.new_db_uri}
 
@@ -116,23 +134,207 @@ async def log_requests(request, call_next):
     return response
 
 
+def artifact_response(request: Request, artifact_id: str, cache_control: str):
+    """Serve an artifact with a strong ETag (its content hash), answering 304 on a match."""
+    artifact = get_artifact(artifact_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Graph not found")
+    etag = f'"{artifact_id}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    content, media_type = artifact
+    return Response(content, media_type=media_type, headers=headers)
+
 @app.get("/graph")
-def get_graph():
+def get_graph(request: Request):
+    """Most recently rendered chart (kept for older clients; prefer /graph/{artifact_id})."""
+    artifact_id = latest_artifact_id()
+    if artifact_id:
+        # The latest chart changes: browsers must revalidate, which costs a 304 at most
+        return artifact_response(request, artifact_id, "no-cache")
     if os.path.exists(graph_path):
         return FileResponse(graph_path)
     raise HTTPException(status_code=404, detail="Graph not found")
 
+@app.get("/graph/{artifact_id}")
+def get_graph_artifact(request: Request, artifact_id: str):
+    # Content-addressed: the bytes behind an id never change
+    return artifact_response(request, artifact_id, "public, max-age=31536000, immutable")
+
+@app.on_event("startup")
+def warm_render_pool():
+    with startup.phase("startup_hooks"):
+        render_pool.warm()  # starts the worker processes; matplotlib loads there, not here
+    print(f"[INFO] Startup took {startup.summary()}", flush=True)
+    imports = startup.report()["phases"]
+    imported = imports.get("import_framework", 0) + imports.get("import_app", 0)
+    if imported > STARTUP_IMPORT_BUDGET:
+        print(f"[WARN] Imports took {imported:.2f}s, over the {STARTUP_IMPORT_BUDGET:.2f}s budget", flush=True)
+
+@app.on_event("shutdown")
+def shutdown_pool():
+    agent_pool.shutdown()
+    render_pool.shutdown()
+
+@app.get("/queue")
+def queue_stats():
+    return agent_pool.stats()
+
+@app.get("/session-stats")
+def session_stats():
+    return sessions.stats()
+
+@app.get("/session-stats/{session_id}")
+def session_memory_stats(session_id: str):
+    executor = sessions.get(session_id)
+    if executor is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session_id": session_id, "memory": executor.memory.stats()}
+
+@app.get("/pool-stats")
+def db_pool_stats():
+    return pool_stats()
+
+@app.get("/tenant-stats")
+def tenant_stats():
+    return tenants.stats()
+
+@app.get("/llm-stats")
+def llm_stats():
+    return resilience_stats()
+
+@app.get("/startup-stats")
+def startup_stats():
+    return startup.report()
+
+def _runtime_gauges():
+    queue = agent_pool.stats()
+    session = sessions.stats()
+    gauges = {
+        "chat_workers_running": queue["running"],
+        "chat_queue_depth": queue["queued"],
+        "chat_requests_rejected_total": queue["rejected"],
+        "chat_requests_timed_out_total": queue["timed_out"],
+        "chat_sessions_active": session["active"],
+        "chat_sessions_evicted_total": session["evicted_lru"] + session["evicted_idle"],
+        "sql_cache_hits_total": sql_cache.hits,
+        "sql_cache_misses_total": sql_cache.misses,
+        "result_cache_hits_total": result_cache.hits,
+        "result_cache_misses_total": result_cache.misses,
+        "result_cache_bytes": result_cache.bytes,
+    }
+    pools = pool_stats().values()
+    gauges["db_pool_checked_out"] = sum(p["checked_out"] or 0 for p in pools)
+    gauges["db_pool_waiting"] = sum(p["waiting"] for p in pools)
+    gauges["db_tenants_active"] = len(pools)
+    return gauges
+
+metrics.register_gauges(_runtime_gauges)
+metrics.register_gauges(startup.gauges)
+
+@app.get("/metrics")
+def get_metrics():
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache-stats")
+def cache_stats():
+    return {"sql": sql_cache.stats(), "results": result_cache.stats(), "graph_code": graph_code_cache.stats(), "graphs": artifact_store.stats()}
+
+def run_agent(executor, user_input: str, callbacks=None, db_uri: str = None, lock=None):
+    """Blocking agent turn, executed in a worker thread against the session's database.
+
+    Clear-cut questions are dispatched by the intent router without the agent's LLM step.
+    `lock` (the session's turn lock) makes concurrent turns of one session run one at a time.
+    """
+    with lock or nullcontext(), bind_db(db_uri):
+        tool_name, reason = route(user_input, executor.memory)
+        if tool_name is not None:
+            with metrics.timer("routed"):
+                return run_routed(tool_name, user_input, reason, executor.memory, callbacks)
+        inputs = build_agent_inputs(user_input)
+        with metrics.timer("agent"):
+            if callbacks:
+                return executor.invoke(inputs, config={"callbacks": callbacks})
+            return executor.invoke(inputs)
+
+def build_chat_response(session_id: str, result) -> dict:
+    """Chat payload; includes graph_url when the turn rendered a chart."""
+    output = result.get("output") if isinstance(result, dict) else str(result)
+    route_taken = result.get("route", "agent") if isinstance(result, dict) else "agent"
+    response = {"session_id": session_id, "result": output, "route": route_taken}
+    steps = result.get("intermediate_steps", []) if isinstance(result, dict) else []
+    for _, observation in reversed(steps):
+        if isinstance(observation, dict) and observation.get("artifact_id"):
+            response["graph_url"] = f"/graph/{observation['artifact_id']}"
+            break
+    for _, observation in reversed(steps):
+        if isinstance(observation, dict) and observation.get("error"):
+            response["error"] = observation["error"]  # structured SQL guard error
+            break
+    return response
+
 @app.post("/chat")
 async def chat(request: QueryRequest):
     executor = get_or_create_executor(request.session_id)
     try:
         # Normalize input
         user_input = " ".join(request.user_input.strip().split())
-        inputs = {"input": user_input}
 
-        result = executor.invoke(inputs)
-        output = result.get("output") if isinstance(result, dict) else str(result)
-        return {"session_id": request.session_id, "result": output}
+        with metrics.timer("chat"):
+            result = await agent_pool.run(
+                run_agent, executor, user_input, None, sessions.db_uri(request.session_id),
+                sessions.turn_lock(request.session_id),
+            )
+        return build_chat_response(request.session_id, result)
 
+    except PoolSaturated as e:
+        headers = {"Retry-After": "1"} if e.status_code == 429 else None
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=headers)
+    except LLMUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(LLM_BREAKER_COOLDOWN))})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: QueryRequest):
+    """Same as /chat, but streams agent steps, SQL, row counts and tokens as SSE."""
+    executor = get_or_create_executor(request.session_id)
+    user_input = " ".join(request.user_input.strip().split())
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    handler = SSECallbackHandler(loop, queue)
+
+    async def events():
+        db_uri = sessions.db_uri(request.session_id)
+        lock = sessions.turn_lock(request.session_id)
+        task = asyncio.ensure_future(agent_pool.run(run_agent, executor, user_input, [handler], db_uri, lock))
+        # Events from the worker thread are queued before the task completes, so None comes last
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            yield format_sse(*item)
+
+        try:
+            result = task.result()
+            yield format_sse("final", build_chat_response(request.session_id, result))
+        except PoolSaturated as e:
+            yield format_sse("error", {"status_code": e.status_code, "detail": str(e)})
+        except LLMUnavailable as e:
+            yield format_sse("error", {"status_code": 503, "detail": str(e)})
+        except Exception as e:
+            yield format_sse("error", {"status_code": 500, "detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+startup.mark("app_setup")
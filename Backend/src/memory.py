@@ -0,0 +1,129 @@
+"""
+Conversation memory with a fixed token budget: the last turns are kept verbatim,
+older turns are folded into an incrementally updated summary.
+"""
+from functools import lru_cache
+from typing import Any, Dict, List
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.memory.prompt import SUMMARY_PROMPT
+from langchain_core.messages import get_buffer_string
+from src.streaming import MEMORY_SUMMARY_TAG
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None  # tiktoken missing or encoding not downloadable: approximate
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when available, ~4 chars per token otherwise."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def compact_text(text: str, max_tokens: int, keep_tail: bool = False) -> str:
+    """Keep leading lines (trailing ones with `keep_tail`) of a bulky message within `max_tokens`."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    lines = text.splitlines()
+    kept, used = [], 0
+    for line in (reversed(lines) if keep_tail else lines):
+        cost = count_tokens(line) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    if not kept:
+        # A single huge line: cut by characters
+        if keep_tail:
+            return "[truncated ...] " + text[-max_tokens * 4:]
+        return text[: max_tokens * 4] + " [... truncated]"
+    if keep_tail:
+        return f"[... {len(lines) - len(kept)} earlier lines omitted]\n" + "\n".join(reversed(kept))
+    return "\n".join(kept) + f"\n[... {len(lines) - len(kept)} more lines omitted]"
+
+
+class TokenBudgetMemory(BaseChatMemory):
+    """Windowed chat memory that summarizes turns falling out of the window or the budget."""
+
+    llm: Any = None
+    memory_key: str = "history"
+    max_tokens: int = 1500
+    window_turns: int = 6
+    fold_batch: int = 4
+    max_message_tokens: int = 300
+    summary: str = ""
+    last_token_count: int = 0
+    summarized_turns: int = 0
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        history = get_buffer_string(self.chat_memory.messages)
+        if self.summary:
+            history = f"Summary of earlier conversation: {self.summary}\n{history}"
+        self.last_token_count = count_tokens(history)
+        return {self.memory_key: history}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        input_str, output_str = self._get_input_output(inputs, outputs)
+        self.chat_memory.add_user_message(compact_text(input_str, self.max_message_tokens))
+        self.chat_memory.add_ai_message(compact_text(output_str, self.max_message_tokens))
+        self._prune()
+
+    def _prune(self):
+        messages = self.chat_memory.messages
+        turns = len(messages) // 2
+        fold = turns - self.window_turns if turns >= self.window_turns + self.fold_batch else 0
+
+        # Fold more of the oldest turns while the verbatim part is over budget (keep the last turn)
+        budget = self.max_tokens - count_tokens(self.summary)
+        costs = [count_tokens(get_buffer_string(messages[i:i + 2])) for i in range(0, len(messages), 2)]
+        while fold < turns - 1 and sum(costs[fold:]) > budget:
+            fold += 1
+
+        if fold <= 0:
+            return
+        folded, kept = messages[: fold * 2], messages[fold * 2:]
+        self.summary = self._summarize(folded)
+        self.summarized_turns += fold
+        self.chat_memory.messages = kept
+
+    def _summarize(self, messages) -> str:
+        new_lines = get_buffer_string(messages)
+        summary = None
+        if self.llm is not None:
+            try:
+                prompt = SUMMARY_PROMPT.format(summary=self.summary, new_lines=new_lines)
+                response = self.llm.invoke(prompt, config={"tags": [MEMORY_SUMMARY_TAG]})
+                summary = getattr(response, "content", response).strip()
+            except Exception as e:
+                print(f"[WARN] Memory summarization failed, keeping extractive summary: {e}")
+        # The summary itself never takes more than half of the budget
+        if not summary:
+            # Extractive fallback: old summary then the folded turns; the most recent lines are kept
+            return compact_text(f"{self.summary}\n{new_lines}".strip(), self.max_tokens // 2, keep_tail=True)
+        return compact_text(summary, self.max_tokens // 2)
+
+    def clear(self) -> None:
+        super().clear()
+        self.summary = ""
+        self.last_token_count = 0
+        self.summarized_turns = 0
+
+    def stats(self) -> dict:
+        return {
+            "turns_verbatim": len(self.chat_memory.messages) // 2,
+            "turns_summarized": self.summarized_turns,
+            "summary_tokens": count_tokens(self.summary),
+            "last_prompt_tokens": self.last_token_count,
+            "max_tokens": self.max_tokens,
+        }
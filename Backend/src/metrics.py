@@ -0,0 +1,193 @@
+"""
+Minimal in-process metrics (counters and histograms) rendered in Prometheus text format.
+
+Recording is a lock + a few additions; all formatting work happens only when /metrics is scraped.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from langchain_core.callbacks import BaseCallbackHandler
+from src.streaming import STAGE_TAGS
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 100000)
+TOKEN_BUCKETS = (10, 50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for key, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _labels(self.labelnames + ("le",), key + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.labelnames + ("le",), key + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+# -----------------------
+# Pipeline metrics
+# -----------------------
+STAGE_SECONDS = Histogram(
+    "chat_stage_duration_seconds", "Duration of chat pipeline stages", ("stage",)
+)
+STAGE_ERRORS = Counter(
+    "chat_stage_errors_total", "Exceptions raised per chat pipeline stage", ("stage",)
+)
+LLM_TOKENS = Histogram(
+    "llm_tokens", "Tokens per LLM call", ("stage", "kind"), buckets=TOKEN_BUCKETS
+)
+LLM_TOKENS_TOTAL = Counter(
+    "llm_tokens_total", "Tokens consumed by LLM calls", ("stage", "kind")
+)
+ROWS_RETURNED = Histogram(
+    "sql_rows_returned", "Rows returned by generated SQL", ("path",), buckets=ROW_BUCKETS
+)
+ROUTER_DECISIONS = Counter(
+    "router_decisions_total", "Intent router outcomes (tool name, or agent)", ("route", "reason")
+)
+SQL_GUARD_REJECTIONS = Counter(
+    "sql_guard_rejections_total", "Generated SQL rejected or cancelled by the guard", ("code",)
+)
+
+_registry = [
+    STAGE_SECONDS, STAGE_ERRORS, LLM_TOKENS, LLM_TOKENS_TOTAL, ROWS_RETURNED, ROUTER_DECISIONS,
+    SQL_GUARD_REJECTIONS,
+]
+_gauge_collectors = []
+
+
+@contextmanager
+def timer(stage: str):
+    """Record the duration of the enclosed block under `stage`."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def observe_rows(path: str, count: int):
+    ROWS_RETURNED.observe(count, path=path)
+
+
+def register_gauges(collector):
+    """Register a callable returning {metric_name: value} evaluated at scrape time."""
+    _gauge_collectors.append(collector)
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collector in _gauge_collectors:
+        try:
+            values = collector()
+        except Exception as e:
+            print(f"[WARN] Metrics collector failed: {e}")
+            continue
+        for name, value in values.items():
+            if value is None:
+                continue
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class TokenUsageCallbackHandler(BaseCallbackHandler):
+    """Records prompt/completion tokens of every LLM call, labelled by pipeline stage tag."""
+
+    def __init__(self, stage_tags=()):
+        self.stage_tags = tuple(stage_tags)
+        self._stages = {}
+
+    def _on_start(self, run_id, tags):
+        self._stages[run_id] = next((t for t in (tags or []) if t in self.stage_tags), "agent")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, tags=None, **kwargs):
+        self._on_start(run_id, tags)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, **kwargs):
+        self._on_start(run_id, tags)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        stage = self._stages.pop(run_id, "agent")
+        usage = {}
+        try:
+            message = response.generations[0][0].message
+            metadata = getattr(message, "usage_metadata", None) or {}
+            usage = {"prompt": metadata.get("input_tokens"), "completion": metadata.get("output_tokens")}
+        except (AttributeError, IndexError):
+            pass
+        if not any(usage.values()):
+            token_usage = (response.llm_output or {}).get("token_usage") or {}
+            usage = {"prompt": token_usage.get("prompt_tokens"), "completion": token_usage.get("completion_tokens")}
+        for kind, value in usage.items():
+            if value:
+                LLM_TOKENS.observe(value, stage=stage, kind=kind)
+                LLM_TOKENS_TOTAL.inc(value, stage=stage, kind=kind)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._stages.pop(run_id, None)
+
+
+token_usage_handler = TokenUsageCallbackHandler(STAGE_TAGS)
@@ -0,0 +1,293 @@
+"""
+Chart rendering in a pool of pre-warmed worker processes.
+
+LLM-generated plotting code never runs in the API process: each job executes in
+a worker (matplotlib already imported, Agg backend) and returns the image bytes,
+which are kept in memory under a content-addressed artifact id. A job that runs
+past the timeout (or crashes) costs only its own worker, which is replaced.
+"""
+import hashlib
+import io
+import json
+import multiprocessing
+import queue
+import threading
+import time
+from collections import OrderedDict
+import src.config as config
+from src.charts import render_chart
+
+
+class RenderError(Exception):
+    """Raised when a chart job fails, times out or the worker pool breaks."""
+
+
+# -----------------------
+# Worker side
+# -----------------------
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # noqa: F401  (pre-import so jobs start warm)
+    import pandas  # noqa: F401
+
+
+def _worker_main(conn):
+    """Worker loop: acknowledge each job when it starts, then send (ok, result or exception)."""
+    _init_worker()
+    while True:
+        try:
+            fn, args = conn.recv()
+        except (EOFError, OSError):
+            return  # API side closed the pipe
+        conn.send(("started", None))
+        try:
+            reply = (True, fn(*args))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception as e:  # unpicklable result or exception
+            conn.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+def _render_job(code: str, data, fmt: str) -> bytes:
+    import matplotlib.pyplot as plt
+    import pandas as pd
+
+    plt.close("all")
+    local_vars = {
+        "plt": plt,
+        "pd": pd,
+        "data": data,
+        "filepath": io.BytesIO(),  # generated code may savefig here; the figure is saved below
+    }
+    try:
+        exec(code, local_vars)  # Use same dict for globals and locals
+        buf = io.BytesIO()
+        # Detect Plotly usage
+        if "go" in local_vars or "plotly" in code:
+            fig = local_vars.get("fig")
+            if fig is None or not hasattr(fig, "to_image"):
+                raise RuntimeError("Plotly code did not define a figure named 'fig'")
+            buf.write(fig.to_image(format=fmt))
+        else:
+            plt.gcf().savefig(buf, format=fmt, bbox_inches="tight")
+        return buf.getvalue()
+    finally:
+        plt.close("all")
+
+
+# -----------------------
+# API side
+# -----------------------
+class _Worker:
+    """One dedicated worker process and the pipe jobs go through."""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def call(self, fn, args, timeout: float):
+        self.conn.send((fn, args))
+        self.conn.recv()  # "started": queueing and worker start-up are not part of the timeout
+        if not self.conn.poll(timeout):
+            raise TimeoutError
+        return self.conn.recv()  # (ok, result or exception)
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class RenderPool:
+    """Worker processes for chart jobs; a job over its timeout gets its worker killed and replaced."""
+
+    def __init__(self, workers: int, timeout: float):
+        self.workers = workers
+        self.timeout = timeout
+        # spawn: workers don't inherit the API's threads, sockets or LLM clients
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        self._all = set()
+        self._lock = threading.Lock()
+        self.timeouts = 0
+        self.failures = 0
+
+    def _spawn(self) -> _Worker:
+        # Caller holds self._lock
+        worker = _Worker(self._context)
+        self._all.add(worker)
+        return worker
+
+    def _acquire(self) -> _Worker:
+        with self._lock:
+            if self._idle.empty() and len(self._all) < self.workers:
+                return self._spawn()
+        worker = self._idle.get()  # waiting here does not count towards the job timeout
+        if not worker.process.is_alive():
+            self._replace(worker)
+            return self._acquire()
+        return worker
+
+    def _replace(self, worker: _Worker):
+        """Kill `worker` and put a fresh one in its place; the other workers are not touched."""
+        worker.kill()
+        with self._lock:
+            self._all.discard(worker)
+            self._idle.put(self._spawn())
+
+    def warm(self):
+        """Start every worker now so the first chart does not pay the process + import cost."""
+        with self._lock:
+            while len(self._all) < self.workers:
+                self._idle.put(self._spawn())
+
+    def render(self, code: str, data, fmt: str = "png") -> bytes:
+        """Execute generated plotting code in a worker and return the image bytes."""
+        return self.run(_render_job, code, data, fmt)
+
+    def run(self, fn, *args) -> bytes:
+        """Run a picklable module-level rendering function in a worker, with the job timeout.
+
+        The timeout counts from the moment the worker starts the job, not from submission.
+        """
+        worker = self._acquire()
+        try:
+            ok, value = worker.call(fn, args, self.timeout)
+        except TimeoutError:
+            self.timeouts += 1
+            self._replace(worker)
+            raise RenderError(f"Chart rendering timed out after {self.timeout}s")
+        except (EOFError, OSError):
+            self.failures += 1
+            self._replace(worker)
+            raise RenderError("Chart worker crashed")
+        except BaseException:
+            self._replace(worker)  # unpicklable job, interrupt...: the pipe may be out of step
+            raise
+        self._idle.put(worker)
+        if not ok:
+            raise value  # the job's own exception; the worker is still usable
+        return value
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._all = list(self._all), set()
+        for worker in workers:
+            worker.kill()
+
+
+render_pool = RenderPool(workers=config.GRAPH_RENDER_WORKERS, timeout=config.GRAPH_RENDER_TIMEOUT)
+
+# -----------------------
+# Content-addressed artifacts
+# -----------------------
+def artifact_key(data, code: str, fmt: str = "png") -> str:
+    """Hash of (result data, plotting code or template spec, output format): identical charts share an id."""
+    import pandas as pd
+
+    digest = hashlib.sha256()
+    digest.update(repr([(str(c), str(t)) for c, t in data.dtypes.items()]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    digest.update(b"\0" + code.encode("utf-8") + b"\0" + fmt.encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+class ArtifactStore:
+    """In-memory artifacts bounded by total bytes and age (oldest evicted first)."""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._items = OrderedDict()  # artifact_id -> (created_at, content, media_type)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.latest_id = None
+
+    def _expire(self, now: float):
+        while self._items:
+            artifact_id, (created_at, content, _) = next(iter(self._items.items()))
+            if now - created_at < self.ttl and self.bytes <= self.max_bytes:
+                break
+            del self._items[artifact_id]
+            self.bytes -= len(content)
+            self.evictions += 1
+
+    def get(self, artifact_id: str):
+        with self._lock:
+            self._expire(time.monotonic())
+            item = self._items.get(artifact_id)
+            if item is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return item[1], item[2]
+
+    def put(self, artifact_id: str, content: bytes, media_type: str):
+        with self._lock:
+            old = self._items.pop(artifact_id, None)
+            if old is not None:
+                self.bytes -= len(old[1])
+            self._items[artifact_id] = (time.monotonic(), content, media_type)
+            self.bytes += len(content)
+            self.latest_id = artifact_id
+            self._expire(time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+            self.latest_id = None
+
+    def touch(self, artifact_id: str):
+        """Mark an existing artifact as the latest chart (for the legacy /graph endpoint)."""
+        self.latest_id = artifact_id
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._items),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+artifact_store = ArtifactStore(max_bytes=config.GRAPH_ARTIFACT_MAX_BYTES, ttl=config.GRAPH_ARTIFACT_TTL)
+
+
+def render_artifact(code: str, data, fmt: str = "png", spec: dict = None) -> str:
+    """Return the artifact id for this chart, rendering only if it is not cached.
+
+    With `spec`, the built-in template renderer (src/charts.py) is used instead of `code`.
+    """
+    if spec is not None:
+        code = "template:" + json.dumps(spec, sort_keys=True)
+    artifact_id = artifact_key(data, code, fmt)
+    if artifact_store.get(artifact_id) is not None:
+        artifact_store.touch(artifact_id)
+        return artifact_id
+    if spec is not None:
+        content = render_pool.run(render_chart, spec, data, fmt)
+    else:
+        content = render_pool.render(code, data, fmt)
+    artifact_store.put(artifact_id, content, f"image/{fmt}")
+    return artifact_id
+
+
+def get_artifact(artifact_id: str):
+    """Return (content, media_type) or None if unknown/evicted."""
+    return artifact_store.get(artifact_id)
+
+
+def latest_artifact_id():
+    return artifact_store.latest_id
@@ -0,0 +1,364 @@
+"""
+Resilience layer for LLM calls: single-flight coalescing, per-call deadlines,
+jittered exponential backoff on 429/5xx/timeouts and a circuit breaker.
+
+ResilientChatModel wraps a chat model (ChatOpenAI) and is used everywhere the
+pipeline talks to the provider: the agent's llm, chains.llm (FullChain and
+response_chain) and graph_code_chain.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import Any, Callable, Iterator, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage, message_chunk_to_message
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+import src.config as config
+from src.metrics import Counter, register_gauges, _registry
+
+
+class LLMUnavailable(RuntimeError):
+    """The provider is failing (circuit open) or the call missed its deadline."""
+
+
+LLM_CALLS = Counter(
+    "llm_calls_total", "LLM calls by outcome (ok, coalesced, retried, failed, rejected)", ("outcome",)
+)
+_registry.append(LLM_CALLS)
+
+
+# -----------------------
+# Circuit breaker
+# -----------------------
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failed calls; one trial call after `cooldown`."""
+
+    def __init__(self, name: str, failure_threshold: int, cooldown: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                remaining = self.cooldown - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    raise LLMUnavailable(f"LLM provider unavailable, retry in {remaining:.0f}s")
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._trial:
+                    raise LLMUnavailable("LLM provider unavailable, recovery check in progress")
+                self._trial = True
+
+    def record_success(self):
+        with self._lock:
+            self.state, self.failures, self._trial = "closed", 0, False
+
+    def release_trial(self):
+        """End a half-open trial that finished without an outcome; the next call runs a new one."""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opened += 1
+                    print(f"[WARN] LLM circuit '{self.name}' opened after {self.failures} failures")
+                self.state, self.opened_at, self._trial = "open", time.monotonic(), False
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures, "opened": self.opened}
+
+
+# -----------------------
+# Single-flight
+# -----------------------
+class _Flight:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Identical in-flight calls share one execution; followers wait for the leader's result."""
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def join(self, key: str):
+        """Return (flight, is_leader)."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def finish(self, key: str, flight: _Flight, result=None, error=None):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.result, flight.error = result, error
+        flight.event.set()
+
+    def wait(self, flight: _Flight, deadline: float):
+        if not flight.event.wait(timeout=max(0.0, deadline - time.monotonic())):
+            raise LLMUnavailable(f"LLM call exceeded its {config.LLM_DEADLINE:.0f}s deadline")
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._flights), "coalesced": self.coalesced}
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+_build_lock = threading.Lock()
+single_flight = SingleFlight()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """One breaker per provider (API base URL), shared by every model talking to it."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(
+                name, config.LLM_BREAKER_FAILURES, config.LLM_BREAKER_COOLDOWN
+            )
+        return breaker
+
+
+def _resilience_gauges() -> dict:
+    values = {"llm_inflight_calls": single_flight.stats()["in_flight"]}
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    values["llm_circuit_open"] = sum(1 for b in breakers if b.state != "closed")
+    return values
+
+
+register_gauges(_resilience_gauges)
+
+
+# -----------------------
+# Retry policy
+# -----------------------
+def _retry_after(error: Exception):
+    """(retryable, server-suggested delay or None) for a provider error."""
+    import openai  # already loaded by the client at this point
+
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, TimeoutError)):
+        return True, None
+    status = getattr(error, "status_code", None)
+    if status is None:
+        return False, None
+    if status in (408, 409, 429) or status >= 500:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            return True, float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return True, None
+    return False, None
+
+
+def _backoff(attempt: int, suggested=None) -> float:
+    # Full jitter; a Retry-After from the provider is honoured (within the cap)
+    if suggested is not None:
+        return min(suggested, config.LLM_BACKOFF_MAX)
+    return random.uniform(0, min(config.LLM_BACKOFF_MAX, config.LLM_BACKOFF_BASE * 2 ** attempt))
+
+
+def _flight_key(model: BaseChatModel, messages: List[BaseMessage], stop, kwargs) -> str:
+    identity = getattr(model, "model_name", None) or type(model).__name__
+    payload = [identity, [(m.type, m.content) for m in messages], stop, sorted(kwargs.items())]
+    return hashlib.sha256(json.dumps(payload, default=str).encode("utf-8")).hexdigest()
+
+
+def _as_chunk(result: ChatResult, usage: bool = True) -> ChatGenerationChunk:
+    message = result.generations[0].message
+    return ChatGenerationChunk(message=AIMessageChunk(
+        content=message.content,
+        usage_metadata=getattr(message, "usage_metadata", None) if usage else None,
+    ))
+
+
+def _merge(chunks: List[ChatGenerationChunk]) -> ChatResult:
+    merged = chunks[0]
+    for chunk in chunks[1:]:
+        merged += chunk
+    return ChatResult(generations=[ChatGeneration(message=message_chunk_to_message(merged.message))])
+
+
+# -----------------------
+# Wrapper model
+# -----------------------
+class ResilientChatModel(BaseChatModel):
+    """Chat model wrapper adding deadlines, retries, a circuit breaker and single-flight.
+
+    The wrapped model is either given (`inner`) or built by `factory` on the first call,
+    so constructing the wrapper does not import the provider client.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: Optional[BaseChatModel] = None
+    factory: Optional[Callable[[], BaseChatModel]] = None
+    breaker_name: str = "default"
+    streaming: bool = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "resilient"
+
+    def get_inner(self) -> BaseChatModel:
+        if self.inner is None:
+            with _build_lock:
+                if self.inner is None:
+                    self.inner = self.factory()
+        return self.inner
+
+    @property
+    def model_name(self) -> str:
+        inner = self.get_inner()
+        return getattr(inner, "model_name", type(inner).__name__)
+
+    def _inner_stream(self, messages, stop, run_manager, **kwargs) -> Iterator[ChatGenerationChunk]:
+        inner = self.get_inner()
+        if type(inner)._stream is BaseChatModel._stream:
+            # Models without streaming support: one chunk with the full answer
+            yield _as_chunk(inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs))
+            return
+        # No run_manager: the wrapper's _stream reports each token once, under its own run
+        yield from inner._stream(messages, stop=stop, **kwargs)
+
+    def _attempts(self, messages, stop, run_manager, deadline: float, **kwargs) -> Iterator[ChatGenerationChunk]:
+        """Stream from the provider, retrying failures that happen before the first token."""
+        breaker = get_breaker(self.breaker_name)
+        attempt = 0
+        while True:
+            breaker.before_call()
+            started_output = False
+            try:
+                for chunk in self._inner_stream(messages, stop, run_manager, **kwargs):
+                    if time.monotonic() > deadline:
+                        raise LLMUnavailable(f"LLM call exceeded its {config.LLM_DEADLINE:.0f}s deadline")
+                    started_output = True
+                    yield chunk
+                breaker.record_success()
+                return
+            except LLMUnavailable:
+                breaker.record_failure()
+                raise
+            except Exception as e:
+                retryable, suggested = _retry_after(e)
+                if retryable:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()  # the provider answered (e.g. a 400), it is not down
+                delay = _backoff(attempt, suggested)
+                if (not retryable or started_output or attempt >= config.LLM_MAX_RETRIES
+                        or time.monotonic() + delay >= deadline):
+                    raise
+                attempt += 1
+                LLM_CALLS.inc(outcome="retried")
+                print(f"[WARN] LLM call failed ({type(e).__name__}), retry {attempt} in {delay:.2f}s")
+                time.sleep(delay)
+            except BaseException:
+                # GeneratorExit (consumer stopped reading, e.g. client disconnect) or an interrupt:
+                # without an outcome a half-open trial would block the breaker forever
+                if started_output:
+                    breaker.record_success()  # tokens arrived: the provider is up
+                else:
+                    breaker.release_trial()
+                raise
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        # LangChain's stream() forwards tokens itself (no run_manager here); _generate passes one
+        for chunk in self._chunks(messages, stop, run_manager, **kwargs):
+            if run_manager is not None:
+                run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+
+    def _chunks(self, messages, stop, run_manager, **kwargs) -> Iterator[ChatGenerationChunk]:
+        deadline = time.monotonic() + config.LLM_DEADLINE
+        if not config.LLM_COALESCE:
+            yield from self._run(messages, stop, run_manager, deadline, None, None, **kwargs)
+            return
+        key = _flight_key(self.get_inner(), messages, stop, kwargs)
+        flight, leader = single_flight.join(key)
+        if not leader:
+            # Same prompt already in flight: share its answer (no tokens, no extra spend)
+            result = single_flight.wait(flight, deadline)
+            LLM_CALLS.inc(outcome="coalesced")
+            yield _as_chunk(result, usage=False)
+            return
+        yield from self._run(messages, stop, run_manager, deadline, key, flight, **kwargs)
+
+    def _run(self, messages, stop, run_manager, deadline, key, flight, **kwargs):
+        chunks, error, completed = [], None, False
+        try:
+            for chunk in self._attempts(messages, stop, run_manager, deadline, **kwargs):
+                chunks.append(chunk)
+                yield chunk
+            completed = True
+            LLM_CALLS.inc(outcome="ok")
+        except LLMUnavailable as e:
+            error = e
+            LLM_CALLS.inc(outcome="rejected")
+            raise
+        except Exception as e:
+            error = e
+            LLM_CALLS.inc(outcome="failed")
+            raise
+        finally:
+            if flight is not None:
+                if completed and chunks:
+                    single_flight.finish(key, flight, result=_merge(chunks))
+                else:
+                    # Failed or abandoned mid-stream: waiters get the error instead of a partial answer
+                    error = error or LLMUnavailable("LLM call was abandoned before completing")
+                    single_flight.finish(key, flight, error=error)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs) -> ChatResult:
+        # Like ChatOpenAI(streaming=True): invoke() still reports tokens to callbacks as they arrive
+        stream_tokens = self.streaming or self._should_stream(async_api=False, run_manager=run_manager, **kwargs)
+        chunks = self._stream(messages, stop=stop, run_manager=run_manager if stream_tokens else None, **kwargs)
+        return _merge(list(chunks))
+
+
+def resilient(model, breaker_name: str = None, callbacks=None) -> ResilientChatModel:
+    """Wrap a chat model, or a zero-argument function building one on first use.
+
+    Callbacks (e.g. token accounting) belong on the wrapper, not the inner model.
+    """
+    if isinstance(model, BaseChatModel):
+        name = breaker_name or getattr(model, "openai_api_base", None) or "default"
+        return ResilientChatModel(inner=model, breaker_name=str(name), callbacks=callbacks)
+    return ResilientChatModel(factory=model, breaker_name=str(breaker_name or "default"), callbacks=callbacks)
+
+
+def resilience_stats() -> dict:
+    with _breakers_lock:
+        breakers = {name: b.stats() for name, b in _breakers.items()}
+    return {"single_flight": single_flight.stats(), "breakers": breakers}
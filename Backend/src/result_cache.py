@@ -0,0 +1,390 @@
+"""
+Query result cache shared by run_query (text answers) and run_query1 (graph DataFrames).
+
+Entries are keyed by (DB URI, canonical SQL), bounded by an approximate byte
+budget, expire after a TTL, and are dropped per table as soon as Postgres
+modification counters (pg_stat_user_tables) show that a referenced table changed.
+"""
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+import src.config as config
+from src.database import connection, current_db_uri, get_catalog, get_engine
+from src.metrics import timer
+from src.sql_guard import guard_connection, translate_error
+
+_TOKEN_RE = re.compile(r'"([^"]+)"|([A-Za-z_][A-Za-z0-9_$]*)')
+_TRAILING_LIMIT_RE = re.compile(r"\bLIMIT\s+(\d+|ALL)(\s+OFFSET\s+\d+)?\s*$", re.IGNORECASE)
+
+
+def canonical_sql(query: str) -> str:
+    """Collapse whitespace and drop trailing semicolons so equivalent SQL shares a key."""
+    return " ".join(query.split()).rstrip("; ")
+
+
+def _strip_terminator(query: str) -> str:
+    # Line breaks are kept: collapsing them could pull SQL into a "--" comment
+    return query.strip().rstrip(";").rstrip()
+
+
+def bounded_sql(query: str, max_rows: int) -> str:
+    """Add or tighten a trailing LIMIT so at most max_rows + 1 rows (to detect truncation) are produced."""
+    sql = _strip_terminator(query)
+    match = _TRAILING_LIMIT_RE.search(sql)
+    if match:
+        # LIMIT ALL means no limit: replaced like any limit above the cap
+        if match.group(1).isdigit() and int(match.group(1)) <= max_rows + 1:
+            return sql
+        return sql[:match.start(1)] + str(max_rows + 1) + sql[match.end(1):]
+    if re.search(r"\bFETCH\s+(FIRST|NEXT)\b", sql, re.IGNORECASE):
+        return sql  # already bounded by the query; cursor caps still apply
+    # New line so a trailing "-- comment" cannot swallow the LIMIT
+    return f"{sql}\nLIMIT {max_rows + 1}"
+
+
+def referenced_tables(query: str) -> set:
+    """Known catalog tables mentioned in the query (best effort, identifier match)."""
+    try:
+        known = {t["name"] for t in get_catalog()}
+    except Exception:
+        return set()
+    names = set()
+    for quoted, bare in _TOKEN_RE.findall(query):
+        name = quoted or bare.lower()
+        if name in known:
+            names.add(name)
+    return names
+
+
+def _row_size(row) -> int:
+    return sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row)
+
+
+def _estimate_size(columns, values) -> int:
+    return sum(sys.getsizeof(c) for c in columns) + sum(
+        sys.getsizeof(column) + sum(sys.getsizeof(v) for v in column) for column in values
+    )
+
+
+# -----------------------
+# Postgres column types -> pandas dtypes
+# -----------------------
+# Keyed by type OID as reported in cursor.description (psycopg2)
+_PG_TYPE_KINDS = {
+    16: "bool",
+    20: "int", 21: "int", 23: "int", 26: "int",
+    700: "float", 701: "float", 1700: "float",  # NUMERIC is plotted as float64
+    1082: "datetime", 1114: "datetime", 1184: "datetime",
+    18: "text", 19: "text", 25: "text", 1042: "text", 1043: "text",
+}
+# Text columns whose distinct/total ratio is at or under this become categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+
+def _column_array(values: list, kind):
+    """Build one typed column from a list of Python values, without per-row objects."""
+    import numpy as np
+    import pandas as pd
+
+    nulls = values.count(None)
+    if kind == "int":
+        if nulls:
+            return pd.array(values, dtype="Int64")
+        return np.fromiter(values, dtype=np.int64, count=len(values))
+    if kind == "float":
+        return np.array(values, dtype=np.float64)  # None -> NaN, Decimal -> float
+    if kind == "bool":
+        return pd.array(values, dtype="boolean") if nulls else np.array(values, dtype=bool)
+    if kind == "datetime":
+        return pd.to_datetime(pd.Series(values, dtype=object))
+    if kind == "text":
+        distinct = len(set(values))
+        if len(values) and distinct <= len(values) * CATEGORY_MAX_RATIO:
+            return pd.Categorical(values)
+        return np.array(values, dtype=object)
+    # Unknown type (or non-Postgres driver): let pandas infer once for the whole column
+    return pd.Series(values, dtype=object).infer_objects()
+
+
+class QueryResult:
+    """Compact columnar result: column names plus one list of values per column.
+
+    `type_codes` are the driver's column type codes (Postgres OIDs) used to pick
+    dtypes in to_dataframe(). `truncated` is set when row/byte caps cut the
+    result; `total_rows` is the full row count when known (None otherwise), a
+    planner estimate when `total_estimated` is set.
+    """
+    __slots__ = (
+        "columns", "values", "type_codes", "size", "truncated", "total_rows", "total_estimated", "_rows", "_frame",
+    )
+
+    def __init__(self, columns, values, type_codes=None, truncated: bool = False, total_rows: int = None,
+                 size: int = None, total_estimated: bool = False):
+        self.columns = tuple(columns)
+        self.values = values
+        self.type_codes = tuple(type_codes) if type_codes else (None,) * len(self.columns)
+        self.truncated = truncated
+        self.total_rows = self.row_count if total_rows is None and not truncated else total_rows
+        self.total_estimated = total_estimated and self.total_rows is not None
+        self.size = size if size is not None else _estimate_size(self.columns, values)
+        self._rows = None
+        self._frame = None
+
+    @property
+    def row_count(self) -> int:
+        return len(self.values[0]) if self.values else 0
+
+    @property
+    def rows(self) -> list:
+        """Row tuples for the text path, built on first use."""
+        if self._rows is None:
+            self._rows = list(zip(*self.values)) if self.values else []
+        return self._rows
+
+    def to_dataframe(self):
+        """Typed DataFrame (built once per cached result); callers get a shallow copy."""
+        if self._frame is None:
+            import pandas as pd
+
+            kinds = [_PG_TYPE_KINDS.get(code) for code in self.type_codes]
+            frame = pd.DataFrame({i: _column_array(v, k) for i, (v, k) in enumerate(zip(self.values, kinds))})
+            frame.columns = list(self.columns)  # positional build keeps duplicate names
+            self._frame = frame
+        return self._frame.copy(deep=False)
+
+    def summary(self) -> str:
+        """'showing N of M rows' note for truncated results, empty otherwise."""
+        if not self.truncated:
+            return ""
+        return f"(showing {self.row_count} of {self.total_text} rows)"
+
+    @property
+    def total_text(self) -> str:
+        """Full row count for messages: exact, "about N" (planner estimate) or "more than N"."""
+        if self.total_rows is None:
+            return f"more than {self.row_count}"
+        return f"about {self.total_rows}" if self.total_estimated else str(self.total_rows)
+
+
+class ResultCache:
+    """Byte-bounded LRU of QueryResults with TTL and per-table invalidation."""
+
+    def __init__(self, max_bytes: int, ttl: float, stats_interval: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats_interval = stats_interval
+        self._entries = OrderedDict()  # key -> (expires_at, tables, versions, result)
+        self._by_table = defaultdict(set)  # (uri, table) -> keys
+        self._table_versions = {}  # uri -> (fetched_at, {table: version})
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # -----------------------
+    # Table change detection
+    # -----------------------
+    def _current_versions(self, uri: str) -> dict:
+        """Modification counters per table, refreshed at most every stats_interval seconds."""
+        cached = self._table_versions.get(uri)
+        if cached and time.monotonic() - cached[0] < self.stats_interval:
+            return cached[1]
+        versions = {}
+        if get_engine(uri).dialect.name == "postgresql":
+            with connection(uri) as conn:
+                for relname, ins, upd, dele, live in conn.exec_driver_sql(
+                    "SELECT relname, n_tup_ins, n_tup_upd, n_tup_del, n_live_tup FROM pg_stat_user_tables"
+                ):
+                    versions[relname] = (ins, upd, dele, live)
+        self._table_versions[uri] = (time.monotonic(), versions)
+        self._invalidate_changed(uri, versions)
+        return versions
+
+    def _invalidate_changed(self, uri: str, versions: dict):
+        with self._lock:
+            stale = set()
+            for key, (_, tables, snapshot, _) in self._entries.items():
+                if key[0] != uri:
+                    continue
+                for table in tables:
+                    if versions.get(table) != snapshot.get(table):
+                        stale.update(self._by_table[(uri, table)])
+            for key in stale:
+                self._drop(key)
+                self.invalidations += 1
+
+    # -----------------------
+    # Cache operations
+    # -----------------------
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.bytes -= entry[3].size
+        for table in entry[1]:
+            self._by_table[(key[0], table)].discard(key)
+
+    def get(self, uri: str, query: str):
+        key = (uri, canonical_sql(query))
+        try:
+            self._current_versions(uri)
+        except Exception:
+            pass  # stats unavailable: rely on TTL only
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[3]
+
+    def put(self, uri: str, query: str, result: QueryResult):
+        # A single result may not take more than a quarter of the budget
+        if result.size > self.max_bytes // 4:
+            return
+        key = (uri, canonical_sql(query))
+        tables = referenced_tables(query)
+        try:
+            versions = self._current_versions(uri)
+        except Exception:
+            versions = {}
+        snapshot = {t: versions.get(t) for t in tables}
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, tables, snapshot, result)
+            self.bytes += result.size
+            for table in tables:
+                self._by_table[(uri, table)].add(key)
+            while self.bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_table(self, uri: str, table: str):
+        with self._lock:
+            for key in list(self._by_table.get((uri, table), ())):
+                self._drop(key)
+                self.invalidations += 1
+
+    def clear(self, uri: str = None):
+        with self._lock:
+            for key in [k for k in self._entries if uri is None or k[0] == uri]:
+                self._drop(key)
+            if uri is None:
+                self._table_versions.clear()
+            else:
+                self._table_versions.pop(uri, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+result_cache = ResultCache(
+    max_bytes=config.RESULT_CACHE_MAX_BYTES,
+    ttl=config.RESULT_CACHE_TTL,
+    stats_interval=config.RESULT_CACHE_STATS_INTERVAL,
+)
+
+
+def _type_codes(cursor):
+    description = getattr(getattr(cursor, "cursor", None), "description", None) or ()
+    return [getattr(d, "type_code", d[1]) for d in description]
+
+
+def _fetch_bounded(conn, query: str, max_rows: int, max_bytes: int) -> QueryResult:
+    """Stream batches through a server-side cursor straight into per-column lists, up to the caps."""
+    batch_size = config.RESULT_FETCH_BATCH
+    sql = bounded_sql(query, max_rows)
+    estimate = guard_connection(conn, sql)  # read-only + statement_timeout + EXPLAIN limits
+    cursor = conn.execution_options(stream_results=True, max_row_buffer=batch_size).exec_driver_sql(sql)
+    columns = list(cursor.keys())
+    values = [[] for _ in columns]
+    type_codes = None
+    count, size, truncated = 0, 0, False
+    try:
+        while not truncated:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            if type_codes is None:
+                # Named (server-side) cursors only describe their columns after the first fetch
+                type_codes = _type_codes(cursor)
+            if len(batch) > max_rows - count:
+                batch, truncated = batch[: max_rows - count], True
+            batch_bytes = sum(_row_size(row) for row in batch)
+            if size + batch_bytes > max_bytes:
+                # Trim the batch to the byte budget row by row
+                kept = 0
+                for row in batch:
+                    size += _row_size(row)
+                    kept += 1
+                    if size >= max_bytes:
+                        break
+                batch = batch[:kept]
+                truncated = True
+            else:
+                size += batch_bytes
+            if batch:
+                for column, batch_column in zip(values, zip(*batch)):
+                    column.extend(batch_column)
+                count += len(batch)
+            if count >= max_rows and not truncated:
+                # bounded_sql asked for one row past the cap: anything left means truncation
+                truncated = bool(cursor.fetchmany(1))
+                break
+    finally:
+        cursor.close()
+
+    total_rows, estimated = None, False
+    if truncated and config.RESULT_EXACT_TOTAL:
+        # Runs the full query: only for deployments that accept the cost of an exact total
+        total_rows = conn.exec_driver_sql(
+            f"SELECT count(*) FROM ({_strip_terminator(query)}\n) AS _counted"
+        ).scalar()
+    elif truncated and estimate is not None:
+        total_rows, estimated = _estimated_total(query, estimate, count), True
+    return QueryResult(
+        columns, values, type_codes=type_codes, truncated=truncated, total_rows=total_rows,
+        total_estimated=estimated,
+    )
+
+
+def _estimated_total(query: str, estimate: dict, fetched: int) -> int:
+    """Planner row estimate for the unbounded query, within what the query's own LIMIT and the fetch allow."""
+    total = int(estimate["unbounded_rows"])
+    match = _TRAILING_LIMIT_RE.search(_strip_terminator(query))
+    if match and match.group(1).isdigit():
+        total = min(total, int(match.group(1)))
+    return max(total, fetched + 1)
+
+
+def fetch_result(query: str, uri: str = None) -> QueryResult:
+    """Execute `query` on the pooled engine (bounded), serving repeated SQL from the result cache."""
+    uri = uri or current_db_uri()
+    cached = result_cache.get(uri, query)
+    if cached is not None:
+        return cached
+    try:
+        with timer("sql_execution"), connection(uri) as conn:
+            result = _fetch_bounded(conn, query, config.RESULT_MAX_ROWS, config.RESULT_MAX_BYTES)
+    except Exception as e:
+        error = translate_error(e)
+        if error is e:
+            raise
+        raise error from e
+    result_cache.put(uri, query, result)
+    return result
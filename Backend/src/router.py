@@ -0,0 +1,95 @@
+"""
+Deterministic intent router placed in front of the ReAct agent.
+
+The agent prompt already picks tools by keyword (graph_query only when the
+question says chart/graph/plot/heatmap/histogram, sql_query otherwise). Clear
+cases are dispatched straight to the tool, saving the agent's Thought/Action LLM
+call; anything ambiguous (follow-ups, clarification answers, small talk, no
+schema match) still goes through the agent.
+"""
+import re
+import uuid
+from langchain_core.agents import AgentAction
+import src.config as config
+from src.metrics import ROUTER_DECISIONS
+from src.schema_index import get_schema_index
+from src.tools import sql_tool, generate_graph_tool
+
+GRAPH_KEYWORDS = ("chart", "graph", "plot", "heatmap", "histogram")
+# Graph words that do not ask for a graph ("without a chart", "no plot")
+_NEGATED_GRAPH_RE = re.compile(r"\b(no|not|without|instead of)\s+(an?\s+|the\s+|any\s+)?(" + "|".join(GRAPH_KEYWORDS) + r")", re.IGNORECASE)
+# Openers of follow-ups that only make sense with the conversation history
+_FOLLOW_UP_RE = re.compile(
+    r"^(and|also|what about|how about|same|again|now|then|ok|okay|yes|no)\b"
+    r"|\b(those|these|them|that one|the same|previous|above|last one|instead)\b",
+    re.IGNORECASE,
+)
+_SMALL_TALK_RE = re.compile(r"^(hi|hello|hey|thanks|thank you|bye|goodbye|help)\b", re.IGNORECASE)
+_WORD_RE = re.compile(r"[a-z]+")
+
+ROUTE_SQL = "sql_query"
+ROUTE_GRAPH = "graph_query"
+
+
+def _mentions_graph(question: str) -> bool:
+    words = set(_WORD_RE.findall(question.lower()))
+    return any(k in words or f"{k}s" in words for k in GRAPH_KEYWORDS)
+
+
+def _awaiting_clarification(memory) -> bool:
+    """True when the agent's last message asked the user a question."""
+    messages = getattr(getattr(memory, "chat_memory", None), "messages", None) or []
+    return bool(messages) and messages[-1].type == "ai" and str(messages[-1].content).rstrip().endswith("?")
+
+
+def route(question: str, memory=None):
+    """Return (tool_name or None, reason); None means "let the agent decide"."""
+    tool_name, reason = _route(question, memory)
+    ROUTER_DECISIONS.inc(route=tool_name or "agent", reason=reason)
+    return tool_name, reason
+
+
+def _route(question: str, memory=None):
+    if not config.ROUTER_ENABLED:
+        return None, "disabled"
+    question = (question or "").strip()
+    if len(question.split()) < config.ROUTER_MIN_WORDS or _SMALL_TALK_RE.search(question):
+        return None, "too short"
+    history = getattr(getattr(memory, "chat_memory", None), "messages", None)
+    if history and (_awaiting_clarification(memory) or _FOLLOW_UP_RE.search(question)):
+        return None, "needs history"
+    if _NEGATED_GRAPH_RE.search(question):
+        return None, "negated graph keyword"
+
+    try:
+        scores = get_schema_index().score(question)
+    except Exception:
+        return None, "schema unavailable"
+    if not scores or max(scores.values()) < config.ROUTER_MIN_SCORE:
+        return None, "no schema match"
+
+    if _mentions_graph(question):
+        return ROUTE_GRAPH, "graph keyword"
+    return ROUTE_SQL, "schema match"
+
+
+_ROUTED_TOOLS = {ROUTE_SQL: sql_tool, ROUTE_GRAPH: generate_graph_tool}
+
+
+def run_routed(tool_name: str, question: str, reason: str = "", memory=None, callbacks=None) -> dict:
+    """Run the chosen tool directly and return an AgentExecutor-shaped result.
+
+    The turn is saved to `memory` like an agent turn, so later agent calls see it.
+    """
+    action = AgentAction(tool=tool_name, tool_input=question, log=f"Routed without agent: {reason}")
+    for handler in callbacks or []:
+        # Same "step" event an agent turn would produce for streaming clients
+        handler.on_agent_action(action, run_id=uuid.uuid4())
+    observation = _ROUTED_TOOLS[tool_name].invoke(question, config={"callbacks": callbacks} if callbacks else None)
+
+    output = observation.get("output", str(observation)) if isinstance(observation, dict) else str(observation)
+    if tool_name == ROUTE_GRAPH and isinstance(observation, dict) and observation.get("artifact_id"):
+        output = f'Here is the chart of "{question.rstrip("?.! ")}".'
+    if memory is not None:
+        memory.save_context({"input": question}, {"output": output})
+    return {"input": question, "output": output, "intermediate_steps": [(action, observation)], "route": tool_name}
@@ -0,0 +1,124 @@
+"""
+Lexical index over the database catalog used to pick the tables relevant to a question.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+import src.config as config
+from src.database import get_catalog, get_tenant, render_schema, get_full_table_info
+
+# Field weights: a hit on a table name counts more than one on a sampled value
+TABLE_WEIGHT = 3.0
+COLUMN_WEIGHT = 2.0
+TYPE_WEIGHT = 0.5
+VALUE_WEIGHT = 1.0
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(value) -> list:
+    """Lowercase, split on non-alphanumerics (incl. '_') and strip plural 's'."""
+    tokens = []
+    for token in _TOKEN_RE.findall(str(value).lower()):
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class SchemaIndex:
+    """BM25-style index where each table is one document."""
+
+    def __init__(self, catalog: list):
+        self.catalog = catalog
+        self.doc_terms = {}
+        self.neighbours = defaultdict(set)
+        doc_freq = Counter()
+
+        for table in catalog:
+            terms = Counter()
+            for token in tokenize(table["name"]):
+                terms[token] += TABLE_WEIGHT
+            for column in table["columns"]:
+                for token in tokenize(column["name"]):
+                    terms[token] += COLUMN_WEIGHT
+                for token in tokenize(column["type"]):
+                    terms[token] += TYPE_WEIGHT
+            # Sampled distinct values for text-like columns
+            for column in table["columns"]:
+                values = {row[column["name"]] for row in table["sample_rows"]}
+                for value in values:
+                    if value in ("None", "") or value.replace(".", "", 1).isdigit():
+                        continue
+                    for token in set(tokenize(value)):
+                        terms[token] += VALUE_WEIGHT
+            self.doc_terms[table["name"]] = terms
+            doc_freq.update(terms.keys())
+
+            for fk in table["foreign_keys"]:
+                self.neighbours[table["name"]].add(fk["referred_table"])
+                self.neighbours[fk["referred_table"]].add(table["name"])
+
+        n_docs = max(len(catalog), 1)
+        self.idf = {
+            term: math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+        lengths = [sum(t.values()) for t in self.doc_terms.values()] or [1.0]
+        self.avg_len = sum(lengths) / len(lengths)
+
+    def score(self, question: str) -> dict:
+        """Return {table: score} for tables sharing at least one term with the question."""
+        k1, b = 1.2, 0.75
+        query_terms = set(tokenize(question))
+        scores = {}
+        for table, terms in self.doc_terms.items():
+            doc_len = sum(terms.values())
+            total = 0.0
+            for term in query_terms:
+                tf = terms.get(term)
+                if not tf:
+                    continue
+                norm = tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_len / self.avg_len))
+                total += self.idf[term] * norm
+            if total > 0:
+                scores[table] = total
+        return scores
+
+    def search(self, question: str, k: int) -> list:
+        """Top-k tables for the question plus their foreign-key join partners."""
+        scores = self.score(question)
+        ranked = sorted(scores, key=lambda t: (-scores[t], t))[:k]
+        selected = list(ranked)
+        for table in ranked:
+            for partner in sorted(self.neighbours[table]):
+                if partner not in selected:
+                    selected.append(partner)
+        return selected
+
+
+# -----------------------
+# Cached index per database
+# -----------------------
+def get_schema_index() -> SchemaIndex:
+    """Return the index for the current database, rebuilt when its schema version changes."""
+    return get_tenant().cached("schema_index", lambda: SchemaIndex(get_catalog()))
+
+
+def get_relevant_tables(question: str, k: int = None) -> list:
+    """Return the names of tables relevant to `question` (empty if nothing matched)."""
+    k = k or config.SCHEMA_TOP_K
+    return get_schema_index().search(question or "", k)
+
+
+def get_relevant_schema(question: str, k: int = None) -> str:
+    """Render only the tables relevant to `question`, falling back to the full schema."""
+    try:
+        index = get_schema_index()
+    except Exception:
+        # Let get_full_table_info report the connection / introspection error
+        return get_full_table_info()
+    tables = index.search(question or "", k or config.SCHEMA_TOP_K)
+    if not tables or len(tables) >= len(index.catalog):
+        return get_full_table_info()
+    return render_schema(index.catalog, tables)
@@ -0,0 +1,111 @@
+"""
+Bounded per-session store of agent executors with LRU and idle-timeout eviction.
+
+Database bindings are kept apart from executors: an evicted session gets a fresh
+executor on its next request but stays on the database it was bound to.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class SessionStore:
+    """Keeps at most `max_sessions` executors, dropping the least recently used and idle ones."""
+
+    def __init__(self, max_sessions: int, idle_timeout: float, max_bindings: int = 10000):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_bindings = max_bindings
+        self._sessions = OrderedDict()  # session_id -> (last_used, executor), oldest first
+        # session_id -> DB URI bound with /set-db-uri, least recently used first; survives executor eviction
+        self._db_uris = OrderedDict()
+        self._turn_locks = {}  # session_id -> Lock serializing turns on the session's executor and memory
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted_lru = 0
+        self.evicted_idle = 0
+
+    def _evict_idle(self, now: float):
+        # Entries are ordered by last use, so idle ones are at the front
+        while self._sessions:
+            session_id, (last_used, _) = next(iter(self._sessions.items()))
+            if now - last_used < self.idle_timeout:
+                break
+            del self._sessions[session_id]
+            self._turn_locks.pop(session_id, None)
+            self.evicted_idle += 1
+
+    def get_or_create(self, session_id: str, factory):
+        """Return the session's executor, creating it with `factory()` if needed."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                self._sessions[session_id] = (now, entry[1])
+                self._sessions.move_to_end(session_id)
+                return entry[1]
+        executor = factory()
+        self.set(session_id, executor)
+        return executor
+
+    def get(self, session_id: str):
+        entry = self._sessions.get(session_id)
+        return entry[1] if entry else None
+
+    def set(self, session_id: str, executor):
+        now = time.monotonic()
+        with self._lock:
+            if session_id not in self._sessions:
+                self.created += 1
+            self._sessions[session_id] = (now, executor)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                evicted, _ = self._sessions.popitem(last=False)
+                self._turn_locks.pop(evicted, None)
+                self.evicted_lru += 1
+
+    def turn_lock(self, session_id: str) -> threading.Lock:
+        """Lock held for a whole agent turn: one executor and memory are not safe to share across threads."""
+        with self._lock:
+            return self._turn_locks.setdefault(session_id, threading.Lock())
+
+    def bind_db(self, session_id: str, uri: str):
+        """Bind the session to `uri` (None: back to the default DB_URI)."""
+        with self._lock:
+            if not uri:
+                self._db_uris.pop(session_id, None)
+                return
+            self._db_uris[session_id] = uri
+            self._db_uris.move_to_end(session_id)
+            while len(self._db_uris) > self.max_bindings:
+                self._db_uris.popitem(last=False)
+
+    def db_uri(self, session_id: str):
+        """URI bound to the session, or None for the default database."""
+        with self._lock:
+            uri = self._db_uris.get(session_id)
+            if uri is not None:
+                self._db_uris.move_to_end(session_id)
+            return uri
+
+    def session_ids(self) -> list:
+        return list(self._sessions)
+
+    def __contains__(self, session_id) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._evict_idle(time.monotonic())
+        return {
+            "active": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "created": self.created,
+            "evicted_lru": self.evicted_lru,
+            "evicted_idle": self.evicted_idle,
+            "db_bindings": len(self._db_uris),
+        }
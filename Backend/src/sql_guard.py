@@ -0,0 +1,154 @@
+"""
+Guard stage for LLM-generated SQL, run before anything reaches the database.
+
+- check_read_only(): a single SELECT/WITH statement, no write keywords outside
+  string literals and quoted identifiers (so columns like `updated_at` pass).
+- guard_connection(): read-only transaction + per-statement timeout, then an
+  EXPLAIN whose estimated cost and row counts must stay under the configured limits.
+
+Every rejection is raised as SQLGuardError carrying a machine-readable code.
+"""
+import json
+import re
+import src.config as config
+
+# Reserved words only: names like "comment" or "lock" are legitimate columns.
+# The read-only transaction set by guard_connection() is the actual enforcement.
+_WRITE_KEYWORDS = {
+    "INSERT", "UPDATE", "DELETE", "MERGE", "DROP", "ALTER", "CREATE", "TRUNCATE",
+    "GRANT", "REVOKE", "VACUUM", "REINDEX",
+}
+_READ_STARTS = {"SELECT", "WITH", "VALUES", "TABLE"}
+# Comments, string literals (incl. E'' and $$ bodies) and quoted identifiers
+_SKIP_RE = re.compile(
+    r"--[^\n]*|/\*.*?\*/|[Ee]?'(?:[^']|'')*'|\$([A-Za-z_]*)\$.*?\$\1\$|\"(?:[^\"]|\"\")*\"",
+    re.DOTALL,
+)
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_$]*")
+
+# Postgres SQLSTATEs mapped to guard codes
+_PG_ERROR_CODES = {
+    "57014": "timeout",          # query_canceled (statement_timeout)
+    "25006": "not_read_only",    # read_only_sql_transaction
+}
+
+
+class SQLGuardError(ValueError):
+    """Generated SQL rejected by the guard (or cancelled by its limits)."""
+
+    def __init__(self, code: str, message: str, **details):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.details = details
+
+    def to_dict(self) -> dict:
+        return {"code": self.code, "message": self.message, **self.details}
+
+    def __str__(self):
+        return f"[{self.code}] {self.message}"
+
+
+def _code_only(query: str) -> str:
+    return _SKIP_RE.sub(" ", query)
+
+
+def check_read_only(query: str) -> str:
+    """Reject anything but one read-only statement; returns `query` unchanged."""
+    code = _code_only(query)
+    statements = [s for s in code.split(";") if s.strip()]
+    if not statements:
+        raise SQLGuardError("empty", "No SQL statement to execute")
+    if len(statements) > 1:
+        raise SQLGuardError("multiple_statements", "Only a single SELECT statement is allowed")
+    words = [w.upper() for w in _WORD_RE.findall(statements[0])]
+    if not words or words[0] not in _READ_STARTS:
+        raise SQLGuardError("not_read_only", f"Only SELECT queries are allowed (got {words[0] if words else statements[0].strip()[:20]})")
+    writes = sorted(_WRITE_KEYWORDS.intersection(words))
+    if writes:
+        raise SQLGuardError("not_read_only", f"Only SELECT queries are allowed (found {', '.join(writes)})")
+    return query
+
+
+# Nodes whose row estimate SQL_MAX_PLAN_ROWS applies to: a join or aggregate producing
+# that many rows is runaway work, while a big scan read under a LIMIT stops early
+_ROW_CHECKED_NODES = {"Nested Loop", "Hash Join", "Merge Join", "Aggregate", "Group", "WindowAgg"}
+
+
+def _plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _plan_nodes(child)
+
+
+def explain(conn, sql: str) -> dict:
+    """Planner estimates for `sql`: total cost, result rows and the largest join/aggregate row estimate.
+
+    The cost is the one of the plan under any top-level Limit: the planner scales a
+    Limit's cost down to the fraction of rows it expects to read, so a bounded scan
+    of a huge join looks cheap even though the work before the first rows is not.
+    """
+    raw = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+    unbounded = plan
+    while unbounded["Node Type"] == "Limit" and unbounded.get("Plans"):
+        unbounded = unbounded["Plans"][0]
+    return {
+        "cost": unbounded["Total Cost"],
+        "bounded_cost": plan["Total Cost"],
+        "rows": plan["Plan Rows"],
+        "unbounded_rows": unbounded["Plan Rows"],
+        "max_node_rows": max(
+            (node["Plan Rows"] for node in _plan_nodes(plan) if node["Node Type"] in _ROW_CHECKED_NODES), default=0,
+        ),
+    }
+
+
+def guard_connection(conn, sql: str):
+    """Make the connection's transaction read-only with a statement timeout, then check the plan.
+
+    Must run before any other statement on `conn`'s transaction; the settings are
+    transaction-local and disappear when the connection goes back to the pool.
+    """
+    if conn.dialect.name != "postgresql":
+        return None
+    conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+    if config.SQL_STATEMENT_TIMEOUT_MS > 0:
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(config.SQL_STATEMENT_TIMEOUT_MS)}")
+    if not config.SQL_EXPLAIN_ENABLED:
+        return None
+    try:
+        estimate = explain(conn, sql)
+    except Exception as e:
+        raise translate_error(e) from e
+    if estimate["cost"] > config.SQL_MAX_COST:
+        raise SQLGuardError(
+            "cost_exceeded",
+            f"Query is too expensive (estimated cost {estimate['cost']:.0f} > {config.SQL_MAX_COST:.0f}); "
+            "add filters or aggregate the data",
+            **estimate,
+        )
+    if estimate["max_node_rows"] > config.SQL_MAX_PLAN_ROWS:
+        raise SQLGuardError(
+            "rows_exceeded",
+            f"Query would process too many rows (estimated {estimate['max_node_rows']:.0f} > "
+            f"{config.SQL_MAX_PLAN_ROWS:.0f}); check the join conditions",
+            **estimate,
+        )
+    return estimate
+
+
+def translate_error(error: Exception) -> Exception:
+    """Map statement-timeout / read-only violations to SQLGuardError; other errors pass through."""
+    if isinstance(error, SQLGuardError):
+        return error
+    pgcode = getattr(getattr(error, "orig", None), "pgcode", None)
+    code = _PG_ERROR_CODES.get(pgcode)
+    if code == "timeout":
+        return SQLGuardError(
+            "timeout", f"Query cancelled after {config.SQL_STATEMENT_TIMEOUT_MS} ms statement timeout",
+            timeout_ms=config.SQL_STATEMENT_TIMEOUT_MS,
+        )
+    if code == "not_read_only":
+        return SQLGuardError("not_read_only", "Only read-only queries are allowed")
+    return error
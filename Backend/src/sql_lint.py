@@ -0,0 +1,317 @@
+"""
+Local lint of generated SQL against the cached catalog (no database round trip).
+
+Checks table and column references, alias usage ("contrats c" then "contrats.id")
+and GROUP BY completeness, and returns precise issues (with close-match
+suggestions) that can be fed back to the LLM for a corrected query.
+"""
+import difflib
+from functools import lru_cache
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import ParseError
+from sqlglot.optimizer.scope import Scope, traverse_scope
+import src.config as config
+from src.database import get_catalog, get_schema_fingerprint
+from src.sql_guard import SQLGuardError
+
+
+class SQLLintError(SQLGuardError):
+    """Generated SQL that cannot run against the current schema."""
+
+    def __init__(self, issues: list):
+        message = "; ".join(issue["message"] for issue in issues)
+        super().__init__("lint", message, issues=issues)
+
+
+def _name(identifier) -> str:
+    # Postgres folds unquoted identifiers to lower case
+    if isinstance(identifier, exp.Identifier) and identifier.quoted:
+        return identifier.this
+    return identifier.name.lower() if hasattr(identifier, "name") else str(identifier).lower()
+
+
+def _source_name(scope: Scope, alias: str) -> str:
+    """Case-folded name of a FROM-clause entry, matching how _name() folds qualifiers."""
+    node = scope.selected_sources.get(alias, (None, None))[0]
+    for candidate in (node, getattr(node, "parent", None)):  # a subquery's alias sits on its parent
+        table_alias = candidate.args.get("alias") if isinstance(candidate, exp.Expression) else None
+        if isinstance(table_alias, exp.TableAlias) and isinstance(table_alias.this, exp.Identifier):
+            return _name(table_alias.this)
+    if isinstance(node, exp.Table) and isinstance(node.this, exp.Identifier):
+        return _name(node.this)
+    return alias.lower()
+
+
+def _scope_sources(scope: Scope) -> dict:
+    """scope.sources keyed by case-folded name (selected entries win over unused CTEs)."""
+    sources = {}
+    for alias, source in scope.sources.items():
+        key = _source_name(scope, alias)
+        if key not in sources or alias in scope.selected_sources:
+            sources[key] = source
+    return sources
+
+
+def _qualifier(column: exp.Column) -> str:
+    return _name(column.args["table"]) if column.table else ""
+
+
+def _suggest(name: str, candidates) -> dict:
+    match = difflib.get_close_matches(name, list(candidates), n=1, cutoff=0.6)
+    return {"suggestion": match[0]} if match else {}
+
+
+def _issue(code: str, message: str, **details) -> dict:
+    return {"code": code, "message": message, **details}
+
+
+class _Source:
+    """Columns visible through one FROM-clause entry (table, CTE or subquery)."""
+
+    def __init__(self, alias: str, table: str = None, columns=None, primary_key=()):
+        self.alias = alias
+        self.table = table
+        self.columns = columns  # None: unknown (SELECT *, table function...), skip checks
+        self.primary_key = tuple(primary_key)
+
+
+class Linter:
+    def __init__(self, catalog: list):
+        self.tables = {t["name"]: t for t in catalog}
+
+    def lint(self, query: str) -> list:
+        try:
+            tree = sqlglot.parse_one(query, read="postgres")
+        except ParseError as e:
+            return [_issue("syntax", f"Syntax error: {e.errors[0]['description'] if e.errors else e}")]
+        if not isinstance(tree, exp.Query):
+            return [_issue("syntax", "Not a SELECT query")]
+        issues = []
+        for scope in traverse_scope(tree):
+            issues.extend(self._lint_scope(scope))
+        # The same problem can surface in several scopes (e.g. a CTE and its user)
+        unique = {(i["code"], i["message"]): i for i in issues}
+        return list(unique.values())
+
+    # -----------------------
+    # Sources
+    # -----------------------
+    def _sources(self, scope: Scope, issues: list) -> dict:
+        sources = {}
+        for alias, source in _scope_sources(scope).items():
+            if isinstance(source, Scope):
+                names = getattr(source.expression, "named_selects", None)
+                columns = None if not names or "*" in names else {n for n in names}
+                sources[alias] = _Source(alias, columns=columns)
+            elif isinstance(source, exp.Table):
+                if not isinstance(source.this, exp.Identifier):
+                    sources[alias] = _Source(alias)  # table function (generate_series, unnest...)
+                    continue
+                schema = source.db.lower() if source.db else None
+                if schema and schema != config.DB_SCHEMA.lower():
+                    sources[alias] = _Source(alias)  # pg_catalog, information_schema...: not in catalog
+                    continue
+                name = _name(source.this)
+                table = self.tables.get(name)
+                if table is None:
+                    issues.append(_issue(
+                        "unknown_table", f'Table "{name}" does not exist', table=name,
+                        **_suggest(name, self.tables),
+                    ))
+                    sources[alias] = _Source(alias, table=name)
+                    continue
+                sources[alias] = _Source(
+                    alias, table=name, columns={c["name"] for c in table["columns"]},
+                    primary_key=table.get("primary_key") or (),
+                )
+            else:
+                sources[alias] = _Source(alias)
+        return sources
+
+    def _resolve(self, column: exp.Column, scope: Scope, sources: dict, select_aliases: set, issues: list):
+        """Return the _Source a column belongs to (None when unresolvable or unchecked)."""
+        name = _name(column.this)
+        qualifier = _qualifier(column)
+        if qualifier:
+            source = sources.get(qualifier)
+            if source is None:
+                if self._outer_source(scope, qualifier) is not None:
+                    return None  # correlated reference to an enclosing query
+                tables = {s.table: a for a, s in sources.items() if s.table}
+                if qualifier in tables:
+                    issues.append(_issue(
+                        "alias", f'Table "{qualifier}" is aliased as "{tables[qualifier]}"; '
+                        f'use "{tables[qualifier]}.{name}"', table=qualifier, alias=tables[qualifier],
+                    ))
+                else:
+                    issues.append(_issue(
+                        "unknown_alias", f'Missing FROM-clause entry for "{qualifier}" (in "{column.sql()}")',
+                        alias=qualifier, **_suggest(qualifier, sources),
+                    ))
+                return None
+            if source.columns is not None and name not in source.columns:
+                where = f'table "{source.table}"' if source.table else f'"{qualifier}"'
+                issues.append(_issue(
+                    "unknown_column", f'Column "{name}" does not exist in {where}',
+                    column=name, table=source.table or qualifier, **_suggest(name, source.columns),
+                ))
+                return None
+            return source
+
+        if any(s.columns is None for s in sources.values()):
+            return None  # a source with unknown columns could provide it
+        owners = [s for s in sources.values() if name in s.columns]
+        if len(owners) == 1:
+            return owners[0]
+        if len(owners) > 1:
+            issues.append(_issue(
+                "ambiguous_column", f'Column reference "{name}" is ambiguous (in {", ".join(s.alias for s in owners)})',
+                column=name, candidates=[s.alias for s in owners],
+            ))
+            return None
+        if name in select_aliases or self._outer_has_column(scope, name):
+            return None
+        known = set().union(*(s.columns for s in sources.values())) if sources else set()
+        where = ", ".join(sorted(s.table or s.alias for s in sources.values())) or "the query"
+        issues.append(_issue(
+            "unknown_column", f'Column "{name}" does not exist in {where}', column=name, **_suggest(name, known),
+        ))
+        return None
+
+    def _outer_source(self, scope: Scope, alias: str):
+        parent = scope.parent
+        while parent is not None:
+            sources = _scope_sources(parent)
+            if alias in sources:
+                return sources[alias]
+            parent = parent.parent
+        return None
+
+    def _outer_has_column(self, scope: Scope, name: str) -> bool:
+        parent = scope.parent
+        while parent is not None:
+            for source in parent.sources.values():
+                if isinstance(source, exp.Table):
+                    table = self.tables.get(_name(source.this)) if isinstance(source.this, exp.Identifier) else None
+                    if table is None or name in {c["name"] for c in table["columns"]}:
+                        return True
+                else:
+                    return True  # derived source: assume it may provide the column
+            parent = parent.parent
+        return False
+
+    # -----------------------
+    # Per-scope checks
+    # -----------------------
+    def _lint_scope(self, scope: Scope) -> list:
+        issues = []
+        sources = self._sources(scope, issues)
+        select = scope.expression if isinstance(scope.expression, exp.Select) else None
+        select_aliases = {e.alias.lower() for e in select.expressions if e.alias} if select else set()
+
+        resolved = {}
+        for column in scope.columns:
+            if isinstance(column.this, exp.Star):
+                continue
+            if select is not None and column.find_ancestor(exp.Select) is not select:
+                continue  # unresolved column of a correlated subquery, linted in its own scope
+            resolved[id(column)] = self._resolve(column, scope, sources, select_aliases, issues)
+
+        if select is not None and not issues:
+            issues.extend(self._lint_group_by(select, sources, resolved))
+        return issues
+
+    def _lint_group_by(self, select: exp.Select, sources: dict, resolved: dict) -> list:
+        group = select.args.get("group")
+        group_exprs = list(group.expressions) if group else []
+        # Aggregates inside a window (SUM(x) OVER ...) or a scalar subquery don't make this SELECT aggregate
+        has_aggregate = any(
+            agg.find_ancestor(exp.Window, exp.Select) is select
+            for e in select.expressions for agg in e.find_all(exp.AggFunc)
+        )
+        if not group_exprs and not has_aggregate:
+            return []
+        if select.args.get("distinct") is not None and not group_exprs:
+            return []
+
+        grouped_sql, grouped_columns = set(), set()
+        aliases = {e.alias.lower(): e.unalias() for e in select.expressions if e.alias}
+        for expr in group_exprs:
+            if isinstance(expr, exp.Literal) and expr.is_int and 0 < int(expr.name) <= len(select.expressions):
+                expr = select.expressions[int(expr.name) - 1].unalias()  # GROUP BY 1
+            elif isinstance(expr, exp.Column) and not expr.table and expr.name.lower() in aliases:
+                expr = aliases[expr.name.lower()]  # GROUP BY output alias
+            grouped_sql.add(expr.sql(dialect="postgres"))
+            for column in ([expr] if isinstance(expr, exp.Column) else expr.find_all(exp.Column)):
+                source = resolved.get(id(column))
+                grouped_columns.add((source.alias if source else _qualifier(column), _name(column.this)))
+        if any(isinstance(e, (exp.Rollup, exp.Cube, exp.GroupingSets)) for e in group_exprs):
+            return []  # grouping sets: left to Postgres
+
+        # Postgres accepts any column of a table whose primary key is grouped
+        functionally_grouped = {
+            alias for alias, s in sources.items()
+            if s.primary_key and all((alias, k) in grouped_columns for k in s.primary_key)
+        }
+
+        issues = []
+        for selected in select.expressions:
+            target = selected.unalias()
+            if isinstance(target, exp.Star) or target.sql(dialect="postgres") in grouped_sql:
+                continue
+            for column in target.find_all(exp.Column):
+                if isinstance(column.this, exp.Star) or column.find_ancestor(
+                    exp.AggFunc, exp.Filter, exp.Window, exp.WithinGroup, exp.Subquery,
+                ):
+                    continue
+                source = resolved.get(id(column))
+                if source is None and column.table:
+                    continue
+                key = (source.alias if source else _qualifier(column), _name(column.this))
+                if key in grouped_columns or (not column.table and any(n == key[1] for _, n in grouped_columns)):
+                    continue
+                if source is not None and source.alias in functionally_grouped:
+                    continue
+                issues.append(_issue(
+                    "group_by",
+                    f'Column "{column.sql(dialect="postgres")}" must appear in the GROUP BY clause '
+                    "or be used in an aggregate function",
+                    column=_name(column.this),
+                ))
+        return issues
+
+
+def describe_issues(issues: list) -> str:
+    """One bullet per issue, with the close-match suggestion when there is one."""
+    lines = []
+    for issue in issues:
+        hint = f" (did you mean {issue['suggestion']}?)" if issue.get("suggestion") else ""
+        lines.append(f"- {issue['message']}{hint}")
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=256)
+def _lint_cached(fingerprint: str, query: str) -> tuple:
+    return tuple(Linter(get_catalog()).lint(query))
+
+
+def lint_sql(query: str) -> list:
+    """Issues found in `query` against the current catalog (empty list when clean)."""
+    if config.SQL_LINT_MODE == "off":
+        return []
+    try:
+        fingerprint = get_schema_fingerprint()
+    except Exception:
+        return []  # catalog unavailable: the database will report errors itself
+    return list(_lint_cached(fingerprint, query))
+
+
+def check_sql(query: str) -> str:
+    """Raise SQLLintError when lint finds issues and SQL_LINT_MODE is "reject"."""
+    issues = lint_sql(query)
+    if issues:
+        if config.SQL_LINT_MODE == "reject":
+            raise SQLLintError(issues)
+        print(f"[WARN] SQL lint: {'; '.join(i['message'] for i in issues)}")
+    return query
@@ -0,0 +1,45 @@
+"""
+Startup phase timings: how long importing, app setup and startup hooks took.
+
+src.main imports this module first and marks each phase; the breakdown is
+printed once the app is ready and served on /startup-stats and /metrics.
+"""
+import time
+from contextlib import contextmanager
+
+STARTED = time.perf_counter()
+_phases = {}  # phase -> seconds, in the order they ran
+_last = [STARTED]
+
+
+def mark(phase: str):
+    """Close `phase`: it lasted from the previous mark (or module import) until now."""
+    now = time.perf_counter()
+    _phases[phase] = _phases.get(phase, 0.0) + now - _last[0]
+    _last[0] = now
+
+
+@contextmanager
+def phase(name: str):
+    """Time the enclosed block as `name` (for work that does not directly follow a mark)."""
+    _last[0] = time.perf_counter()
+    try:
+        yield
+    finally:
+        mark(name)
+
+
+def report() -> dict:
+    return {
+        "phases": {name: round(seconds, 4) for name, seconds in _phases.items()},
+        "total_seconds": round(sum(_phases.values()), 4),
+    }
+
+
+def summary() -> str:
+    parts = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in _phases.items())
+    return f"{sum(_phases.values()) * 1000:.0f} ms ({parts})"
+
+
+def gauges() -> dict:
+    return {f"startup_{name}_seconds": round(seconds, 4) for name, seconds in _phases.items()}
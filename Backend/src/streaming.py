@@ -0,0 +1,66 @@
+"""
+Server-Sent-Events plumbing: a LangChain callback handler that forwards agent
+steps, pipeline events and LLM tokens from the worker thread to the event loop.
+"""
+import json
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.callbacks.manager import dispatch_custom_event
+
+# Tags put on pipeline LLM calls so streamed tokens can be attributed to a stage
+SQL_GENERATION_TAG = "sql_generation"
+ANSWER_FORMATTING_TAG = "answer_formatting"
+GRAPH_CODE_TAG = "graph_code"
+MEMORY_SUMMARY_TAG = "memory_summary"
+STAGE_TAGS = (SQL_GENERATION_TAG, ANSWER_FORMATTING_TAG, GRAPH_CODE_TAG, MEMORY_SUMMARY_TAG)
+
+
+def emit_event(name: str, data: dict):
+    """Dispatch a custom pipeline event; a no-op when not running under a callback context."""
+    try:
+        dispatch_custom_event(name, data)
+    except RuntimeError:
+        # Called outside a runnable (e.g. FullChain.run from a script): nobody is listening
+        pass
+
+
+def format_sse(event: str, data) -> str:
+    """Encode one Server-Sent-Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class SSECallbackHandler(BaseCallbackHandler):
+    """Push callback events onto an asyncio.Queue owned by the request's event loop."""
+
+    def __init__(self, loop, queue):
+        self.loop = loop
+        self.queue = queue
+        self._stages = {}
+
+    def _put(self, event: str, data: dict):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, (event, data))
+
+    def _on_start(self, run_id, tags):
+        stage = next((t for t in (tags or []) if t in STAGE_TAGS), "agent")
+        self._stages[run_id] = stage
+
+    def on_llm_start(self, serialized, prompts, *, run_id, tags=None, **kwargs):
+        self._on_start(run_id, tags)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, **kwargs):
+        self._on_start(run_id, tags)
+
+    def on_llm_new_token(self, token: str, *, run_id, **kwargs):
+        if token:
+            self._put("token", {"stage": self._stages.get(run_id, "agent"), "token": token})
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._stages.pop(run_id, None)
+
+    def on_agent_action(self, action, **kwargs):
+        self._put("step", {"tool": action.tool, "tool_input": action.tool_input, "log": action.log})
+
+    def on_tool_end(self, output, **kwargs):
+        self._put("tool_output", {"output": output})
+
+    def on_custom_event(self, name, data, **kwargs):
+        self._put(name, data)
@@ -1,13 +1,14 @@
 from langchain.tools import Tool
 from src.chains import full_chain, run_query
-from src.database import  get_full_table_info
-import matplotlib.pyplot as plt
-import pandas as pd
-import io, base64
 from src.llm import llm
-from src.chains import sql_prompt, graph_code_chain
-import time
+from src.chains import generate_graph_code, graph_code_cache, generate_sql, sql_cache
 from src.chains import run_query1
+from src.streaming import emit_event
+from src.metrics import timer, observe_rows
+from src.rendering import render_artifact, get_artifact
+from src.charts import detect_chart
+from src.sql_guard import SQLGuardError
+from src.resilience import LLMUnavailable
 
 
 def run_full_chain_tool(inputs):
@@ -24,11 +25,16 @@ def run_full_chain_tool(inputs):
     try:
         result = full_chain.run(question)
         if isinstance(result, dict):
-            return {
+            response = {
                 "output": result.get("output", str(result)),
                 "final_answer": True
             }
+            if result.get("error"):
+                response["error"] = result["error"]
+            return response
         return {"output": str(result), "final_answer": True}
+    except LLMUnavailable:
+        raise  # provider down: fail the request fast instead of handing the agent an error to retry
     except Exception as e:
         return {"output": f"Error executing SQL: {str(e)}", "final_answer": True}
 
@@ -96,18 +102,21 @@ clarification_tool = Tool(
 #     except Exception as e:
 #         return {"output": f"Failed to generate graph: {str(e)}"}
 
-def generate_and_execute_graph(inputs, filepath="graph.png"):
-    """Generate and execute dynamic Matplotlib code from SQL results using LLM with verbose output."""
+def generate_and_execute_graph(inputs, filepath=None):
+    """Generate dynamic Matplotlib code from SQL results using LLM and render it in a worker process.
+
+    The image is kept in memory under a new artifact id (served by /graph/{artifact_id});
+    pass `filepath` to also write it to disk.
+    """
     question = inputs if isinstance(inputs, str) else inputs.get("question", "")
     if not question:
         return {"output": "Error: no question provided", "final_answer": False}
 
+    cache_key = None
     try:
-        # 1️⃣ Generate SQL
-        schema_info = get_full_table_info()
-        prompt_value = sql_prompt.format_prompt(question=question, schema=schema_info)
-        query_response = llm.invoke(prompt_value)
-        query = getattr(query_response, "content", query_response).strip()
+        # 1️⃣ Generate SQL (or reuse it from the question -> SQL cache)
+        query, cache_key = generate_sql(question, llm)
+        emit_event("sql", {"query": query})
 
         # 2️⃣ Execute SQL and get DataFrame
         data = run_query1(query)  # Returns a pandas DataFrame
@@ -115,56 +124,55 @@ def generate_and_execute_graph(inputs, filepath="graph.png"):
         print(query)
         print("\n[VERBOSE] SQL Result:\n")
         print(data.head())  # Show first few rows for debugging
-        start_time = time.time()  # record start time
-
-        while data.empty:
-            if time.time() - start_time > 30:  # break if > 30 seconds
-                print("No data received within 30 seconds. Exiting loop.")
-                break
-
-            print("Waiting for data...")
-            time.sleep(0.5)
-            data = run_query1(query)
+        # An empty result is final: re-running the same query would return the same rows
+        emit_event("rows", {"count": len(data)})
+        observe_rows("graph", len(data))
         if data.empty:
+            if cache_key:
+                sql_cache.pop(cache_key)
             return {"output": "SQL query returned no data, graph cannot be generated.", "final_answer": False}
 
-        # 3️⃣ Generate dynamic plotting code via LLM
-        graph_prompt = {
-        "question": question,
-        "sql_results": data.to_dict(orient="records"),
-        "columns": list(data.columns),   # 👈 Pass real columns here
-        "instruction": (
-        "Use the DataFrame named 'data' for plotting. "
-        "Ensure the figure is saved using plt.savefig(filepath)."
-        )
-        }
-        
-        
-        code = graph_code_chain.invoke(graph_prompt)
+        # 3️⃣ Common shapes (bar/pie/line/stacked bar) use a built-in template: no LLM, no exec
+        spec = detect_chart(question, data)
+        if spec is not None:
+            print(f"\n[VERBOSE] Using built-in {spec['kind']} chart template\n")
+            emit_event("chart", {"template": spec["kind"]})
+            try:
+                with timer("graph_render"):
+                    artifact_id = render_artifact(None, data, spec=spec)
+            except Exception as e:
+                print(f"[WARN] Chart template failed, falling back to generated code: {e}")
+            else:
+                if filepath:
+                    with open(filepath, "wb") as f:
+                        f.write(get_artifact(artifact_id)[0])
+                return {"output": f"Graph saved as artifact {artifact_id}", "final_answer": True, "artifact_id": artifact_id}
+
+        # Otherwise generate plotting code via LLM (or reuse it for the same question and columns)
+        code, code_key = generate_graph_code(question, data)
 
         # 🔹 Verbose always: show the generated code
         print("\n[VERBOSE] Generated Matplotlib code:\n")
         print(code)
         print("\n[VERBOSE] End of generated code\n")
 
-        # 4️⃣ Execute plotting code in a sandboxed environment
-        local_vars = {
-            "plt": plt,
-            "pd": pd,
-            "data": data,
-            "filepath": filepath
-        }
-        exec(code, local_vars)  # Use same dict for globals and locals
-# Detect Plotly usage
-        is_plotly = "go" in local_vars or "plotly" in code
-
-        if not is_plotly:
-            # Matplotlib: save figure if it has axes
-            fig = plt.gcf()
-             # only save if figure has something
-            fig.savefig(filepath, bbox_inches="tight")
-            plt.close(fig)
-        return {"output": f"Graph saved to {filepath}", "final_answer": True}
+        # 4️⃣ Execute plotting code in an isolated worker process
+        with timer("graph_render"):
+            try:
+                artifact_id = render_artifact(code, data)  # cached when data and code are identical
+            except Exception:
+                graph_code_cache.pop(code_key)  # don't reuse code that failed to render
+                raise
+        if filepath:
+            with open(filepath, "wb") as f:
+                f.write(get_artifact(artifact_id)[0])
+        return {"output": f"Graph saved as artifact {artifact_id}", "final_answer": True, "artifact_id": artifact_id}
+    except SQLGuardError as e:
+        if cache_key:
+            sql_cache.pop(cache_key)  # don't reuse SQL the guard refused
+        return {"output": f"Failed to generate graph: {str(e)}", "final_answer": True, "error": e.to_dict()}
+    except LLMUnavailable:
+        raise
     except Exception as e:
         return {"output": f"Failed to generate graph: {str(e)}","final_answer": False}
 
@@ -0,0 +1,82 @@
+"""
+Bounded worker pool that runs blocking agent calls off the event loop.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolSaturated(Exception):
+    """Raised when the wait queue is full (429) or the wait timed out (503)."""
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class WorkerPool:
+    """Run sync callables in threads with a concurrency limit and a bounded wait queue."""
+
+    def __init__(self, max_workers: int, max_queue: int, queue_timeout: float, name: str = "worker"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = asyncio.Semaphore(max_workers)
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def run(self, fn, *args, **kwargs):
+        """Await `fn(*args, **kwargs)` in a worker thread, queueing if all workers are busy."""
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise PoolSaturated("Server busy, too many pending requests", 429)
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise PoolSaturated("Timed out waiting for a free worker", 503)
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._executor.submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self._finished()
+            raise
+        # The slot is freed when the thread is done, not when the caller stops waiting:
+        # a cancelled request (client disconnect) leaves its turn running to completion
+        future.add_done_callback(lambda _: self._release_from_thread(loop))
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def _release_from_thread(self, loop):
+        try:
+            loop.call_soon_threadsafe(self._finished)
+        except RuntimeError:
+            pass  # event loop already closed (shutdown)
+
+    def _finished(self):
+        self.running -= 1
+        self.completed += 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        """Current queue depth and lifetime counters."""
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queued": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
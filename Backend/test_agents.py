@@ -0,0 +1,26 @@
+import os
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+import src.agents as agents
+import src.database as database
+
+def test_schema_comes_only_from_agent_inputs(monkeypatch):
+    def full_schema():
+        raise AssertionError("the full schema must not be built for the agent prompt")
+
+    monkeypatch.setattr(database, "get_full_table_info", full_schema)
+    assert "schema" not in agents.REACT_PROMPT.partial_variables
+    prompt = agents.REACT_PROMPT.format(
+        input="combien de contrats ?", history="", schema="CREATE TABLE contrats (id INTEGER)",
+        agent_scratchpad="", tools="sql_tool", tool_names="sql_tool",
+    )
+    assert "CREATE TABLE contrats (id INTEGER)" in prompt
+
+def test_build_agent_inputs_uses_pruned_schema(monkeypatch):
+    monkeypatch.setattr(agents, "get_relevant_schema", lambda question: f"schema for: {question}")
+    assert agents.build_agent_inputs("combien de contrats ?") == {
+        "input": "combien de contrats ?", "schema": "schema for: combien de contrats ?",
+    }
+
+def test_executor_builds_with_the_prompt():
+    executor = agents.get_agent_executor()
+    assert executor.memory is not None
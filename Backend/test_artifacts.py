@@ -0,0 +1,85 @@
+import os
+import pandas as pd
+import pytest
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+from fastapi.testclient import TestClient
+import src.rendering as rendering
+from src.rendering import ArtifactStore, artifact_key
+
+CODE = "plt.bar(data['produit'], data['prime'])"
+
+
+def sample():
+    return pd.DataFrame({"produit": ["auto", "habitation"], "prime": [420.5, 310.0]})
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = ArtifactStore(max_bytes=1000, ttl=3600)
+    monkeypatch.setattr(rendering, "artifact_store", store)
+    return store
+
+
+def test_artifact_key_is_content_addressed():
+    assert artifact_key(sample(), CODE) == artifact_key(sample(), CODE)
+    changed = sample()
+    changed.loc[1, "prime"] = 311.0
+    assert artifact_key(changed, CODE) != artifact_key(sample(), CODE)
+    assert artifact_key(sample(), CODE, "svg") != artifact_key(sample(), CODE)
+    # Same values, different dtype: a different chart
+    assert artifact_key(sample().astype({"prime": object}), CODE) != artifact_key(sample(), CODE)
+
+
+def test_store_evicts_oldest_over_byte_budget():
+    store = ArtifactStore(max_bytes=10, ttl=3600)
+    store.put("a", b"123456", "image/png")
+    store.put("b", b"123456", "image/png")
+    assert store.get("a") is None
+    assert store.get("b") == (b"123456", "image/png")
+    assert store.stats()["bytes"] == 6
+    assert store.evictions == 1
+
+
+def test_store_expires_by_age():
+    store = ArtifactStore(max_bytes=1000, ttl=0)
+    store.put("a", b"png", "image/png")
+    assert store.get("a") is None
+
+
+def test_render_artifact_reuses_cached_bytes(store, monkeypatch):
+    calls = []
+
+    def render(code, data, fmt="png"):
+        calls.append(code)
+        return b"png-bytes"
+
+    monkeypatch.setattr(rendering.render_pool, "render", render)
+    first = rendering.render_artifact(CODE, sample())
+    second = rendering.render_artifact(CODE, sample())
+    assert first == second
+    assert calls == [CODE]
+    assert store.latest_id == first
+    assert rendering.get_artifact(first) == (b"png-bytes", "image/png")
+
+
+def test_graph_endpoint_answers_304_on_matching_etag(store):
+    from src.main import app
+
+    store.put("abc123", b"png-bytes", "image/png")
+    client = TestClient(app)
+
+    response = client.get("/graph/abc123")
+    assert response.status_code == 200
+    assert response.content == b"png-bytes"
+    assert response.headers["etag"] == '"abc123"'
+    assert "immutable" in response.headers["cache-control"]
+
+    cached = client.get("/graph/abc123", headers={"If-None-Match": '"abc123"'})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    latest = client.get("/graph", headers={"If-None-Match": '"abc123"'})
+    assert latest.status_code == 304
+    assert latest.headers["cache-control"] == "no-cache"
+
+    assert client.get("/graph/unknown").status_code == 404
@@ -0,0 +1,62 @@
+import time
+from langchain_core.messages import AIMessage
+import src.chains as chains
+from src.cache import LRUCache
+from src.database import clear_schema_cache
+from sqlalchemy import create_engine
+
+def test_lru_eviction_and_counters():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats() == {"entries": 2, "max_entries": 2, "hits": 3, "misses": 1, "evictions": 1}
+    assert cache.pop("a") == 1 and len(cache) == 1
+
+def test_ttl_expiry():
+    cache = LRUCache(ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a", "expired") == "expired"
+
+def test_persistence_round_trip(tmp_path):
+    path = str(tmp_path / "sql_cache.json")
+    cache = LRUCache(max_entries=10, ttl=60, path=path)
+    cache.set("k", "SELECT 1")
+    assert LRUCache(max_entries=10, ttl=60, path=path).get("k") == "SELECT 1"
+    (tmp_path / "broken.json").write_text("{not json")
+    assert len(LRUCache(path=str(tmp_path / "broken.json"))) == 0
+
+def test_normalize_question():
+    assert chains.normalize_question("  Combien de   CLIENTS ?") == "combien de clients"
+
+class CountingModel:
+    def __init__(self, answer="SELECT nom FROM clients"):
+        self.answer = answer
+        self.calls = 0
+
+    def invoke(self, prompt, config=None):
+        self.calls += 1
+        return AIMessage(content=self.answer)
+
+def test_generate_sql_calls_the_llm_once_per_question(insurance_db, monkeypatch):
+    monkeypatch.setattr(chains, "sql_cache", LRUCache(max_entries=10))
+    model = CountingModel()
+    query, key = chains.generate_sql("Liste des clients ?", model)
+    assert query == "SELECT nom FROM clients"
+    assert chains.generate_sql("liste des   clients", model) == (query, key)
+    assert model.calls == 1
+
+def test_schema_change_invalidates_cached_sql(insurance_db, monkeypatch):
+    monkeypatch.setattr(chains, "sql_cache", LRUCache(max_entries=10))
+    model = CountingModel()
+    _, key = chains.generate_sql("liste des clients", model)
+    engine = create_engine(insurance_db)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE clients ADD COLUMN telephone TEXT")
+    engine.dispose()
+    clear_schema_cache(insurance_db)
+    _, new_key = chains.generate_sql("liste des clients", model)
+    assert new_key != key and model.calls == 2
@@ -0,0 +1,73 @@
+import datetime
+from decimal import Decimal
+import pandas as pd
+import pytest
+from src.charts import detect_chart, render_chart
+
+BY_PRODUCT = pd.DataFrame({"produit": ["auto", "habitation", "sante"], "prime": [Decimal("420.50"), Decimal("310"), None]})
+BY_MONTH = pd.DataFrame({
+    "mois": [datetime.date(2024, 2, 1), datetime.date(2024, 1, 1)],
+    "sinistres": [12, 7],
+})
+BY_PRODUCT_AND_YEAR = pd.DataFrame({"produit": ["auto", "habitation"], "y2023": [10, 4], "y2024": [12, 5]})
+
+
+def test_label_and_decimal_defaults_to_bar():
+    spec = detect_chart("Prime totale par produit ?", BY_PRODUCT)
+    assert spec == {"kind": "bar", "x": "produit", "y": ["prime"], "title": "Prime totale par produit"}
+
+
+def test_requested_kind_is_honoured():
+    assert detect_chart("Camembert (pie) des primes par produit", BY_PRODUCT)["kind"] == "pie"
+    assert detect_chart("line chart des primes par produit", BY_PRODUCT)["kind"] == "line"
+
+
+def test_dates_default_to_line():
+    spec = detect_chart("Sinistres par mois", BY_MONTH)
+    assert spec["kind"] == "line" and spec["x_is_date"]
+    assert detect_chart("Sinistres par mois en bars", BY_MONTH)["kind"] == "bar"
+
+
+def test_several_series():
+    assert detect_chart("Primes par produit et année", BY_PRODUCT_AND_YEAR)["kind"] == "stacked_bar"
+    assert detect_chart("bar chart des primes par produit", BY_PRODUCT_AND_YEAR)["kind"] == "grouped_bar"
+
+
+def test_single_numeric_column_is_a_histogram():
+    data = pd.DataFrame({"prime": [1.0, 2.0, 2.5]})
+    assert detect_chart("distribution des primes", data)["kind"] == "histogram"
+    assert detect_chart("pie des primes", data) is None
+
+
+def test_unsupported_shapes_fall_back_to_codegen():
+    assert detect_chart("heatmap des primes par produit", BY_PRODUCT) is None
+    assert detect_chart("primes", pd.DataFrame({"a": ["x"], "b": ["y"], "prime": [1]})) is None
+    assert detect_chart("primes", BY_PRODUCT.iloc[0:0]) is None
+
+
+@pytest.mark.parametrize("question, data", [
+    ("primes par produit", BY_PRODUCT),
+    ("pie des primes par produit", BY_PRODUCT),
+    ("sinistres par mois", BY_MONTH),
+    ("primes par produit et année", BY_PRODUCT_AND_YEAR),
+    ("bar chart des primes par produit", BY_PRODUCT_AND_YEAR),
+])
+def test_render_chart_produces_png(question, data):
+    content = render_chart(detect_chart(question, data), data)
+    assert content.startswith(b"\x89PNG")
+
+
+def test_pie_groups_small_slices(monkeypatch):
+    import matplotlib.axes
+
+    data = pd.DataFrame({"produit": [f"p{i}" for i in range(20)], "prime": range(1, 21)})
+    pie = matplotlib.axes.Axes.pie
+
+    def recording_pie(self, y, labels=None, **kwargs):
+        recorded.extend(labels)
+        return pie(self, y, labels=labels, **kwargs)
+
+    recorded = []
+    monkeypatch.setattr(matplotlib.axes.Axes, "pie", recording_pie)
+    render_chart(detect_chart("pie des primes par produit", data), data)
+    assert len(recorded) == 12 and recorded[-1] == "Other"
@@ -0,0 +1,64 @@
+import src.database as database
+from src.database import (
+    clear_schema_cache, get_catalog, get_full_table_info, get_schema_fingerprint, get_schema_version, get_tenant,
+)
+from sqlalchemy import create_engine
+
+def _count_introspections(monkeypatch):
+    calls = []
+    introspect = database._introspect_catalog
+    monkeypatch.setattr(database, "_introspect_catalog", lambda engine: calls.append(1) or introspect(engine))
+    return calls
+
+def test_catalog_describes_tables_keys_and_samples(insurance_db):
+    tables = {t["name"]: t for t in get_catalog()}
+    assert set(tables) == {"clients", "contrats", "sinistres"}
+    contrats = tables["contrats"]
+    assert [c["name"] for c in contrats["columns"]] == ["id", "client_id", "produit", "prime", "date_debut"]
+    assert contrats["primary_key"] == ["id"]
+    assert contrats["foreign_keys"] == [{"columns": ["client_id"], "referred_table": "clients", "referred_columns": ["id"]}]
+    assert contrats["sample_rows"][0]["produit"] == "auto"
+
+def test_schema_context_is_built_once_per_version(insurance_db, monkeypatch):
+    calls = _count_introspections(monkeypatch)
+    schema = get_full_table_info()
+    assert "CREATE TABLE contrats" in schema and "FOREIGN KEY (client_id) REFERENCES clients(id)" in schema
+    assert "sample rows from clients table" in schema
+    assert get_full_table_info() is schema
+    get_catalog(), get_schema_fingerprint()
+    assert len(calls) == 1
+
+def test_clear_schema_cache_picks_up_schema_changes(insurance_db, monkeypatch):
+    calls = _count_introspections(monkeypatch)
+    version, fingerprint = get_schema_version(), get_schema_fingerprint()
+    engine = create_engine(insurance_db)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE agences (id INTEGER PRIMARY KEY, ville TEXT)")
+    engine.dispose()
+    assert "agences" not in get_full_table_info()  # still the cached version
+
+    clear_schema_cache(insurance_db)
+    assert get_schema_version() == version + 1
+    assert "CREATE TABLE agences" in get_full_table_info()
+    assert get_schema_fingerprint() != fingerprint
+    assert len(calls) == 2
+
+def test_fingerprint_ignores_sample_rows(insurance_db):
+    fingerprint = get_schema_fingerprint()
+    engine = create_engine(insurance_db)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE clients SET nom = 'Amel' WHERE id = 1")
+    engine.dispose()
+    clear_schema_cache(insurance_db)
+    assert get_schema_fingerprint() == fingerprint
+
+def test_introspection_errors_are_not_cached(insurance_db, monkeypatch):
+    def broken(engine):
+        raise RuntimeError("connection refused")
+
+    introspect = database._introspect_catalog
+    monkeypatch.setattr(database, "_introspect_catalog", broken)
+    assert get_full_table_info().startswith("Error getting full table info")
+    monkeypatch.setattr(database, "_introspect_catalog", introspect)
+    assert "CREATE TABLE clients" in get_full_table_info()
+    assert get_tenant().cache  # now cached
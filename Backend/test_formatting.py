@@ -0,0 +1,54 @@
+import os
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+import src.chains as chains
+import src.config as config
+from src.formatting import format_rows, format_sample, needs_llm
+from src.result_cache import QueryResult
+
+def test_format_rows_single_value_list_and_table():
+    assert format_rows(["total"], [(3,)]) == "3"
+    assert format_rows(["nom"], [("Ali",), ("Sara",)]) == "- Ali\n- Sara"
+    assert format_rows(["nom", "prime"], [("Ali", 12.5), ("Sara", 100.0)]).splitlines() == [
+        "nom  | prime",
+        "-----+------",
+        "Ali  | 12.5",
+        "Sara | 100",
+    ]
+    assert format_rows(["nom"], []) == "No data found."
+
+def test_needs_llm_auto_thresholds(monkeypatch):
+    monkeypatch.setattr(config, "ANSWER_LOCAL_MAX_ROWS", 2)
+    monkeypatch.setattr(config, "ANSWER_LOCAL_MAX_CELL_CHARS", 10)
+    assert not needs_llm(["nom"], [("Ali",), ("Sara",)], mode="auto")
+    assert needs_llm(["nom"], [("a",), ("b",), ("c",)], mode="auto")
+    assert needs_llm(["nom"], [("x" * 11,)], mode="auto")
+    assert needs_llm(["nom"], [("Ali",)], mode="llm")
+    assert not needs_llm(["nom"], [("a",)] * 10, mode="local")
+
+def test_format_sample_is_bounded():
+    rows = [(i, f"client {i}") for i in range(10000)]
+    text = format_sample(["id", "nom"], rows, total_rows=10000, max_rows=20, max_tokens=500)
+    assert text.count("client ") == 20
+    assert text.endswith("(first 20 of 10000 rows)")
+    text = format_sample(["id", "nom"], rows, max_rows=5000, max_tokens=100)
+    assert "more lines omitted" in text and len(text) < 1000
+
+def test_response_prompt_gets_a_sample_not_every_row(monkeypatch):
+    rows = 10000
+    result = QueryResult(["id", "nom"], [list(range(rows)), [f"client {i}" for i in range(rows)]])
+    prompts = []
+
+    class ResponseChain:
+        def invoke(self, inputs, config=None):
+            prompts.append(inputs["input"])
+            return "10000 clients"
+
+    monkeypatch.setattr(chains, "generate_sql", lambda question, llm: ("SELECT id, nom FROM clients", None))
+    monkeypatch.setattr(chains, "run_query_result", lambda query: result)
+    monkeypatch.setattr(chains, "emit_event", lambda *args: None)
+    chain = chains.FullChain(verbose=False)
+    chain._response_chain = ResponseChain()
+
+    assert chain.run("liste des clients") == {"output": "10000 clients"}
+    assert prompts[0].count("client ") == config.ANSWER_LLM_MAX_ROWS
+    assert f"(first {config.ANSWER_LLM_MAX_ROWS} of 10000 rows)" in prompts[0]
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+import src.chains as chains
+from src.cache import LRUCache
+
+
+class CountingChain:
+    def __init__(self):
+        self.inputs = []
+
+    def invoke(self, inputs, config=None):
+        self.inputs.append(inputs)
+        return "plt.bar(data['produit'], data['prime'])"
+
+
+@pytest.fixture
+def codegen(monkeypatch):
+    chain = CountingChain()
+    monkeypatch.setattr(chains, "graph_code_cache", LRUCache(max_entries=10))
+    monkeypatch.setattr(chains, "graph_code_chain", chain)
+    return chain
+
+
+def primes(values):
+    return pd.DataFrame({"produit": ["auto", "habitation"][: len(values)], "prime": values})
+
+
+def test_describe_columns_lists_dtypes_not_rows():
+    assert chains.describe_columns(primes([420.5, 310.0])) == "produit: object, prime: float64"
+
+
+def test_same_question_and_shape_reuses_code(codegen):
+    code, key = chains.generate_graph_code("Primes par produit ?", primes([420.5, 310.0]))
+    # Different rows, same columns and dtypes: the cached code applies
+    again, again_key = chains.generate_graph_code("  primes PAR produit", primes([99.0]))
+    assert again == code and again_key == key
+    assert len(codegen.inputs) == 1
+    assert "420.5" not in str(codegen.inputs[0])
+
+
+def test_new_shape_regenerates_code(codegen):
+    chains.generate_graph_code("Primes par produit ?", primes([420.5, 310.0]))
+    chains.generate_graph_code("Primes par produit ?", primes([420, 310]))
+    assert len(codegen.inputs) == 2
+    assert codegen.inputs[1]["columns"] == "produit: object, prime: int64"
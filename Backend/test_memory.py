@@ -0,0 +1,69 @@
+from langchain_core.messages import AIMessage
+from src.memory import TokenBudgetMemory, compact_text, count_tokens
+
+ROWS = "\n".join(f"client {i} | contrat {i}" for i in range(200))
+
+def test_compact_text_keeps_head_or_tail():
+    head = compact_text(ROWS, 50)
+    assert head.startswith("client 0 |") and head.endswith("more lines omitted]")
+    tail = compact_text(ROWS, 50, keep_tail=True)
+    assert tail.startswith("[...") and tail.endswith("client 199 | contrat 199")
+    assert count_tokens(head) <= 60 and count_tokens(tail) <= 60
+    assert compact_text("short answer", 50) == "short answer"
+
+def _turns(memory, count, start=0):
+    for i in range(start, start + count):
+        memory.save_context({"input": f"question {i}"}, {"output": f"answer {i}"})
+
+def test_window_folds_oldest_turns():
+    memory = TokenBudgetMemory(llm=None, max_tokens=1000, window_turns=2, fold_batch=2)
+    _turns(memory, 3)
+    assert memory.summary == "" and len(memory.chat_memory.messages) == 6
+    _turns(memory, 1, start=3)
+    assert memory.stats()["turns_verbatim"] == 2 and memory.summarized_turns == 2
+    history = memory.load_memory_variables({})["history"]
+    assert history.startswith("Summary of earlier conversation:")
+    assert "question 0" in memory.summary and "answer 3" in history
+
+def test_bulky_messages_are_compacted():
+    memory = TokenBudgetMemory(llm=None, max_tokens=1000, max_message_tokens=40)
+    memory.save_context({"input": "liste des clients"}, {"output": ROWS})
+    assert count_tokens(memory.chat_memory.messages[1].content) <= 50
+
+def test_fallback_summary_keeps_most_recent_turns():
+    memory = TokenBudgetMemory(llm=None, max_tokens=120, window_turns=1, fold_batch=1)
+    _turns(memory, 30)
+    assert count_tokens(memory.summary) <= 70
+    # The latest folded turn survives; the oldest ones were dropped
+    assert "answer 28" in memory.summary and "question 0\n" not in memory.summary
+    assert memory.chat_memory.messages[-1].content == "answer 29"
+
+class SummaryModel:
+    def __init__(self):
+        self.prompts = []
+
+    def invoke(self, prompt, config=None):
+        self.prompts.append(prompt)
+        return AIMessage(content="The user asked about clients.")
+
+class FailingModel:
+    def invoke(self, prompt, config=None):
+        raise RuntimeError("provider down")
+
+def test_llm_summary_and_failure_fallback():
+    model = SummaryModel()
+    memory = TokenBudgetMemory(llm=model, max_tokens=1000, window_turns=1, fold_batch=1)
+    _turns(memory, 2)
+    assert memory.summary == "The user asked about clients."
+    assert "question 0" in model.prompts[0]
+
+    memory = TokenBudgetMemory(llm=FailingModel(), max_tokens=1000, window_turns=1, fold_batch=1)
+    _turns(memory, 2)
+    assert "question 0" in memory.summary
+
+def test_clear_resets_summary():
+    memory = TokenBudgetMemory(llm=None, max_tokens=1000, window_turns=1, fold_batch=1)
+    _turns(memory, 3)
+    memory.clear()
+    assert memory.summary == "" and memory.chat_memory.messages == []
+    assert memory.stats()["turns_summarized"] == 0
@@ -0,0 +1,65 @@
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+import src.metrics as metrics
+from src.metrics import Counter, Histogram, TokenUsageCallbackHandler, timer
+from src.streaming import SQL_GENERATION_TAG, STAGE_TAGS
+
+def test_counter_render():
+    counter = Counter("demo_total", "Demo counter", ("route",))
+    counter.inc(route="sql_query")
+    counter.inc(2, route='say "hi"')
+    assert counter.render() == [
+        "# HELP demo_total Demo counter",
+        "# TYPE demo_total counter",
+        'demo_total{route="say \\"hi\\""} 2',
+        'demo_total{route="sql_query"} 1',
+    ]
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("demo_seconds", "Demo", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value)
+    assert histogram.render()[2:] == [
+        'demo_seconds_bucket{le="0.1"} 1',
+        'demo_seconds_bucket{le="1"} 2',
+        'demo_seconds_bucket{le="+Inf"} 3',
+        "demo_seconds_sum 5.55",
+        "demo_seconds_count 3",
+    ]
+
+def test_timer_records_duration_and_errors(monkeypatch):
+    seconds, errors = Histogram("s", "s", ("stage",)), Counter("e", "e", ("stage",))
+    monkeypatch.setattr(metrics, "STAGE_SECONDS", seconds)
+    monkeypatch.setattr(metrics, "STAGE_ERRORS", errors)
+    with timer("sql_execution"):
+        pass
+    with pytest.raises(ValueError), timer("sql_execution"):
+        raise ValueError("boom")
+    assert seconds._series[("sql_execution",)][-1] == 2
+    assert errors._values == {("sql_execution",): 1}
+
+def test_token_usage_is_labelled_by_stage(monkeypatch):
+    total = Counter("t", "t", ("stage", "kind"))
+    monkeypatch.setattr(metrics, "LLM_TOKENS_TOTAL", total)
+    handler = TokenUsageCallbackHandler(STAGE_TAGS)
+    message = AIMessage(content="SELECT 1", usage_metadata={"input_tokens": 120, "output_tokens": 8, "total_tokens": 128})
+    handler.on_chat_model_start({}, [[]], run_id="run-1", tags=[SQL_GENERATION_TAG])
+    handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id="run-1")
+    handler.on_chat_model_start({}, [[]], run_id="run-2")
+    legacy = LLMResult(generations=[[ChatGeneration(message=AIMessage(content="ok"))]],
+                       llm_output={"token_usage": {"prompt_tokens": 50, "completion_tokens": 5}})
+    handler.on_llm_end(legacy, run_id="run-2")
+    assert total._values == {
+        (SQL_GENERATION_TAG, "prompt"): 120, (SQL_GENERATION_TAG, "completion"): 8,
+        ("agent", "prompt"): 50, ("agent", "completion"): 5,
+    }
+
+def test_gauges_and_metrics_endpoint(monkeypatch):
+    from src.main import app
+
+    monkeypatch.setattr(metrics, "_gauge_collectors", [lambda: {"demo_gauge": 3, "skipped": None}, lambda: 1 / 0])
+    body = TestClient(app).get("/metrics").text
+    assert "# TYPE chat_stage_duration_seconds histogram" in body
+    assert "demo_gauge 3" in body and "skipped" not in body
@@ -0,0 +1,77 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.rendering import RenderError, RenderPool
+
+# Jobs run in spawned workers: they must be module-level functions
+
+
+def sleep_job(seconds: float) -> int:
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def failing_job():
+    raise ValueError("no column named 'prime'")
+
+
+def crashing_job():
+    os._exit(1)
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(workers: int, timeout: float) -> RenderPool:
+        pool = RenderPool(workers=workers, timeout=timeout)
+        pool.warm()
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.shutdown()
+
+
+def test_queue_wait_does_not_count_towards_timeout(make_pool):
+    pool = make_pool(workers=1, timeout=2)
+    with ThreadPoolExecutor(max_workers=3) as threads:
+        futures = [threads.submit(pool.run, sleep_job, 0.8) for _ in range(3)]
+        # The last job waits ~1.6s for the only worker, then runs well within its 2s
+        pids = {future.result() for future in futures}
+    assert len(pids) == 1
+    assert pool.timeouts == 0
+
+
+def test_timeout_replaces_only_the_stuck_worker(make_pool):
+    pool = make_pool(workers=2, timeout=1)
+    with ThreadPoolExecutor(max_workers=2) as threads:
+        stuck = threads.submit(pool.run, sleep_job, 30)
+        time.sleep(0.2)
+        healthy_pid = threads.submit(pool.run, sleep_job, 0.5).result()
+        with pytest.raises(RenderError, match="timed out"):
+            stuck.result()
+    assert pool.timeouts == 1
+    # The healthy worker kept running; the stuck one was replaced by a fresh process
+    live = {worker.process.pid for worker in pool._all}
+    assert healthy_pid in live and len(live) == 2
+    assert pool.run(sleep_job, 0) in live
+
+
+def test_job_exception_keeps_worker(make_pool):
+    pool = make_pool(workers=1, timeout=5)
+    pid = pool.run(sleep_job, 0)
+    with pytest.raises(ValueError, match="prime"):
+        pool.run(failing_job)
+    assert pool.run(sleep_job, 0) == pid
+
+
+def test_crash_replaces_worker(make_pool):
+    pool = make_pool(workers=1, timeout=5)
+    pid = pool.run(sleep_job, 0)
+    with pytest.raises(RenderError, match="crashed"):
+        pool.run(crashing_job)
+    assert pool.failures == 1
+    assert pool.run(sleep_job, 0) != pid
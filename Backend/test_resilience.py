@@ -0,0 +1,104 @@
+import time
+from typing import Any, List, Optional
+import pytest
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.prompts import ChatPromptTemplate
+from src.resilience import get_breaker, resilient
+
+TOKENS = ["SELECT ", "nom ", "FROM ", "clients"]
+
+class StreamingModel(BaseChatModel):
+    """Streams TOKENS, like ChatOpenAI."""
+
+    model_name: str = "streaming-test"
+
+    @property
+    def _llm_type(self) -> str:
+        return "streaming-test"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(TOKENS)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for token in TOKENS:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+class BlockingModel(StreamingModel):
+    """No streaming support: the whole answer at once."""
+
+    model_name: str = "blocking-test"
+    _stream = BaseChatModel._stream
+
+class TokenCollector(BaseCallbackHandler):
+    def __init__(self):
+        self.tokens = []
+
+    def on_llm_new_token(self, token, **kwargs):
+        self.tokens.append(token)
+
+def test_invoke_reports_tokens_to_callbacks():
+    collector = TokenCollector()
+    llm = resilient(StreamingModel(), breaker_name="test-invoke")
+    result = llm.invoke("list client names", config={"callbacks": [collector]})
+    assert result.content == "".join(TOKENS)
+    assert collector.tokens == TOKENS
+
+def test_chain_reports_tokens_to_callbacks():
+    collector = TokenCollector()
+    chain = ChatPromptTemplate.from_template("Question: {question}") | resilient(StreamingModel(), breaker_name="test-chain")
+    chain.invoke({"question": "list client names"}, config={"callbacks": [collector], "tags": ["sql_generation"]})
+    assert collector.tokens == TOKENS
+
+def test_wrapper_callbacks_receive_tokens():
+    collector = TokenCollector()
+    llm = resilient(StreamingModel(), breaker_name="test-own-callbacks", callbacks=[collector])
+    llm.invoke("list client names")
+    assert collector.tokens == TOKENS
+
+def test_stream_reports_each_token_once():
+    collector = TokenCollector()
+    llm = resilient(StreamingModel(), breaker_name="test-stream")
+    chunks = [c.content for c in llm.stream("list client names", config={"callbacks": [collector]})]
+    assert chunks == TOKENS
+    assert collector.tokens == TOKENS
+
+def test_non_streaming_model_reports_one_token():
+    collector = TokenCollector()
+    llm = resilient(BlockingModel(), breaker_name="test-blocking")
+    result = llm.invoke("list client names", config={"callbacks": [collector]})
+    assert result.content == "".join(TOKENS)
+    assert collector.tokens == ["".join(TOKENS)]
+
+def _half_open(name: str):
+    breaker = get_breaker(name)
+    breaker.state, breaker.opened_at = "open", time.monotonic() - breaker.cooldown - 1
+    return breaker
+
+def test_abandoned_trial_stream_closes_breaker():
+    llm = resilient(StreamingModel(), breaker_name="test-abandoned")
+    breaker = _half_open("test-abandoned")
+    stream = llm.stream("list client names")
+    assert next(stream).content == TOKENS[0]
+    stream.close()  # client disconnected mid-answer
+    assert breaker.state == "closed"
+    assert llm.invoke("list client names").content == "".join(TOKENS)
+
+class InterruptedModel(StreamingModel):
+    model_name: str = "interrupted-test"
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        raise KeyboardInterrupt
+        yield
+
+def test_interrupted_trial_allows_a_new_trial():
+    breaker = _half_open("test-interrupted")
+    with pytest.raises(KeyboardInterrupt):
+        resilient(InterruptedModel(), breaker_name="test-interrupted").invoke("list client names")
+    assert breaker.state == "half_open"
+    result = resilient(StreamingModel(), breaker_name="test-interrupted").invoke("list client names")
+    assert result.content == "".join(TOKENS)
+    assert breaker.state == "closed"
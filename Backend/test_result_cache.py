@@ -0,0 +1,147 @@
+import time
+import pytest
+from sqlalchemy import create_engine
+import src.config as config
+import src.result_cache as result_cache
+from src.result_cache import QueryResult, ResultCache, _fetch_bounded, bounded_sql
+
+def test_bounded_sql_adds_or_tightens_limit():
+    assert bounded_sql("SELECT nom FROM clients;", 100) == "SELECT nom FROM clients\nLIMIT 101"
+    assert bounded_sql("SELECT nom FROM clients LIMIT 5000", 100) == "SELECT nom FROM clients LIMIT 101"
+    assert bounded_sql("SELECT nom FROM clients LIMIT 10", 100) == "SELECT nom FROM clients LIMIT 10"
+    assert bounded_sql("SELECT nom FROM clients LIMIT 500 OFFSET 20", 100) == "SELECT nom FROM clients LIMIT 101 OFFSET 20"
+    assert bounded_sql("SELECT nom FROM clients -- tous", 100) == "SELECT nom FROM clients -- tous\nLIMIT 101"
+    assert bounded_sql("SELECT nom FROM clients FETCH FIRST 5 ROWS ONLY", 100).endswith("ONLY")
+
+def test_bounded_sql_replaces_limit_all():
+    assert bounded_sql("SELECT nom FROM clients LIMIT ALL", 100) == "SELECT nom FROM clients LIMIT 101"
+    assert bounded_sql("SELECT nom FROM clients limit all offset 5;", 100) == "SELECT nom FROM clients limit 101 offset 5"
+
+def test_query_result_summary():
+    values = [[1, 2, 3], ["a", "b", "c"]]
+    assert QueryResult(["id", "nom"], values).summary() == ""
+    assert QueryResult(["id", "nom"], values, truncated=True).summary() == "(showing 3 of more than 3 rows)"
+    assert QueryResult(["id", "nom"], values, truncated=True, total_rows=40).summary() == "(showing 3 of 40 rows)"
+    estimated = QueryResult(["id", "nom"], values, truncated=True, total_rows=40, total_estimated=True)
+    assert estimated.summary() == "(showing 3 of about 40 rows)"
+    assert QueryResult(["id", "nom"], values).rows == [(1, "a"), (2, "b"), (3, "c")]
+
+@pytest.fixture
+def conn():
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        conn.exec_driver_sql("CREATE TABLE contrats (id INTEGER, produit TEXT)")
+        conn.exec_driver_sql(
+            "INSERT INTO contrats VALUES " + ", ".join(f"({i}, 'produit {i}')" for i in range(50))
+        )
+        yield conn
+
+@pytest.fixture
+def no_exact_total(monkeypatch):
+    monkeypatch.setattr(config, "RESULT_EXACT_TOTAL", False)
+    monkeypatch.setattr(config, "RESULT_FETCH_BATCH", 7)
+
+def test_fetch_within_caps(conn, no_exact_total):
+    result = _fetch_bounded(conn, "SELECT id, produit FROM contrats", max_rows=100, max_bytes=1 << 20)
+    assert not result.truncated and result.row_count == 50 and result.total_rows == 50
+    assert result.columns == ("id", "produit")
+
+def test_fetch_truncated_by_rows(conn, no_exact_total):
+    result = _fetch_bounded(conn, "SELECT id FROM contrats ORDER BY id", max_rows=20, max_bytes=1 << 20)
+    assert result.truncated and result.values[0] == list(range(20))
+    assert result.total_rows is None  # not counted by default
+
+def test_fetch_truncated_by_bytes(conn, no_exact_total):
+    result = _fetch_bounded(conn, "SELECT id, produit FROM contrats", max_rows=100, max_bytes=1000)
+    assert result.truncated and 0 < result.row_count < 50
+
+def test_fetch_exact_total_is_opt_in(conn, monkeypatch):
+    monkeypatch.setattr(config, "RESULT_EXACT_TOTAL", True)
+    result = _fetch_bounded(conn, "SELECT id FROM contrats", max_rows=20, max_bytes=1 << 20)
+    assert result.total_rows == 50 and not result.total_estimated
+
+def test_fetch_total_from_planner_estimate(conn, no_exact_total, monkeypatch):
+    estimate = {"cost": 10.0, "rows": 21, "unbounded_rows": 48, "max_node_rows": 48}
+    monkeypatch.setattr(result_cache, "guard_connection", lambda conn, sql: estimate)
+    result = _fetch_bounded(conn, "SELECT id FROM contrats", max_rows=20, max_bytes=1 << 20)
+    assert result.summary() == "(showing 20 of about 48 rows)"
+    # The query's own LIMIT bounds the estimate
+    result = _fetch_bounded(conn, "SELECT id FROM contrats LIMIT 30", max_rows=20, max_bytes=1 << 20)
+    assert result.summary() == "(showing 20 of about 30 rows)"
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(result_cache, "referenced_tables", lambda query: {"contrats"} if "contrats" in query else set())
+    uri = f"sqlite:///{tmp_path / 'cache.db'}"
+    return ResultCache(max_bytes=4000, ttl=60, stats_interval=60), uri
+
+def _result(n: int, size: int = None) -> QueryResult:
+    return QueryResult(["id"], [list(range(n))], size=size)
+
+def test_cache_hit_and_canonical_key(cache):
+    store, uri = cache
+    result = _result(3)
+    store.put(uri, "SELECT id\n  FROM contrats;", result)
+    assert store.get(uri, "SELECT id FROM contrats") is result
+    assert store.get("sqlite:///other.db", "SELECT id FROM contrats") is None
+    assert (store.hits, store.misses) == (1, 1)
+
+def test_cache_ttl(cache):
+    store, uri = cache
+    store.ttl = 0.01
+    store.put(uri, "SELECT id FROM contrats", _result(3))
+    time.sleep(0.02)
+    assert store.get(uri, "SELECT id FROM contrats") is None
+
+def test_cache_byte_budget_evicts_oldest(cache):
+    store, uri = cache
+    results = [_result(5, size=500) for _ in range(12)]
+    for i, result in enumerate(results):
+        store.put(uri, f"SELECT {i}", result)
+    assert store.bytes == store.max_bytes and store.evictions == 4
+    assert store.get(uri, "SELECT 0") is None
+    assert store.get(uri, "SELECT 11") is results[-1]
+    store.put(uri, "SELECT huge", _result(5, size=1001))  # over a quarter of the budget: not cached
+    assert store.get(uri, "SELECT huge") is None
+
+def test_cache_invalidate_table(cache):
+    store, uri = cache
+    store.put(uri, "SELECT id FROM contrats", _result(3))
+    store.put(uri, "SELECT 1", _result(1))
+    store.invalidate_table(uri, "contrats")
+    assert store.get(uri, "SELECT id FROM contrats") is None
+    assert store.get(uri, "SELECT 1") is not None
+
+def test_to_dataframe_dtypes_from_type_codes():
+    from datetime import date
+    from decimal import Decimal
+
+    result = QueryResult(
+        ["id", "sinistres", "prime", "actif", "date_effet", "produit", "nom", "note"],
+        [
+            [1, 2, 3, 4],
+            [5, None, 7, 8],
+            [Decimal("420.50"), None, Decimal("310"), Decimal("0.5")],
+            [True, False, True, True],
+            [date(2024, 1, 1), date(2024, 2, 1), None, date(2024, 3, 1)],
+            ["auto", "auto", "auto", "habitation"],
+            ["Durand", "Martin", "Petit", "Roux"],
+            [1.5, 2, None, 3],
+        ],
+        type_codes=[23, 20, 1700, 16, 1082, 1043, 25, None],
+    )
+    frame = result.to_dataframe()
+    assert [str(t) for t in frame.dtypes] == [
+        "int64", "Int64", "float64", "bool", "datetime64[ns]", "category", "object", "float64",
+    ]
+    assert frame["prime"].iloc[0] == 420.5 and frame["prime"].isna().iloc[1]
+    assert frame["date_effet"].isna().iloc[2]
+
+def test_to_dataframe_keeps_duplicate_names_and_cached_frame():
+    result = QueryResult(["nom", "nom"], [["a", "b"], ["c", "d"]], type_codes=[25, 25])
+    frame = result.to_dataframe()
+    assert list(frame.columns) == ["nom", "nom"]
+    assert frame.iloc[1].tolist() == ["b", "d"]
+    # Callers may add columns without touching the cached frame
+    frame["extra"] = 1
+    assert list(result.to_dataframe().columns) == ["nom", "nom"]
@@ -0,0 +1,78 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+import src.router as router
+from src.router import ROUTE_GRAPH, ROUTE_SQL, route, run_routed
+
+
+class History:
+    def __init__(self, *messages):
+        self.messages = list(messages)
+
+
+class Memory:
+    def __init__(self, *messages):
+        self.chat_memory = History(*messages)
+        self.saved = []
+
+    def save_context(self, inputs, outputs):
+        self.saved.append((inputs["input"], outputs["output"]))
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("montant des sinistres ouverts", (ROUTE_SQL, "schema match")),
+    ("chart of prime by produit for contrats", (ROUTE_GRAPH, "graph keyword")),
+    ("list contrats without a chart", (None, "negated graph keyword")),
+    ("hello there friend", (None, "too short")),
+    ("sinistres", (None, "too short")),
+    ("what is the weather today", (None, "no schema match")),
+])
+def test_route_reasons(insurance_db, question, expected):
+    assert route(question) == expected
+
+
+def test_follow_ups_need_the_agent(insurance_db):
+    memory = Memory(HumanMessage("montant des sinistres"), AIMessage("Le montant total est 900."))
+    assert route("and the contrats of those clients", memory) == (None, "needs history")
+    # Without history, the same opener is routed on the schema match alone
+    assert route("and the contrats of those clients") == (ROUTE_SQL, "schema match")
+
+
+def test_clarification_answer_needs_the_agent(insurance_db):
+    memory = Memory(HumanMessage("prime des contrats"), AIMessage("Pour quel produit ?"))
+    assert route("prime des contrats auto", memory) == (None, "needs history")
+
+
+def test_router_can_be_disabled(insurance_db, monkeypatch):
+    monkeypatch.setattr(router.config, "ROUTER_ENABLED", False)
+    assert route("montant des sinistres ouverts") == (None, "disabled")
+
+
+class FakeTool:
+    def __init__(self, observation):
+        self.observation = observation
+        self.inputs = []
+
+    def invoke(self, question, config=None):
+        self.inputs.append(question)
+        return self.observation
+
+
+def test_run_routed_saves_the_turn(monkeypatch):
+    tool = FakeTool({"output": "900", "final_answer": True})
+    monkeypatch.setitem(router._ROUTED_TOOLS, ROUTE_SQL, tool)
+    memory = Memory()
+
+    result = run_routed(ROUTE_SQL, "montant des sinistres ouverts", "schema match", memory)
+
+    assert tool.inputs == ["montant des sinistres ouverts"]
+    assert result["output"] == "900" and result["route"] == ROUTE_SQL
+    action, observation = result["intermediate_steps"][0]
+    assert action.tool == ROUTE_SQL and observation == tool.observation
+    assert memory.saved == [("montant des sinistres ouverts", "900")]
+
+
+def test_run_routed_graph_answer(monkeypatch):
+    tool = FakeTool({"output": "Graph saved as artifact abc", "final_answer": True, "artifact_id": "abc"})
+    monkeypatch.setitem(router._ROUTED_TOOLS, ROUTE_GRAPH, tool)
+    result = run_routed(ROUTE_GRAPH, "chart of prime by produit?")
+    assert result["output"] == 'Here is the chart of "chart of prime by produit".'
@@ -0,0 +1,54 @@
+from src.database import render_schema
+from src.schema_index import SchemaIndex, get_relevant_schema, get_relevant_tables, get_schema_index, tokenize
+
+def _table(name, columns, samples=(), fks=()):
+    return {
+        "name": name,
+        "columns": [{"name": c, "type": "TEXT"} for c in columns],
+        "primary_key": ["id"],
+        "foreign_keys": [{"columns": [c], "referred_table": t, "referred_columns": ["id"]} for c, t in fks],
+        "row_estimate": None,
+        "sample_rows": [dict(zip(columns, row)) for row in samples],
+    }
+
+CATALOG = [
+    _table("clients", ["id", "nom", "ville"], [("1", "Ali", "Tunis")]),
+    _table("contrats", ["id", "client_id", "produit", "prime"], [("1", "1", "auto", "120")], [("client_id", "clients")]),
+    _table("sinistres", ["id", "contrat_id", "montant", "statut"], [("1", "1", "900", "ouvert")],
+           [("contrat_id", "contrats")]),
+    _table("agences", ["id", "adresse"]),
+    _table("employes", ["id", "agence_id", "salaire"], fks=[("agence_id", "agences")]),
+]
+
+def test_tokenize_splits_identifiers_and_plurals():
+    assert tokenize("date_debut") == ["date", "debut"]
+    assert tokenize("Sinistres ouverts") == ["sinistre", "ouvert"]
+    assert tokenize("class") == ["class"]
+
+def test_search_ranks_by_name_then_adds_join_partners():
+    index = SchemaIndex(CATALOG)
+    assert index.search("montant des sinistres", k=1) == ["sinistres", "contrats"]
+    assert index.search("salaire des employés", k=1)[0] == "employes"
+
+def test_sampled_values_match():
+    index = SchemaIndex(CATALOG)
+    assert index.search("clients à Tunis", k=1)[0] == "clients"
+    assert "sinistres" in index.score("dossiers ouverts")
+
+def test_no_match_returns_nothing():
+    assert SchemaIndex(CATALOG).search("bonjour", k=3) == []
+
+def test_render_only_selected_tables():
+    text = render_schema(CATALOG, ["contrats"])
+    assert "CREATE TABLE contrats" in text and "CREATE TABLE clients" not in text
+
+def test_relevant_schema_on_the_database(insurance_db):
+    schema = get_relevant_schema("montant des sinistres", k=1)
+    assert "CREATE TABLE sinistres" in schema and "CREATE TABLE contrats" in schema
+    assert "CREATE TABLE clients" not in schema
+    assert get_relevant_tables("liste des clients", k=1)[0] == "clients"
+    assert get_schema_index() is get_schema_index()  # cached per schema version
+
+def test_unmatched_question_falls_back_to_full_schema(insurance_db):
+    schema = get_relevant_schema("bonjour")
+    assert all(f"CREATE TABLE {t}" in schema for t in ("clients", "contrats", "sinistres"))
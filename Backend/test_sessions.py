@@ -0,0 +1,93 @@
+import os
+import time
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+from fastapi.testclient import TestClient
+from src.database import get_tenant
+from src.sessions import SessionStore
+
+DB_A = "sqlite:///a.db"
+DB_B = "sqlite:///b.db"
+
+def test_binding_survives_lru_eviction():
+    store = SessionStore(max_sessions=1, idle_timeout=3600)
+    store.set("user123", "executor-1")
+    store.bind_db("user123", DB_A)
+    store.set("user456", "executor-2")
+    assert "user123" not in store
+    assert store.db_uri("user123") == DB_A
+
+def test_binding_survives_idle_eviction():
+    store = SessionStore(max_sessions=10, idle_timeout=0.01)
+    store.set("user123", "executor-1")
+    store.bind_db("user123", DB_A)
+    time.sleep(0.02)
+    assert store.stats()["active"] == 0
+    assert store.db_uri("user123") == DB_A
+    # The recreated executor still runs against the bound database
+    assert store.get_or_create("user123", lambda: "executor-2") == "executor-2"
+    assert store.db_uri("user123") == DB_A
+
+def test_bindings_are_bounded_lru():
+    store = SessionStore(max_sessions=10, idle_timeout=3600, max_bindings=2)
+    store.bind_db("a", DB_A)
+    store.bind_db("b", DB_B)
+    store.db_uri("a")
+    store.bind_db("c", DB_B)
+    assert store.db_uri("a") == DB_A
+    assert store.db_uri("b") is None
+    assert store.db_uri("c") == DB_B
+
+def test_unbind_falls_back_to_default():
+    store = SessionStore(max_sessions=10, idle_timeout=3600)
+    store.bind_db("user123", DB_A)
+    store.bind_db("user123", None)
+    assert store.db_uri("user123") is None
+
+def test_set_db_uri_invalidates_schema_cache(tmp_path):
+    from src.main import app, sessions
+    uri = f"sqlite:///{tmp_path / 'tenant.db'}"
+    tenant = get_tenant(uri)
+    tenant.cached("catalog", lambda: [{"name": "old_table", "columns": []}])
+    version = tenant.schema_version
+
+    response = TestClient(app).post("/set-db-uri?session_id=schema-test", json={"new_db_uri": uri})
+
+    assert response.status_code == 200
+    assert sessions.db_uri("schema-test") == uri
+    assert tenant.schema_version == version + 1
+    assert tenant.cached("catalog", lambda: []) == []
+
+def test_turn_lock_is_per_session():
+    store = SessionStore(max_sessions=10, idle_timeout=3600)
+    assert store.turn_lock("user123") is store.turn_lock("user123")
+    assert store.turn_lock("user123") is not store.turn_lock("user456")
+
+def test_turns_of_one_session_run_one_at_a_time():
+    from concurrent.futures import ThreadPoolExecutor
+    from src.main import run_agent
+
+    store = SessionStore(max_sessions=10, idle_timeout=3600)
+    active, peak = [0], [0]
+
+    class Memory:
+        def load_memory_variables(self, inputs):
+            return {"history": ""}
+
+    class Executor:
+        memory = Memory()
+
+        def invoke(self, inputs, config=None):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            active[0] -= 1
+            return {"output": "ok"}
+
+    executor = Executor()
+    with ThreadPoolExecutor(max_workers=4) as threads:
+        futures = [
+            threads.submit(run_agent, executor, "explique la garantie", None, None, store.turn_lock("user123"))
+            for _ in range(4)
+        ]
+        assert [f.result()["output"] for f in futures] == ["ok"] * 4
+    assert peak[0] == 1
@@ -0,0 +1,102 @@
+import json
+import pytest
+import src.config as config
+from src.result_cache import bounded_sql
+from src.sql_guard import SQLGuardError, guard_connection
+
+QUERY = "SELECT c.nom, o.produit FROM clients c JOIN contrats o ON o.client_id = c.id ORDER BY o.prime DESC"
+
+# EXPLAIN (FORMAT JSON) of bounded_sql(QUERY): the Limit scales the sort's cost down
+BOUNDED_PLAN = [{"Plan": {
+    "Node Type": "Limit", "Total Cost": 125.06, "Plan Rows": 501,
+    "Plans": [{
+        "Node Type": "Sort", "Total Cost": 46893856.75, "Plan Rows": 2000000,
+        "Plans": [{"Node Type": "Hash Join", "Total Cost": 310452.0, "Plan Rows": 2000000}],
+    }],
+}}]
+
+
+class _Result:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class _Dialect:
+    name = "postgresql"
+
+
+class StubConnection:
+    """Records statements and answers EXPLAIN with a canned plan."""
+
+    dialect = _Dialect()
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.statements = []
+
+    def exec_driver_sql(self, sql):
+        self.statements.append(sql)
+        return _Result(json.dumps(self.plan) if sql.startswith("EXPLAIN") else None)
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(config, "SQL_EXPLAIN_ENABLED", True)
+    monkeypatch.setattr(config, "SQL_MAX_COST", 1000000.0)
+    monkeypatch.setattr(config, "SQL_MAX_PLAN_ROWS", 10000000.0)
+
+
+def test_cost_is_checked_below_the_limit(limits):
+    conn = StubConnection(BOUNDED_PLAN)
+    with pytest.raises(SQLGuardError) as error:
+        guard_connection(conn, bounded_sql(QUERY, 500))
+    # Row estimates are within SQL_MAX_PLAN_ROWS: the cost check alone rejects
+    assert error.value.code == "cost_exceeded"
+    assert error.value.details["cost"] == 46893856.75
+    assert error.value.details["bounded_cost"] == 125.06
+    assert conn.statements[0] == "SET TRANSACTION READ ONLY"
+
+
+def test_cheap_plan_passes(limits):
+    plan = [{"Plan": {
+        "Node Type": "Limit", "Total Cost": 4.2, "Plan Rows": 501,
+        "Plans": [{"Node Type": "Seq Scan", "Total Cost": 845.0, "Plan Rows": 20000}],
+    }}]
+    estimate = guard_connection(StubConnection(plan), bounded_sql("SELECT nom FROM clients", 500))
+    assert estimate["cost"] == 845.0
+    assert estimate["rows"] == 501
+
+
+def test_plan_without_limit(limits):
+    plan = [{"Plan": {"Node Type": "Aggregate", "Total Cost": 2000000.0, "Plan Rows": 1, "Plans": [
+        {"Node Type": "Seq Scan", "Total Cost": 1500000.0, "Plan Rows": 9000000},
+    ]}}]
+    with pytest.raises(SQLGuardError) as error:
+        guard_connection(StubConnection(plan), "SELECT COUNT(*) FROM contrats")
+    assert error.value.code == "cost_exceeded"
+    assert error.value.details["cost"] == 2000000.0
+
+
+def test_large_scan_under_limit_passes(limits):
+    plan = [{"Plan": {
+        "Node Type": "Limit", "Total Cost": 1.5, "Plan Rows": 100,
+        "Plans": [{"Node Type": "Seq Scan", "Total Cost": 400000.0, "Plan Rows": 25000000}],
+    }}]
+    estimate = guard_connection(StubConnection(plan), "SELECT * FROM contrats LIMIT 100")
+    assert estimate["rows"] == 100
+
+
+def test_runaway_join_under_limit_is_rejected(limits):
+    plan = [{"Plan": {
+        "Node Type": "Limit", "Total Cost": 0.5, "Plan Rows": 501,
+        "Plans": [{"Node Type": "Nested Loop", "Total Cost": 900000.0, "Plan Rows": 4e11, "Plans": [
+            {"Node Type": "Seq Scan", "Total Cost": 400.0, "Plan Rows": 20000},
+            {"Node Type": "Seq Scan", "Total Cost": 400.0, "Plan Rows": 20000},
+        ]}],
+    }}]
+    with pytest.raises(SQLGuardError) as error:
+        guard_connection(StubConnection(plan), "SELECT * FROM clients, contrats LIMIT 501")
+    assert error.value.code == "rows_exceeded"
@@ -0,0 +1,96 @@
+from src.sql_lint import Linter
+
+CATALOG = [
+    {
+        "name": "clients",
+        "columns": [{"name": n, "type": t} for n, t in
+                    [("id", "INTEGER"), ("nom", "VARCHAR"), ("email", "VARCHAR"), ("created_at", "TIMESTAMP")]],
+        "primary_key": ["id"],
+        "foreign_keys": [],
+    },
+    {
+        "name": "contrats",
+        "columns": [{"name": n, "type": t} for n, t in
+                    [("id", "INTEGER"), ("client_id", "INTEGER"), ("produit", "VARCHAR"),
+                     ("prime", "NUMERIC"), ("date_debut", "DATE")]],
+        "primary_key": ["id"],
+        "foreign_keys": [{"columns": ["client_id"], "referred_table": "clients", "referred_columns": ["id"]}],
+    },
+]
+
+def lint(query):
+    return Linter(CATALOG).lint(query)
+
+def codes(query):
+    return [issue["code"] for issue in lint(query)]
+
+def test_window_aggregate_is_not_grouping():
+    assert codes(
+        "SELECT client_id, prime, SUM(prime) OVER (PARTITION BY client_id ORDER BY date_debut) FROM contrats"
+    ) == []
+
+def test_ranking_window_is_not_grouping():
+    assert codes("SELECT nom, RANK() OVER (ORDER BY created_at) FROM clients") == []
+
+def test_scalar_subquery_aggregate_is_not_grouping():
+    assert codes(
+        "SELECT c.nom, (SELECT MAX(prime) FROM contrats co WHERE co.client_id = c.id) FROM clients c"
+    ) == []
+
+def test_aggregate_without_group_by():
+    issues = lint("SELECT nom, COUNT(*) FROM clients")
+    assert [i["code"] for i in issues] == ["group_by"]
+    assert issues[0]["column"] == "nom"
+
+def test_ungrouped_column_next_to_window():
+    assert codes("SELECT nom, COUNT(*), RANK() OVER (ORDER BY nom) FROM clients") == ["group_by"]
+
+def test_column_missing_from_group_by():
+    issues = lint(
+        "SELECT c.nom, co.produit, SUM(co.prime) FROM clients c "
+        "JOIN contrats co ON co.client_id = c.id GROUP BY c.nom"
+    )
+    assert [(i["code"], i["column"]) for i in issues] == [("group_by", "produit")]
+
+def test_group_by_ordinal_alias_and_primary_key():
+    assert codes("SELECT produit, SUM(prime) FROM contrats GROUP BY 1") == []
+    assert codes("SELECT produit AS p, SUM(prime) FROM contrats GROUP BY p") == []
+    assert codes(
+        "SELECT c.id, c.nom, COUNT(*) FROM clients c JOIN contrats co ON co.client_id = c.id GROUP BY c.id"
+    ) == []
+
+def test_unknown_column_and_table_suggestions():
+    issues = lint("SELECT nmo FROM clients")
+    assert issues[0]["code"] == "unknown_column" and issues[0]["suggestion"] == "nom"
+    issues = lint("SELECT * FROM client")
+    assert issues[0]["code"] == "unknown_table" and issues[0]["suggestion"] == "clients"
+
+def test_unquoted_aliases_fold_to_lower_case():
+    assert codes("SELECT C.nom FROM clients C") == []
+    assert codes(
+        "SELECT C.nom, K.produit FROM clients AS C JOIN contrats AS K ON K.client_id = C.id"
+    ) == []
+    assert codes("SELECT Cl.nom, COUNT(*) FROM clients cL GROUP BY cl.nom") == []
+    assert codes("SELECT S.n FROM (SELECT nom AS n FROM clients) AS S") == []
+
+def test_unquoted_table_names_fold_to_lower_case():
+    assert codes("SELECT CLIENTS.nom FROM Clients") == []
+
+def test_quoted_alias_keeps_its_case():
+    assert codes('SELECT "C".nom FROM clients "C"') == []
+    assert codes('SELECT c.nom FROM clients "C"') == ["unknown_alias"]
+
+def test_table_name_used_instead_of_alias():
+    issues = lint("SELECT clients.nom FROM clients C")
+    assert [(i["code"], i["alias"]) for i in issues] == [("alias", "c")]
+
+def test_ordered_set_aggregates_are_aggregates():
+    assert codes(
+        "SELECT c.nom, percentile_cont(0.5) WITHIN GROUP (ORDER BY co.prime), "
+        "percentile_disc(0.9) WITHIN GROUP (ORDER BY co.prime), mode() WITHIN GROUP (ORDER BY co.produit) "
+        "FROM clients c JOIN contrats co ON co.client_id = c.id GROUP BY c.nom"
+    ) == []
+    assert codes("SELECT percentile_cont(0.5) WITHIN GROUP (ORDER BY prime) FROM contrats") == []
+    assert codes(
+        "SELECT produit, percentile_cont(0.5) WITHIN GROUP (ORDER BY prime) FROM contrats"
+    ) == ["group_by"]
@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+import time
+import pytest
+from src import startup
+
+
+@pytest.fixture
+def phases(monkeypatch):
+    monkeypatch.setattr(startup, "_phases", {})
+    monkeypatch.setattr(startup, "_last", [time.perf_counter()])
+    return startup._phases
+
+
+def test_marks_time_consecutive_phases(phases):
+    time.sleep(0.02)
+    startup.mark("import_framework")
+    startup.mark("import_app")
+    assert list(phases) == ["import_framework", "import_app"]
+    assert phases["import_framework"] >= 0.02 > phases["import_app"]
+
+
+def test_phase_excludes_time_before_the_block(phases):
+    time.sleep(0.05)
+    with startup.phase("startup_hooks"):
+        pass
+    # Repeated phases accumulate
+    with startup.phase("startup_hooks"):
+        time.sleep(0.02)
+    assert 0.02 <= phases["startup_hooks"] < 0.05
+
+
+def test_report_and_gauges(phases):
+    phases.update({"import_framework": 0.5, "startup_hooks": 0.25})
+    assert startup.report() == {"phases": {"import_framework": 0.5, "startup_hooks": 0.25}, "total_seconds": 0.75}
+    assert startup.summary() == "750 ms (import_framework 500 ms, startup_hooks 250 ms)"
+    assert startup.gauges() == {"startup_import_framework_seconds": 0.5, "startup_startup_hooks_seconds": 0.25}
+
+
+def test_app_import_defers_plotting_libraries():
+    code = "import sys, src.main; print(sorted(m for m in ('matplotlib', 'pandas', 'plotly') if m in sys.modules))"
+    env = dict(os.environ, OPENROUTER_API_KEY=os.environ.get("OPENROUTER_API_KEY", "test"))
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__)), check=True,
+    ).stdout
+    assert output.strip().splitlines()[-1] == "[]"
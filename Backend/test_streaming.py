@@ -0,0 +1,75 @@
+import asyncio
+import json
+import uuid
+from fastapi.testclient import TestClient
+from langchain_core.agents import AgentAction
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+from src.resilience import resilient
+from src.streaming import SQL_GENERATION_TAG, SSECallbackHandler, emit_event, format_sse
+from test_resilience import TOKENS, StreamingModel
+
+def _events(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+def test_format_sse():
+    assert format_sse("rows", {"count": 3}) == 'event: rows\ndata: {"count": 3}\n\n'
+
+def test_emit_event_outside_a_run_is_a_no_op():
+    emit_event("sql", {"query": "SELECT 1"})
+
+def test_handler_tags_tokens_with_their_stage_and_forwards_events():
+    async def main():
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        handler = SSECallbackHandler(loop, queue)
+        chain = (
+            ChatPromptTemplate.from_template("{question}")
+            | resilient(StreamingModel(), breaker_name="test-sse").with_config(tags=[SQL_GENERATION_TAG])
+            | RunnableLambda(lambda message: emit_event("sql", {"query": message.content}) or message)
+        )
+        await loop.run_in_executor(None, lambda: chain.invoke({"question": "q"}, config={"callbacks": [handler]}))
+        await asyncio.sleep(0)
+        items = []
+        while not queue.empty():
+            items.append(queue.get_nowait())
+        return items
+
+    items = asyncio.run(main())
+    assert [data["token"] for event, data in items if event == "token"] == TOKENS
+    assert {data["stage"] for event, data in items if event == "token"} == {SQL_GENERATION_TAG}
+    assert items[-1] == ("sql", {"query": "".join(TOKENS)})
+
+def test_chat_stream_endpoint(monkeypatch):
+    import src.main as main
+
+    def fake_turn(executor, user_input, callbacks=None, db_uri=None, lock=None):
+        handler = callbacks[0]
+        action = AgentAction(tool="sql_query", tool_input=user_input, log="Routed")
+        handler.on_agent_action(action, run_id=uuid.uuid4())
+        handler.on_custom_event("rows", {"count": 2}, run_id=uuid.uuid4())
+        return {"output": "Ali\nSara", "route": "sql_query"}
+
+    monkeypatch.setattr(main, "run_agent", fake_turn)
+    response = TestClient(main.app).post(
+        "/chat/stream", json={"session_id": "stream-test", "user_input": "liste  des clients"}
+    )
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    assert [event for event, _ in events] == ["step", "rows", "final"]
+    assert events[0][1]["tool_input"] == "liste des clients"
+    assert events[-1][1] == {"session_id": "stream-test", "result": "Ali\nSara", "route": "sql_query"}
+
+def test_chat_stream_reports_errors(monkeypatch):
+    import src.main as main
+
+    def failing_turn(*args, **kwargs):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(main, "run_agent", failing_turn)
+    response = TestClient(main.app).post("/chat/stream", json={"session_id": "stream-test", "user_input": "clients"})
+    assert _events(response.text) == [("error", {"status_code": 500, "detail": "database unavailable"})]
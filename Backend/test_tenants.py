@@ -0,0 +1,46 @@
+import src.database as database
+from src.database import TenantRegistry, bind_db, connection, current_db_uri, execute_query, get_engine, pool_stats
+
+def test_engine_is_shared_per_uri(insurance_db):
+    assert get_engine() is get_engine(insurance_db)
+    with connection() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM clients").scalar() == 2
+    stats = pool_stats()
+    url = database.get_tenant().url()
+    assert stats[url]["checked_out"] == 0 and stats[url]["created"] >= 1 and stats[url]["waiting"] == 0
+
+def test_execute_query_formats_rows(insurance_db):
+    assert execute_query("SELECT nom FROM clients ORDER BY id") == "- Ali\n- Sara"
+    assert execute_query("SELECT nope FROM clients").startswith("Error executing query")
+
+def test_bind_db_routes_the_block(insurance_db, tmp_path):
+    other = f"sqlite:///{tmp_path / 'other.db'}"
+    assert current_db_uri() == insurance_db
+    with bind_db(other):
+        assert current_db_uri() == other
+        assert get_engine() is get_engine(other)
+        with bind_db(None):
+            assert current_db_uri() == insurance_db
+    assert current_db_uri() == insurance_db
+    database.reset_engine(other)
+
+def test_registry_evicts_least_recently_used_idle_tenants(tmp_path):
+    registry = TenantRegistry(max_tenants=2, idle_timeout=3600)
+    uris = [f"sqlite:///{tmp_path / f'db{i}.db'}" for i in range(3)]
+    first = registry.get(uris[0])
+    registry.get(uris[1])
+    registry.get(uris[0])  # most recently used again
+    registry.get(uris[2])
+    assert [t.uri for t in registry.tenants()] == [uris[0], uris[2]]
+    assert registry.evicted_lru == 1 and registry.get(uris[0]) is first
+    registry.remove()
+
+def test_registry_keeps_busy_tenants(tmp_path):
+    registry = TenantRegistry(max_tenants=1, idle_timeout=0)
+    busy = registry.get(f"sqlite:///{tmp_path / 'busy.db'}")
+    with busy.engine.connect():
+        registry.get(f"sqlite:///{tmp_path / 'next.db'}")
+        assert busy in registry.tenants()
+    registry.get(f"sqlite:///{tmp_path / 'last.db'}")
+    assert busy not in registry.tenants()
+    registry.remove()
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import time
+import pytest
+from src.workers import PoolSaturated, WorkerPool
+
+def test_runs_in_worker_thread():
+    async def main():
+        pool = WorkerPool(max_workers=2, max_queue=2, queue_timeout=1, name="test")
+        result = await pool.run(lambda a, b=0: (threading.current_thread().name, a + b), 1, b=2)
+        pool.shutdown()
+        return result, pool.stats()
+
+    (thread_name, value), stats = asyncio.run(main())
+    assert thread_name.startswith("test") and value == 3
+    assert stats["running"] == 0 and stats["completed"] == 1
+
+def test_full_queue_is_rejected_and_wait_times_out():
+    release = threading.Event()
+
+    async def main():
+        pool = WorkerPool(max_workers=1, max_queue=1, queue_timeout=0.2)
+        busy = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        waiting = asyncio.ensure_future(pool.run(lambda: None))
+        await asyncio.sleep(0.05)
+        with pytest.raises(PoolSaturated) as rejected:
+            await pool.run(lambda: None)
+        with pytest.raises(PoolSaturated) as timed_out:
+            await waiting
+        release.set()
+        await busy
+        pool.shutdown()
+        return rejected.value.status_code, timed_out.value.status_code, pool.stats()
+
+    rejected, timed_out, stats = asyncio.run(main())
+    assert (rejected, timed_out) == (429, 503)
+    assert stats["rejected"] == 1 and stats["timed_out"] == 1
+
+def test_cancelled_caller_keeps_slot_until_thread_finishes():
+    peak = []
+    active = [0]
+    lock = threading.Lock()
+
+    def turn(seconds):
+        with lock:
+            active[0] += 1
+            peak.append(active[0])
+        time.sleep(seconds)
+        with lock:
+            active[0] -= 1
+
+    async def main():
+        pool = WorkerPool(max_workers=1, max_queue=5, queue_timeout=5)
+        abandoned = asyncio.ensure_future(pool.run(turn, 0.3))
+        await asyncio.sleep(0.05)
+        abandoned.cancel()  # client disconnected; the thread keeps running
+        await asyncio.sleep(0.01)
+        assert pool.stats()["running"] == 1
+        await pool.run(turn, 0)
+        stats = pool.stats()
+        pool.shutdown()
+        return stats
+
+    stats = asyncio.run(main())
+    assert max(peak) == 1
+    assert stats["running"] == 0 and stats["completed"] == 2
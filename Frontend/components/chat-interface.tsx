@@ -99,8 +99,10 @@ export function ChatInterface({ databaseUrl, onReconfigure }: ChatInterfaceProps
           isUser: false,
           timestamp: new Date(),
           hasImage: true,
-          // Unique query param prevents caching
-          imageUrl: `http://localhost:8000/static/graph.png?messageId=${msgId}&ts=${Date.now()}`,
+          // Each chart has its own content-addressed URL; /graph is the latest chart
+          imageUrl: data.graph_url
+            ? `http://localhost:8000${data.graph_url}`
+            : `http://localhost:8000/graph?messageId=${msgId}&ts=${Date.now()}`,
         }
       } else {
         botMessage = {
@@ -136,7 +138,7 @@ export function ChatInterface({ databaseUrl, onReconfigure }: ChatInterfaceProps
     const img = imageRefs.current[messageId]
     if (!img) return
     try {
-      const res = await fetch(img.src, { cache: "no-store" })
+      const res = await fetch(img.src)
       const blob = await res.blob()
       const blobUrl = URL.createObjectURL(blob)
       // Revoke previous blob if exists